@@ -1,4 +1,4 @@
-import json
+import math
 from pathlib import Path
 from typing import List
 
@@ -6,6 +6,9 @@ import gradio as gr
 import pandas as pd
 from pandas.io.formats.style import Styler
 
+from jsonl_store import JsonlStore
+from qa_search import DEFAULT_SORT, SORT_OPTIONS, TEXT_FIELDS, QASearchIndex
+
 # 📁 Pfade
 QA_PAIRS_PATH = Path("../data/generated/qa_pairs.jsonl")
 
@@ -13,54 +16,88 @@ QA_PAIRS_PATH = Path("../data/generated/qa_pairs.jsonl")
 PAGE_SIZES = [10, 25, 50, 100]
 DEFAULT_PAGE_SIZE = 10
 
-# Globale Variabeln
-ALL_DATA = pd.DataFrame()  # Globale Datenbasis
-
-
-def load_qa_pairs_as_dataframe(source_filter: str = "", limit: int = 100, offset: int = 0) -> pd.DataFrame:
+# Zeilenindex (Byte-Offsets + Posting-Listen pro source_file) und Patch-Log neben der JSONL-Datei
+QA_STORE = JsonlStore(QA_PAIRS_PATH, key_field="source_file")
+# Volltext- und Filterindex (SQLite FTS5), folgt Datei und Patch-Log inkrementell
+QA_SEARCH = QASearchIndex(QA_STORE)
+
+# 🚦 Qualitätsregeln für die Markierung in der Tabelle
+QUALITY_RULES = {
+    "min_chars": {"instruction": 10, "output": 20},  # kürzer (aber nicht leer) → zu kurz
+    "duplicate_instruction": True,  # gleiche instruction mehrfach auf der Seite
+    "max_output_tokens": 512,  # Tokens ≈ durch Leerraum getrennte Wörter
+}
+
+# Markierung → (Spalte, Farbe); spätere Einträge haben Vorrang
+FLAG_STYLES = {
+    "short_instruction": ("instruction", "#ffe0b2"),
+    "duplicate_instruction": ("instruction", "#ffe0b2"),
+    "short_output": ("output", "#ffe0b2"),
+    "long_output": ("output", "#ffe0b2"),
+    "missing_input": ("input", "#fff3cd"),
+    "missing_instruction": ("instruction", "#ffdddd"),
+    "missing_output": ("output", "#ffdddd"),
+}
+
+
+def compute_quality_flags(df: pd.DataFrame, rules: dict | None = None) -> pd.DataFrame:
     """
-    Lädt QA-Paare aus der JSONL-Datei als Pandas DataFrame mit optionalem Filter.
+    Berechnet alle Markierungen spaltenweise in einem Durchlauf (ohne Python-Funktion pro Zelle).
 
-    :param source_filter: Optionaler Filter nach 'source_file'
-    :param limit: Maximale Anzahl der Zeilen
-    :param offset: Offset für Pagination
-    :return: Gefilterter DataFrame
+    Spalten des Ergebnisses (bool, gleicher Index wie df):
+    missing_<feld> für instruction/input/output sowie die Qualitätsregeln aus QUALITY_RULES:
+    short_<feld>, duplicate_instruction (auf der angezeigten Seite) und long_output.
+
+    :param df: DataFrame der Seite (fehlende Spalten gelten als leer)
+    :param rules: Regeln, Standard QUALITY_RULES
+    :return: DataFrame mit booleschen Spalten
     """
-    rows = []
-    with open(QA_PAIRS_PATH, "r", encoding="utf-8") as f:
-        for i, line in enumerate(f):
-            if i < offset:
-                continue
-            if len(rows) >= limit:
-                break
-            try:
-                entry = json.loads(line)
-                if source_filter and source_filter.lower() not in entry.get("source_file", "").lower():
-                    continue
-                rows.append(entry)
-            except json.JSONDecodeError:
-                continue
-    return pd.DataFrame(rows)
-
-
-def style_dataframe(df: pd.DataFrame) -> Styler:
+    rules = QUALITY_RULES if rules is None else rules
+    texts = df.reindex(columns=list(TEXT_FIELDS))
+    stripped = {field: texts[field].fillna("").astype(str).str.strip() for field in TEXT_FIELDS}
+
+    flags = {f"missing_{field}": stripped[field].eq("") for field in TEXT_FIELDS}
+    for field, min_chars in rules.get("min_chars", {}).items():
+        lengths = stripped[field].str.len()
+        flags[f"short_{field}"] = lengths.gt(0) & lengths.lt(min_chars)
+    if rules.get("duplicate_instruction"):
+        normalized = stripped["instruction"].str.lower()
+        flags["duplicate_instruction"] = normalized.ne("") & normalized.duplicated(keep=False)
+    max_tokens = rules.get("max_output_tokens")
+    if max_tokens:
+        # Nur Texte mit mehr als max_tokens Zeichen kommen infrage; split bricht nach max_tokens ab
+        output = stripped["output"]
+        candidates = output[output.str.len().gt(max_tokens)]
+        long_output = candidates.str.split(n=max_tokens).str.len().gt(max_tokens)
+        flags["long_output"] = long_output.reindex(df.index, fill_value=False)
+    return pd.DataFrame(flags, index=df.index)
+
+
+def style_dataframe(df: pd.DataFrame, rules: dict | None = None, flags: pd.DataFrame | None = None) -> Styler:
     """
-    Markiert fehlende Felder farblich: instruction/output rot, input gelb.
+    Markiert fehlende Felder farblich (instruction/output rot, input gelb) und Verstöße gegen
+    die Qualitätsregeln orange. Die Masken kommen aus compute_quality_flags; das Styling wird
+    als ein CSS-DataFrame auf einmal gesetzt.
 
     :param df: Eingabe-DataFrame
+    :param rules: Qualitätsregeln, Standard QUALITY_RULES
+    :param flags: Bereits berechnete Markierungen (sonst werden sie hier berechnet)
     :return: Gestylter DataFrame
     """
+    if flags is None:
+        flags = compute_quality_flags(df, rules)
+    css = pd.DataFrame("", index=df.index, columns=df.columns)
+    # Reihenfolge = Priorität: spätere Regeln überschreiben frühere (fehlende Felder zuletzt)
+    for flag, (column, color) in FLAG_STYLES.items():
+        if flag in flags and column in css.columns:
+            css.loc[flags[flag], column] = f"background-color: {color}"
+    return df.style.apply(lambda _: css, axis=None)
 
-    def highlight_missing(val, col):
-        if col in ["instruction", "output"] and (pd.isna(val) or str(val).strip() == ""):
-            return "background-color: #ffdddd"
-        elif col == "input" and (pd.isna(val) or str(val).strip() == ""):
-            return "background-color: #fff3cd"
-        return ""
 
-    return df.style.applymap(lambda val: highlight_missing(val, "instruction"), subset=["instruction"]) \
-                   .applymap(lambda val: highlight_missing(val, "input"), subset=["input"]) \
-                   .applymap(lambda val: highlight_missing(val, "output"), subset=["output"])
+def describe_quality_flags(flags: pd.DataFrame) -> str:
+    """Kurzübersicht der gesetzten Markierungen, z.B. "short_output: 2, long_output: 1"."""
+    counts = flags.sum()
+    return ", ".join(f"{flag}: {count}" for flag, count in counts.items() if count)
 
 
 def get_source_options() -> List[str]:
@@ -69,53 +106,63 @@ def get_source_options() -> List[str]:
 
     :return: Liste von Quellen
     """
-    sources = set()
-    with open(QA_PAIRS_PATH, "r", encoding="utf-8") as f:
-        for line in f:
-            try:
-                entry = json.loads(line)
-                if "source_file" in entry:
-                    sources.add(entry["source_file"])
-            except json.JSONDecodeError:
-                continue
-    return sorted(list(sources))
-
-
-def update_table_view(page_size: int, page_number: int, source_filter: str) -> pd.DataFrame:
+    return QA_STORE.keys()
+
+
+def update_table_view(page_size: int, page_number: int, source_filter: str, query: str = "",
+                      license_filter: str = "", missing_fields: List[str] | None = None,
+                      sort_by: str = DEFAULT_SORT, descending: bool = False):
     """
-    Wird durch Gradio aufgerufen, um die aktuelle Tabelle basierend auf Filter/Pagination neu zu laden.
+    Wird durch Gradio aufgerufen, um die aktuelle Tabelle basierend auf Suche/Filter/Pagination
+    neu zu laden. Gefiltert, gezählt und sortiert wird im Such-Index; gelesen wird nur die Seite.
 
     :param page_size: Anzahl der Einträge pro Seite
     :param page_number: Seitenzahl (0-basiert)
     :param source_filter: Aktiver Filter
-    :return: Formatierter DataFrame zur Anzeige
+    :param query: Volltextsuche in instruction/input/output (alle Wörter, "wort*" = Präfix)
+    :param license_filter: Exakte Lizenz
+    :param missing_fields: Nur Einträge, bei denen diese Felder leer sind
+    :param sort_by: Sortierung (siehe SORT_OPTIONS)
+    :param descending: Absteigend sortieren
+    :return: Gestylter DataFrame der Seite, Schlüssel ihrer Einträge (Sitzungszustand fürs Speichern),
+             Slider-Update und Trefferanzeige
     """
-    global ALL_DATA
-    offset = page_size * page_number
-    ALL_DATA = load_qa_pairs_as_dataframe(source_filter, limit=99999, offset=0)  # Lade alle für späteres Mergen
-    df_page = ALL_DATA.iloc[offset:offset + page_size].reset_index(drop=True)
-    return df_page
-
-
-def save_dataframe_to_jsonl(page_df: pd.DataFrame, page_size: int, page_number: int) -> str:
+    page_size, page_number = int(page_size), int(page_number)
+    filters = dict(text=query or "", source=source_filter or "", license=license_filter or "",
+                   missing=missing_fields or (), sort_by=sort_by, descending=bool(descending))
+    ordinals, total = QA_SEARCH.search(**filters, limit=page_size, offset=page_size * page_number)
+    pages = max(1, math.ceil(total / page_size))
+    if page_number >= pages:  # z.B. nach engerem Filter: auf letzte Seite springen
+        page_number = pages - 1
+        ordinals, total = QA_SEARCH.search(**filters, limit=page_size, offset=page_size * page_number)
+
+    records, keys = QA_STORE.read(ordinals)
+    df = pd.DataFrame(records)
+    info = f"🔎 {total} Treffer – Seite {page_number + 1} von {pages}"
+    flags = compute_quality_flags(df)
+    flagged = describe_quality_flags(flags)
+    if flagged:
+        info += f" · ⚠️ {flagged}"
+    return style_dataframe(df, flags=flags), keys, gr.update(maximum=pages - 1, value=page_number), info
+
+
+def save_dataframe_to_jsonl(page_df: pd.DataFrame, page_keys: List[str], page_number: int) -> str:
     """
-    Speichert den bearbeiteten DataFrame zurück in eine JSONL-Datei.
+    Speichert die bearbeitete Seite als Patches (Schlüssel → Datensatz) im Patch-Log der
+    JSONL-Datei. Der Aufwand hängt nur von der Seitengröße ab; die Basisdatei wird später
+    im Hintergrund atomar verdichtet.
 
-    :param df: Geänderter DataFrame
+    :param page_df: Geänderter DataFrame der Seite
+    :param page_keys: Schlüssel der angezeigten Einträge (aus update_table_view)
+    :param page_number: Seitenzahl für die Statusmeldung
     :return: Statusmeldung
     """
-    global ALL_DATA
+    if not page_keys:
+        return "⚠️ Keine geladene Seite zum Speichern."
     try:
-        offset = page_size * page_number
-        # Aktualisiere die betroffenen Zeilen im Gesamtdatensatz
-        for i in range(len(page_df)):
-            ALL_DATA.iloc[offset + i] = page_df.iloc[i]
-
-        with open(QA_PAIRS_PATH, "w", encoding="utf-8") as f:
-            for _, row in ALL_DATA.iterrows():
-                json.dump(row.dropna().to_dict(), f, ensure_ascii=False)
-                f.write("\n")
-        return f"✅ Seite {page_number} gespeichert ({len(page_df)} Einträge aktualisiert)."
+        updates = {key: page_df.iloc[i].dropna().to_dict() for i, key in enumerate(page_keys[:len(page_df)])}
+        saved = QA_STORE.save(updates)
+        return f"✅ Seite {page_number} gespeichert ({saved} Einträge aktualisiert)."
     except Exception as e:
         return f"❌ Fehler beim Speichern: {str(e)}"
 
@@ -126,23 +173,32 @@ with gr.Blocks(title="QA-Pairs Annotator") as demo:
 
     with gr.Row():
         page_size = gr.Dropdown(PAGE_SIZES, value=DEFAULT_PAGE_SIZE, label="Einträge pro Seite")
-        page_number = gr.Slider(minimum=0, maximum=100, step=1, value=0, label="Seite")
+        page_number = gr.Slider(minimum=0, maximum=0, step=1, value=0, label="Seite")
         source_filter = gr.Dropdown(label="Quelle filtern", choices=[""] + get_source_options())
         refresh_btn = gr.Button("🔍 Laden")
 
+    with gr.Row():
+        query = gr.Textbox(label="Volltextsuche (instruction/input/output)", placeholder="z.B. Kaufvertrag Mangel*")
+        license_filter = gr.Dropdown(label="Lizenz", choices=[""] + QA_SEARCH.licenses(), value="")
+        missing_fields = gr.CheckboxGroup(list(TEXT_FIELDS), label="Fehlende Felder")
+        sort_by = gr.Dropdown(list(SORT_OPTIONS), value=DEFAULT_SORT, label="Sortierung")
+        descending = gr.Checkbox(label="Absteigend", value=False)
+
+    result_info = gr.Markdown()
+
     df_view = gr.Dataframe(label="QA-Daten", interactive=True, wrap=True, row_count=PAGE_SIZES)
     save_btn = gr.Button("💾 Speichern")
     status_box = gr.Textbox(label="Status", interactive=False)
+    page_keys = gr.State([])  # Schlüssel der angezeigten Einträge, pro Sitzung
 
-    refresh_btn.click(
-        fn=update_table_view,
-        inputs=[page_size, page_number, source_filter],
-        outputs=df_view
-    )
+    view_inputs = [page_size, page_number, source_filter, query, license_filter, missing_fields, sort_by, descending]
+    view_outputs = [df_view, page_keys, page_number, result_info]
+    refresh_btn.click(fn=update_table_view, inputs=view_inputs, outputs=view_outputs)
+    query.submit(fn=update_table_view, inputs=view_inputs, outputs=view_outputs)
 
     save_btn.click(
         fn=save_dataframe_to_jsonl,
-        inputs=[df_view, page_size, page_number],
+        inputs=[df_view, page_keys, page_number],
         outputs=status_box
     )
 
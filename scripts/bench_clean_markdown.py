@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Benchmark und Regressionstest: clean_markdown aus epub_to_markdown.py gegen die bisherige
+Implementierung (Regex-Aufrufe pro Zeile, unicodedata pro Zeichen).
+
+Beide Varianten müssen für jede Eingabe und jede Optionskombination byte-identische
+Ausgaben liefern; Abweichungen werden gemeldet und führen zu Exit-Code 1.
+
+Beispiel:
+    python bench_clean_markdown.py --size-mb 8
+    python bench_clean_markdown.py --file ../data/markdown/buch.md --file ../data/markdown/skript.md
+"""
+
+import argparse
+import itertools
+import random
+import re
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+from epub_to_markdown import clean_markdown
+
+SAMPLE_LINES = [
+    "# Kapitel {n}: Kaufvertrag",
+    "##Unterabschnitt ohne Leerzeichen   ",
+    "   ###   Eingerückte Überschrift",
+    "Gemäß § 433 Abs. 1 Satz 1 BGB wird der Verkäufer verpflichtet, dem Käufer die Sache zu übergeben.",
+    "",
+    "",
+    "   ",
+    "-Aufzählung ohne Leerzeichen",
+    "*  Aufzählung mit **Fettdruck** und _Kursiv_",
+    "    - eingerückter Punkt\t",
+    "\t* Tab-Einrückung",
+    "1.Erster Punkt",
+    "  12.   Zwölfter Punkt  ",
+    "2023. war ein Jahr",
+    "---",
+    "***",
+    "| Norm | Inhalt |",
+    "| --- | --- |",
+    "Text mit [Link](https://example.org) und ![Bild](bild.png) sowie `code`.",
+    "Steuerzeichen\x00\x07 und weiches\u00ad Trennzeichen\u200b sowie \ufeffBOM.",
+    "Seitenumbruch\x0cund vertikaler\x0bTab, Wagenrücklauf\rEnde",
+    "Zeilentrenner\u2028Absatztrenner\u2029NEL\x85Ende",
+    "Privat \ue000 und Straße, Größe, „Anführungszeichen“, € ½ ٣. arabische Ziffer",
+    "#",
+    "-",
+    "*",
+]
+
+OPTIONS = ("fix_spacing", "standardize_headers", "fix_lists", "remove_multiple_blanks",
+           "extract_text", "remove_non_printable")
+
+
+def legacy_clean_markdown(
+        markdown_text: str,
+        fix_spacing: bool = True,
+        standardize_headers: bool = True,
+        fix_lists: bool = True,
+        remove_multiple_blanks: bool = True,
+        extract_text: bool = False,
+        remove_non_printable: bool = True,
+) -> str:
+    """Bisherige Implementierung als Referenz."""
+
+    def _remove_non_printable(s: str) -> str:
+        return "".join(
+            c for c in s if unicodedata.category(c)[0] != "C" or c in ("\n", "\t")
+        )
+
+    def _fix_header(line: str) -> str:
+        match = re.match(r"^(#+)(.*)$", line.lstrip())
+        if match:
+            hashes, content = match.groups()
+            return f"{hashes} {content.lstrip()}"
+        return line
+
+    def _fix_list_item(line: str) -> str:
+        indent = len(line) - len(line.lstrip())
+        content = line.lstrip()
+
+        match = re.match(r"^(\d+\.)\s*(.*)", content)
+        if match:
+            number, item = match.groups()
+            return " " * indent + f"{number} {item.strip()}"
+
+        match = re.match(r"^([-*])\s*(.*)", content)
+        if match:
+            bullet, item = match.groups()
+            return " " * indent + f"{bullet} {item.strip()}"
+
+        return line
+
+    def _strip_markdown(text: str) -> str:
+        text = re.sub(r"(!?\[.*?\]\(.*?\))", "", text)
+        text = re.sub(r"`{1,3}(.*?)`{1,3}", r"\1", text)
+        text = re.sub(r"[*_]{1,3}(.*?)?[*_]{1,3}", r"\1", text)
+        text = re.sub(r"#+ ", "", text)
+        return text.strip()
+
+    if remove_non_printable:
+        markdown_text = _remove_non_printable(markdown_text)
+
+    lines = markdown_text.splitlines()
+    cleaned_lines = []
+    prev_line = ""
+    in_list = False
+    i = 0
+
+    while i < len(lines):
+        line = lines[i]
+
+        if fix_spacing:
+            line = line.rstrip()
+
+        if standardize_headers and line.lstrip().startswith("#"):
+            line = _fix_header(line)
+
+        is_list_item = False
+        if fix_lists and (
+                line.lstrip().startswith(("- ", "* ", "-", "*"))
+                or re.match(r"^\s*\d+\.", line)
+        ):
+            line = _fix_list_item(line)
+            is_list_item = True
+
+        if remove_multiple_blanks:
+            if line.strip() == "" and prev_line.strip() == "":
+                i += 1
+                continue
+
+        if i > 0 and (
+                line.lstrip().startswith(("#", "-", "*")) or re.match(r"^\s*\d+\.", line)
+        ):
+            if cleaned_lines and cleaned_lines[-1].strip() != "":
+                if not (in_list and is_list_item):
+                    cleaned_lines.append("")
+
+        cleaned_lines.append(line)
+        prev_line = line
+        in_list = is_list_item
+        i += 1
+
+    while cleaned_lines and cleaned_lines[-1].strip() == "":
+        cleaned_lines.pop()
+    cleaned_lines.append("")
+
+    final_text = "\n".join(cleaned_lines)
+
+    if extract_text:
+        return "\n".join(
+            _strip_markdown(line) for line in final_text.splitlines() if line.strip()
+        )
+
+    return final_text
+
+
+def synthetic_markdown(size_mb: float, seed: int = 42) -> str:
+    rnd = random.Random(seed)
+    parts, size, n = [], 0, 0
+    while size < size_mb * 1_000_000:
+        n += 1
+        line = rnd.choice(SAMPLE_LINES).format(n=n)
+        parts.append(line)
+        size += len(line.encode("utf-8")) + 1
+    return "\n".join(parts)
+
+
+def fuzz_cases(count: int, seed: int = 7):
+    """Kurze Zufallstexte aus Beispielzeilen und einzelnen Sonderzeichen (Randfälle)."""
+    rnd = random.Random(seed)
+    alphabet = ["#", "-", "*", "1", "٣", ".", " ", "\t", "\n", "\r", "\x0c", "\u2028", "\x00", "\u00ad",
+                "a", "ß", "[", "]", "(", ")", "`", "_", "!"]
+    for _ in range(count):
+        if rnd.random() < 0.5:
+            yield "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 40)))
+        else:
+            yield "\n".join(rnd.choice(SAMPLE_LINES).format(n=rnd.randint(0, 99))
+                            for _ in range(rnd.randint(0, 12)))
+
+
+def check_identical(texts: list[str]) -> int:
+    """Vergleicht beide Implementierungen für alle Optionskombinationen; liefert die Anzahl Abweichungen."""
+    mismatches = 0
+    for flags in itertools.product((True, False), repeat=len(OPTIONS)):
+        kwargs = dict(zip(OPTIONS, flags))
+        for text in texts:
+            if clean_markdown(text, **kwargs) != legacy_clean_markdown(text, **kwargs):
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f"  ✗ Abweichung bei {kwargs}: {text[:80]!r}")
+    return mismatches
+
+
+def measure(fn, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--file", action="append", default=[], help="Markdown-Datei(en) (sonst synthetischer Text)")
+    ap.add_argument("--size-mb", type=float, default=8.0, help="Größe des synthetischen Texts")
+    ap.add_argument("--repeat", type=int, default=3, help="Messwiederholungen (bester Lauf zählt)")
+    ap.add_argument("--fuzz", type=int, default=2000, help="Anzahl zufälliger Regressionsfälle")
+    args = ap.parse_args()
+
+    if args.file:
+        texts = [Path(f).read_text(encoding="utf-8") for f in args.file]
+    else:
+        texts = [synthetic_markdown(args.size_mb)]
+    text = "\n".join(texts)
+    mb = len(text.encode("utf-8")) / 1_000_000
+    print(f"📄 Eingabe: {mb:.1f} MB")
+
+    results = {}
+    for name, fn in (("legacy", legacy_clean_markdown), ("aktuell", clean_markdown)):
+        seconds = measure(fn, text, args.repeat)
+        results[name] = seconds
+        print(f"  {name:8s} {seconds:7.2f} s  {mb / seconds:7.2f} MB/s")
+    print(f"⚡ Faktor: {results['legacy'] / results['aktuell']:.1f}x")
+
+    print(f"🔎 Regressionsvergleich: {len(texts)} Eingabe(n) + {args.fuzz} Zufallsfälle × {2 ** len(OPTIONS)} Optionen")
+    mismatches = check_identical(texts + list(fuzz_cases(args.fuzz)))
+    if mismatches:
+        print(f"❌ {mismatches} abweichende Ausgaben")
+        sys.exit(1)
+    print("✅ Ausgaben byte-identisch")
+
+
+if __name__ == "__main__":
+    main()
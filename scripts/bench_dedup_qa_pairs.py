@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Benchmark für dedup_qa_pairs.py auf synthetischen QA-Paaren mit bekannten Beinahe-Duplikaten.
+
+Es werden Originalpaare erzeugt und zu einem Teil davon Varianten mit wenigen ausgetauschten,
+eingefügten oder gelöschten Wörtern (wie sie durch überlappende Fenster entstehen). Gemessen
+werden Durchsatz, Spitzenspeicher sowie Trefferquote gegen die exakte Jaccard-Ähnlichkeit:
+eine Variante gilt als zu Recht entfernt, wenn ihre Ähnlichkeit zum Original ≥ Schwelle ist.
+
+Beispiel:
+    python bench_dedup_qa_pairs.py --records 200000
+    python bench_dedup_qa_pairs.py --records 1000000 --duplicate-rate 0.5 --threshold 0.7
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from dedup_qa_pairs import NUM_PERM, SHINGLE_WORDS, THRESHOLD, deduplicate, normalize, shingles
+
+try:
+    import resource  # nur unter Unix verfügbar
+except ImportError:
+    resource = None
+
+VOCABULARY = ("Kaufvertrag Verkäufer Käufer Sache Eigentum Übergabe Mangel Nacherfüllung Rücktritt Minderung "
+              "Schadensersatz Frist Gewährleistung Anspruch Vertrag Leistung Zahlung Verzug Haftung Vorsatz "
+              "Fahrlässigkeit Gläubiger Schuldner Pflicht Recht Gesetz Absatz Satz Norm Urteil Gericht Klage "
+              "Beweis Besitz Grundstück Miete Pacht Darlehen Bürgschaft Pfand Erbe Testament Vollmacht "
+              "Stellvertretung Willenserklärung Angebot Annahme Anfechtung Irrtum Täuschung Drohung").split()
+FILLER = "der die das und oder nicht ist wird nach gemäß des einer eines mit bei für im zum zur".split()
+
+
+def random_words(rnd: random.Random, count: int) -> list[str]:
+    return [rnd.choice(VOCABULARY) if rnd.random() < 0.6 else rnd.choice(FILLER) for _ in range(count)] + \
+           [str(rnd.randrange(1, 2000))]
+
+
+def mutate(rnd: random.Random, words: list[str], edits: int) -> list[str]:
+    words = list(words)
+    for _ in range(edits):
+        position = rnd.randrange(len(words))
+        operation = rnd.random()
+        if operation < 0.5:
+            words[position] = rnd.choice(VOCABULARY)
+        elif operation < 0.75:
+            words.insert(position, rnd.choice(FILLER))
+        elif len(words) > 2:
+            del words[position]
+    return words
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def write_synthetic(path: Path, records: int, duplicate_rate: float, max_edits: int, seed: int) -> dict[str, str]:
+    """
+    Schreibt synthetische QA-Paare; Varianten folgen ihrem Original in zufälligem Abstand.
+
+    :return: Variante-ID → Original-ID
+    """
+    rnd = random.Random(seed)
+    originals: list[tuple[str, list[str], list[str]]] = []
+    variant_of = {}
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(records):
+            if originals and rnd.random() < duplicate_rate:
+                base_id, instruction, output = rnd.choice(originals[-5000:])
+                edits = rnd.randint(0, max_edits)
+                record_id = f"v{i}"
+                variant_of[record_id] = base_id
+                instruction, output = mutate(rnd, instruction, edits // 3), mutate(rnd, output, edits - edits // 3)
+            else:
+                record_id = f"o{i}"
+                instruction, output = random_words(rnd, rnd.randint(6, 15)), random_words(rnd, rnd.randint(30, 120))
+                originals.append((record_id, instruction, output))
+            f.write(json.dumps({"id": record_id, "instruction": " ".join(instruction) + "?", "input": "",
+                                "output": " ".join(output) + ".", "source_file": f"buch{i % 50}.md"},
+                               ensure_ascii=False) + "\n")
+    return variant_of
+
+
+def evaluate(input_path: Path, clusters_path: Path, variant_of: dict[str, str], threshold: float,
+             shingle_words: int, sample: int, seed: int) -> dict:
+    """
+    Vergleicht das Ergebnis mit der exakten Jaccard-Ähnlichkeit (Stichprobe von Varianten).
+    """
+    removed = {}
+    with open(clusters_path, encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            removed[entry["id"]] = entry["duplicate_of"]
+
+    rnd = random.Random(seed)
+    checked = rnd.sample(sorted(variant_of), min(sample, len(variant_of)))
+    wanted = set(checked) | {variant_of[v] for v in checked}
+    texts = {}
+    with open(input_path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record["id"] in wanted:
+                texts[record["id"]] = shingles(normalize(record), shingle_words)
+
+    true_positive = false_negative = near_miss = 0
+    clear_positive = clear_found = 0  # Ähnlichkeit deutlich über der Schwelle (≥ threshold + 0.05)
+    for variant in checked:
+        similarity = jaccard(texts[variant], texts[variant_of[variant]])
+        similar = similarity >= threshold
+        if similarity >= threshold + 0.05:
+            clear_positive += 1
+            clear_found += variant in removed
+        if similar and variant in removed:
+            true_positive += 1
+        elif similar:
+            false_negative += 1
+        elif variant in removed:
+            near_miss += 1  # unter der Schwelle entfernt (Schätzfehler der MinHash-Signatur)
+    originals_removed = sum(1 for record_id in removed if record_id.startswith("o"))
+    positives = true_positive + false_negative
+    return {
+        "recall": true_positive / positives if positives else 1.0,
+        "clear_recall": clear_found / clear_positive if clear_positive else 1.0,
+        "removed_below_threshold": near_miss,
+        "originals_removed": originals_removed,
+        "checked": len(checked),
+    }
+
+
+def peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--records", type=int, default=200_000)
+    ap.add_argument("--duplicate-rate", type=float, default=0.4, help="Anteil der Varianten")
+    ap.add_argument("--max-edits", type=int, default=12, help="Maximale Wortänderungen pro Variante")
+    ap.add_argument("--threshold", type=float, default=THRESHOLD)
+    ap.add_argument("--num-perm", type=int, default=NUM_PERM)
+    ap.add_argument("--bands", type=int, help="Standard: aus --threshold abgeleitet")
+    ap.add_argument("--sample", type=int, default=5000, help="Varianten für den exakten Vergleich")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="dedup-bench-") as tmp:
+        tmp = Path(tmp)
+        input_path = tmp / "qa_pairs.jsonl"
+        start = time.perf_counter()
+        variant_of = write_synthetic(input_path, args.records, args.duplicate_rate, args.max_edits, args.seed)
+        mb = input_path.stat().st_size / 1_000_000
+        print(f"📄 {args.records} synthetische Paare ({mb:.0f} MB, {len(variant_of)} Varianten) "
+              f"in {time.perf_counter() - start:.1f} s erzeugt")
+
+        stats = deduplicate(input_path, tmp / "dedup.jsonl", tmp / "clusters.jsonl", args.threshold,
+                            args.num_perm, args.bands, SHINGLE_WORDS)
+        rss = peak_rss_mb()
+        print(f"⚡ {stats['seconds']:.1f} s  {stats['records'] / stats['seconds']:,.0f} Datensätze/s  "
+              f"{mb / stats['seconds']:.1f} MB/s" + (f"  Peak RSS {rss:.0f} MB" if rss else ""))
+        print(f"   LSH {stats['bands']}×{stats['rows']}: {stats['kept']} behalten, "
+              f"{stats['duplicates']} entfernt in {stats['clusters']} Clustern")
+
+        quality = evaluate(input_path, tmp / "clusters.jsonl", variant_of, args.threshold, SHINGLE_WORDS,
+                           args.sample, args.seed)
+        print(f"🔎 Stichprobe {quality['checked']} Varianten: Recall {quality['recall']:.1%} "
+              f"(Jaccard ≥ {args.threshold}), {quality['clear_recall']:.1%} (≥ {args.threshold + 0.05:.2f})")
+        print(f"   {quality['removed_below_threshold']} knapp unter der Schwelle entfernt, "
+              f"{quality['originals_removed']} Originale entfernt")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Sliding-Window-Segmentierung aus generate_qa_pairs.py gegen die bisherige
+Implementierung (encode → slice → decode pro Fenster).
+
+Beispiel:
+    python bench_sliding_windows.py --size-mb 8
+    python bench_sliding_windows.py --file ../data/markdown/buch.md
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+from pathlib import Path
+
+from generate_qa_pairs import STRIDE_TOKENS, WINDOW_TOKENS, sliding_windows, tokenizer
+
+SAMPLE_PARAGRAPHS = [
+    "# Kapitel {n}: Kaufvertrag",
+    "Gemäß § 433 Abs. 1 Satz 1 BGB wird der Verkäufer einer Sache verpflichtet, dem Käufer die Sache "
+    "zu übergeben und das Eigentum an der Sache zu verschaffen.",
+    "| Norm | Inhalt |\n| --- | --- |\n| § 434 BGB | Sachmangel |\n| § 437 BGB | Rechte des Käufers |",
+    "- Rn. {n}: Die Übergabe erfolgt regelmäßig Zug um Zug gegen Zahlung des Kaufpreises.\n"
+    "- Vgl. BGH, Urteil v. 12.03.2021 – V ZR 33/19.",
+    "Straße, Größe, Maß – „Anführungszeichen“ und Sonderzeichen wie € oder ½ kommen in Büchern häufig vor.",
+]
+
+
+def legacy_sliding_windows(text: str, window_size: int, stride: int) -> list[str]:
+    """Bisherige Implementierung als Referenz."""
+    token_ids = tokenizer.encode(text)
+    windows = []
+    i = 0
+    while i < len(token_ids):
+        chunk = token_ids[i:i + window_size]
+        windows.append(tokenizer.decode(chunk))
+        if i + window_size >= len(token_ids):
+            break
+        i += stride
+    return windows
+
+
+def synthetic_markdown(size_mb: float, seed: int = 42) -> str:
+    rnd = random.Random(seed)
+    parts, size, n = [], 0, 0
+    while size < size_mb * 1_000_000:
+        n += 1
+        paragraph = rnd.choice(SAMPLE_PARAGRAPHS).format(n=n)
+        parts.append(paragraph)
+        size += len(paragraph.encode("utf-8")) + 2
+    return "\n\n".join(parts)
+
+
+def measure(fn, text: str, window: int, stride: int) -> tuple[float, int, list[str]]:
+    start = time.perf_counter()
+    windows = list(fn(text, window, stride))
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    for _ in fn(text, window, stride):
+        pass  # Spitzenverbrauch beim reinen Durchlaufen (Streaming)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak, windows
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--file", help="Markdown-Datei (sonst synthetischer Text)")
+    ap.add_argument("--size-mb", type=float, default=8.0, help="Größe des synthetischen Texts")
+    ap.add_argument("--window", type=int, default=WINDOW_TOKENS)
+    ap.add_argument("--stride", type=int, default=STRIDE_TOKENS)
+    args = ap.parse_args()
+
+    text = Path(args.file).read_text(encoding="utf-8") if args.file else synthetic_markdown(args.size_mb)
+    mb = len(text.encode("utf-8")) / 1_000_000
+    print(f"📄 Eingabe: {mb:.1f} MB, Fenster {args.window}, Schrittweite {args.stride}")
+    sliding_windows("warm-up", args.window, args.stride)  # Lookup-Tabelle aufbauen
+
+    results = {}
+    for name, fn in (("legacy", legacy_sliding_windows), ("offsets", sliding_windows)):
+        seconds, peak, windows = measure(fn, text, args.window, args.stride)
+        results[name] = windows
+        print(f"  {name:8s} {seconds:7.2f} s  {mb / seconds:6.2f} MB/s  "
+              f"Peak {peak / 1_000_000:7.1f} MB  {len(windows)} Fenster")
+
+    legacy, current = results["legacy"], results["offsets"]
+    identical = sum(a == b for a, b in zip(legacy, current))
+    print(f"🔎 Identische Fenster: {identical}/{len(legacy)}"
+          + ("" if len(legacy) == len(current) else f"  ✗ Anzahl abweichend ({len(current)})"))
+    if identical < len(legacy):
+        print("   (Abweichungen entstehen, wenn eine Fenstergrenze ein UTF-8-Zeichen teilt: "
+              "legacy liefert dort U+FFFD, die Offsets schneiden an der Zeichengrenze.)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Benchmark: mehrere Tokenizer im direkten Vergleich auf derselben festen Korpus-Stichprobe.
+
+Tokenizer werden als Pfad zu einer Hugging-Face-tokenizer.json oder als tiktoken-Encoding
+angegeben ("tiktoken:cl100k_base"), optional mit Namen ("jura50k=../data/tokenizer/x.json").
+Gemessen werden Kompression (Zeichen/Bytes pro Token), Durchsatz in MB/s einzeln
+(ein Dokument nach dem anderen) und im Batch über mehrere Threads sowie Latenz-Perzentile pro
+Dokument. Jeder Lauf wird an eine JSONL-Historie angehängt; mit --check endet das Skript mit
+Exit-Code 1, wenn sich ein Tokenizer gegenüber seinem letzten Lauf auf derselben Stichprobe
+verschlechtert hat.
+
+Beispiel:
+    python bench_tokenizers.py ../data/tokenizer/tokenizer_de_jura.json tiktoken:cl100k_base \
+        --corpus ../data/corpus/de/law --sample 2000
+    python bench_tokenizers.py v32k=tok32k.json v50k=tok50k.json --corpus ../data/corpus --check
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from tokenizer_static_check import iter_corpus_files, sample_files
+
+HISTORY_FILE = Path("../data/tokenizer/bench_history.jsonl")
+DEFAULT_SAMPLE = 1000
+DEFAULT_REPEAT = 3
+MAX_COMPRESSION_DROP = 0.01  # 1 % weniger Zeichen pro Token gilt als Regression
+MAX_SLOWDOWN = 0.20  # 20 % weniger Durchsatz (nur auf demselben Rechner mit gleich vielen Threads verglichen)
+
+
+class BenchTokenizer:
+    """Einheitliche Schnittstelle für HF-tokenizers und tiktoken."""
+
+    def __init__(self, spec: str):
+        name, _, target = spec.rpartition("=")
+        self.spec = target
+        if target.startswith("tiktoken:"):
+            import tiktoken
+            encoding = target.split(":", 1)[1]
+            self._enc = tiktoken.get_encoding(encoding)
+            self.kind, self.version = "tiktoken", encoding
+            self.name = name or encoding
+        else:
+            from tokenizers import Tokenizer
+            self._tok = Tokenizer.from_file(target)
+            with open(target, "rb") as f:
+                self.version = hashlib.md5(f.read()).hexdigest()
+            self.kind = "hf"
+            self.name = name or Path(target).stem
+
+    def encode(self, text: str) -> int:
+        if self.kind == "tiktoken":
+            return len(self._enc.encode_ordinary(text))
+        return len(self._tok.encode(text, add_special_tokens=False).ids)
+
+    def encode_batch(self, texts: list[str], threads: int) -> int:
+        if self.kind == "tiktoken":
+            return sum(map(len, self._enc.encode_ordinary_batch(texts, num_threads=threads)))
+        return sum(len(enc.ids) for enc in self._tok.encode_batch(texts, add_special_tokens=False))
+
+
+def load_sample(corpus: str, sample: int, seed: int) -> tuple[list[str], str]:
+    """
+    Liest die feste Stichprobe und bildet einen Fingerabdruck aus Pfaden und Inhalt, damit nur
+    Läufe auf identischen Daten miteinander verglichen werden.
+    """
+    root = Path(corpus)
+    if sample > 0:
+        paths, _ = sample_files(iter_corpus_files(root), sample, seed)
+    else:
+        paths = sorted(iter_corpus_files(root))
+    digest = hashlib.md5()
+    texts = []
+    for fp in paths:
+        data = fp.read_bytes()
+        digest.update(fp.name.encode("utf-8") + b"\0" + hashlib.md5(data).digest())
+        texts.append(data.decode("utf-8", errors="ignore"))
+    return texts, digest.hexdigest()
+
+
+def benchmark(tok: BenchTokenizer, texts: list[str], total_bytes: int, threads: int, repeat: int) -> dict:
+    tok.encode(texts[0])  # Aufwärmen (Lookup-Tabellen, Thread-Pool)
+
+    best_single, latencies, tokens = None, None, 0
+    for _ in range(repeat):
+        run = np.empty(len(texts), dtype=np.int64)
+        tokens = 0
+        start = time.perf_counter()
+        for i, text in enumerate(texts):
+            t0 = time.perf_counter_ns()
+            tokens += tok.encode(text)
+            run[i] = time.perf_counter_ns() - t0
+        seconds = time.perf_counter() - start
+        if best_single is None or seconds < best_single:
+            best_single, latencies = seconds, run
+
+    best_batch = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        batch_tokens = tok.encode_batch(texts, threads)
+        seconds = time.perf_counter() - start
+        best_batch = seconds if best_batch is None else min(best_batch, seconds)
+    if batch_tokens != tokens:
+        print(f"⚠️  {tok.name}: Batch-Kodierung liefert {batch_tokens} statt {tokens} Tokens")
+
+    total_chars = sum(map(len, texts))
+    p50, p90, p99 = np.percentile(latencies / 1e6, [50, 90, 99])
+    return {
+        "tokens": tokens,
+        "chars_per_token": round(total_chars / tokens, 4) if tokens else None,
+        "bytes_per_token": round(total_bytes / tokens, 4) if tokens else None,
+        "mb_per_s_single": round(total_bytes / 1e6 / best_single, 3),
+        "mb_per_s_batch": round(total_bytes / 1e6 / best_batch, 3),
+        "latency_ms_p50": round(float(p50), 4),
+        "latency_ms_p90": round(float(p90), 4),
+        "latency_ms_p99": round(float(p99), 4),
+    }
+
+
+def load_history(path: Path) -> list[dict]:
+    if not path.exists():
+        return []
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return entries
+
+
+def find_regressions(entry: dict, previous: dict | None, max_compression_drop: float,
+                     max_slowdown: float) -> list[str]:
+    """Vergleicht mit dem letzten Lauf desselben Tokenizers auf derselben Stichprobe."""
+    if previous is None:
+        return []
+    problems = []
+    old, new = previous.get("chars_per_token"), entry.get("chars_per_token")
+    if old and new and new < old * (1 - max_compression_drop):
+        problems.append(f"Kompression {old:.3f} → {new:.3f} Zeichen/Token")
+    if previous.get("host") == entry["host"] and previous.get("threads") == entry["threads"]:
+        for key, label in (("mb_per_s_single", "einzeln"), ("mb_per_s_batch", "Batch")):
+            old, new = previous.get(key), entry.get(key)
+            if old and new and new < old * (1 - max_slowdown):
+                problems.append(f"Durchsatz {label} {old:.1f} → {new:.1f} MB/s")
+    return problems
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Vergleicht Tokenizer (HF-JSON und tiktoken) auf einer festen Stichprobe.")
+    ap.add_argument("tokenizers", nargs="+",
+                    help="Pfad zu tokenizer.json oder tiktoken:<encoding>, optional als name=spec")
+    ap.add_argument("--corpus", required=True, help="Ordner mit *.txt-Dateien oder einzelne Datei")
+    ap.add_argument("--sample", type=int, default=DEFAULT_SAMPLE, help="Dateien in der Stichprobe (0 = alle)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--threads", type=int, default=os.cpu_count() or 1, help="Threads für die Batch-Messung")
+    ap.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Wiederholungen, gewertet wird die schnellste")
+    ap.add_argument("--history", type=Path, default=HISTORY_FILE)
+    ap.add_argument("--no-history", action="store_true", help="Lauf nicht in die Historie schreiben")
+    ap.add_argument("--check", action="store_true", help="Exit-Code 1 bei Regressionen")
+    ap.add_argument("--max-compression-drop", type=float, default=MAX_COMPRESSION_DROP)
+    ap.add_argument("--max-slowdown", type=float, default=MAX_SLOWDOWN)
+    args = ap.parse_args()
+
+    if args.threads <= 0 or args.repeat <= 0:
+        ap.error("--threads und --repeat müssen positiv sein")
+    # Thread-Pool von tokenizers: ein bereits gesetztes RAYON_NUM_THREADS hat Vorrang vor --threads
+    os.environ.setdefault("RAYON_NUM_THREADS", str(args.threads))
+    try:
+        rayon_threads = int(os.environ["RAYON_NUM_THREADS"])
+    except ValueError:
+        ap.error(f"Ungültiges RAYON_NUM_THREADS={os.environ['RAYON_NUM_THREADS']!r}")
+    if rayon_threads != args.threads:
+        print(f"⚠️  RAYON_NUM_THREADS={rayon_threads} überschreibt --threads {args.threads} "
+              f"für HF-Tokenizer; in der Historie steht die tatsächliche Anzahl")
+
+    texts, fingerprint = load_sample(args.corpus, args.sample, args.seed)
+    if not texts:
+        ap.error(f"Keine *.txt-Dateien in {args.corpus}")
+    total_bytes = sum(len(t.encode("utf-8")) for t in texts)
+    print(f"📄 Stichprobe: {len(texts)} Dateien, {total_bytes / 1e6:.1f} MB (Fingerabdruck {fingerprint[:12]}), "
+          f"{args.threads} Threads, {args.repeat} Wiederholungen")
+
+    history = load_history(args.history)
+    host = f"{platform.node()}/{os.cpu_count()}cpu"
+    timestamp = datetime.now(timezone.utc).isoformat()
+    results, regressions = [], {}
+    for spec in args.tokenizers:
+        try:
+            tok = BenchTokenizer(spec)
+        except Exception as e:
+            print(f"❌ {spec}: nicht ladbar ({type(e).__name__}: {e})")
+            continue
+        entry = {
+            "timestamp": timestamp, "name": tok.name, "kind": tok.kind, "spec": tok.spec,
+            "version": tok.version, "corpus": args.corpus, "fingerprint": fingerprint,
+            "files": len(texts), "bytes": total_bytes, "host": host,
+            "threads": rayon_threads if tok.kind == "hf" else args.threads,
+            **benchmark(tok, texts, total_bytes, args.threads, args.repeat),
+        }
+        previous = next((h for h in reversed(history)
+                         if h.get("name") == entry["name"] and h.get("fingerprint") == fingerprint), None)
+        problems = find_regressions(entry, previous, args.max_compression_drop, args.max_slowdown)
+        if problems:
+            regressions[entry["name"]] = problems
+        results.append(entry)
+
+    if not results:
+        sys.exit(2)
+
+    baseline = results[0]
+    print(f"\n  {'Tokenizer':24s} {'Zeichen/Tok':>11} {'Bytes/Tok':>9} {'vs. ' + baseline['name'][:10]:>15} "
+          f"{'MB/s einz.':>10} {'MB/s Batch':>10} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+    for r in results:
+        relative = (r["chars_per_token"] / baseline["chars_per_token"] - 1) * 100
+        print(f"  {r['name'][:24]:24s} {r['chars_per_token']:>11.3f} {r['bytes_per_token']:>9.3f} "
+              f"{relative:>+14.1f}% {r['mb_per_s_single']:>10.2f} {r['mb_per_s_batch']:>10.2f} "
+              f"{r['latency_ms_p50']:>8.3f} {r['latency_ms_p90']:>8.3f} {r['latency_ms_p99']:>8.3f}")
+
+    if not args.no_history:
+        args.history.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.history, "a", encoding="utf-8") as f:
+            for r in results:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+        print(f"\n🗂️  Historie: {args.history}")
+
+    for name, problems in regressions.items():
+        for problem in problems:
+            print(f"✗  Regression {name}: {problem}")
+    if not regressions:
+        print("✓  Keine Regressionen gegenüber dem letzten Lauf")
+    elif args.check:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
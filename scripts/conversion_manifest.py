@@ -0,0 +1,116 @@
+import json
+import os
+from hashlib import md5
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+MANIFEST_NAME = ".conversion_manifest.json"
+
+
+def compute_md5(path: Path) -> str:
+    """
+    Berechnet den MD5-Hash einer Datei.
+    """
+    hash_md5 = md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            hash_md5.update(chunk)
+    return hash_md5.hexdigest()
+
+
+def converter_version(own_version: str, *packages: str) -> str:
+    """
+    Versionskennung eines Konverters: eigene Version plus Versionen der verwendeten Bibliotheken,
+    damit ein Bibliotheks-Update ebenfalls eine Neukonvertierung auslöst.
+    """
+    parts = [own_version]
+    for package in packages:
+        try:
+            parts.append(f"{package}-{version(package)}")
+        except PackageNotFoundError:
+            parts.append(f"{package}-?")
+    return "+".join(parts)
+
+
+class ConversionManifest:
+    """
+    Gemeinsames Manifest der PDF-, EPUB- und RTF-Konverter im Markdown-Ausgabeordner.
+
+    Pro Konverter und Quelldatei werden Größe, mtime, MD5-Hash, Konverterversion und
+    Ausgabedatei gespeichert. Stimmen Größe und mtime überein, wird die Datei ohne Lesen
+    übersprungen; nur bei geänderter mtime und gleicher Größe wird der Hash verglichen.
+    """
+
+    def __init__(self, output_dir: Path, converter: str, converter_version: str):
+        self.path = output_dir / MANIFEST_NAME
+        self.converter = converter
+        self.version = converter_version
+        self.entries: dict[str, dict] = self._read().get(converter, {})
+        self._changed: set[str] = set()
+
+    def _read(self) -> dict:
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️  Manifest nicht lesbar, alle Dateien werden neu konvertiert: {e}")
+            return {}
+
+    def needs_conversion(self, source: Path, output: Path) -> bool:
+        """
+        True, wenn die Quelldatei neu, verändert oder mit einer anderen Konverterversion
+        konvertiert wurde bzw. die Ausgabedatei fehlt.
+        """
+        entry = self.entries.get(source.name)
+        if entry is None or entry.get("version") != self.version or not output.exists():
+            return True
+        if entry.get("output") != output.name:
+            return True
+
+        stat = source.stat()
+        if stat.st_size != entry.get("size"):
+            return True
+        if stat.st_mtime_ns == entry.get("mtime_ns"):
+            return False
+
+        # Nur mtime geändert (z.B. kopiert/berührt): Inhalt vergleichen
+        if compute_md5(source) != entry.get("md5"):
+            return True
+        entry["mtime_ns"] = stat.st_mtime_ns
+        self._changed.add(source.name)
+        return False
+
+    def record(self, source: Path, output: Path):
+        """
+        Vermerkt eine erfolgreiche Konvertierung.
+        """
+        stat = source.stat()
+        self.entries[source.name] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "md5": compute_md5(source),
+            "version": self.version,
+            "output": output.name,
+        }
+        self._changed.add(source.name)
+
+    def save(self):
+        """
+        Schreibt geänderte Einträge atomar (Temp-Datei + Rename). Das Manifest wird vorher neu
+        eingelesen, damit parallel laufende andere Konverter nicht überschrieben werden.
+        """
+        if not self._changed:
+            return
+        data = self._read()
+        section = data.setdefault(self.converter, {})
+        for name in self._changed:
+            section[name] = self.entries[name]
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self._changed.clear()
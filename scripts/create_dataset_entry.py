@@ -1,7 +1,8 @@
-import json
 from datetime import datetime, timezone
 from pathlib import Path
 
+from jsonl_writer import JsonlWriter
+
 DATASET_PATH = Path("../data/dataset.jsonl")
 
 
@@ -27,6 +28,14 @@ def main():
     print("🧠 Interaktive Eingabe für Instruction-Tuning-Dataset")
     print("Drücke STRG+C oder lasse 'instruction' leer zum Beenden.\n")
 
+    with JsonlWriter(DATASET_PATH) as writer:
+        collect_entries(writer)
+
+
+def collect_entries(writer: JsonlWriter):
+    """
+    Fragt Einträge ab, bis der Benutzer beendet. Jeder Eintrag wird sofort gesichert.
+    """
     while True:
         try:
             instruction = ask_input("📌 Instruction (Was soll das Modell tun?)")
@@ -59,8 +68,8 @@ def main():
                 }
             }
 
-            with open(DATASET_PATH, "a", encoding="utf-8") as f:
-                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            writer.write(entry)
+            writer.checkpoint()
 
             print(f"✅ Eintrag gespeichert ({DATASET_PATH.name})\n")
 
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Entfernt Beinahe-Duplikate aus QA-Paaren (MinHash + Locality Sensitive Hashing).
+
+Durch die überlappenden Fenster in generate_qa_pairs.py (STRIDE_TOKENS = WINDOW_TOKENS / 2)
+entstehen viele fast gleichlautende Paare, die ein exakter Vergleich nicht findet. Verglichen
+wird die Jaccard-Ähnlichkeit der Wort-Shingles von instruction + output:
+
+- Shingles (k aufeinanderfolgende Wörter) werden batchweise mit NumPy gehasht (Polynom-Hash
+  über Präfixsummen, kein Python-Code pro Wort), daraus MinHash-Signaturen berechnet.
+- Die Signaturen werden in Bänder zerlegt; nur Datensätze mit einem gemeinsamen Band werden
+  verglichen (LSH) und ab --threshold geschätzter Ähnlichkeit als Duplikat gewertet. Bänder und
+  Zeilen pro Band werden so gewählt, dass Paare an der Schwelle zu 99 % Kandidaten werden.
+- Ein Durchlauf, Dateireihenfolge: das erste Paar eines Clusters bleibt erhalten, spätere
+  ähnliche Paare werden verworfen und mit Ähnlichkeit in die Cluster-Datei geschrieben.
+
+Im Speicher liegen nur die Band-Schlüssel (sortierte NumPy-Arrays) und Zeilen-Offsets der
+behaltenen Datensätze, ca. 200 Byte pro Datensatz; Signaturen liegen in einer Temp-Datei.
+
+Beispiel:
+    python dedup_qa_pairs.py
+    python dedup_qa_pairs.py --threshold 0.7 --input ../data/generated/qa_pairs.jsonl
+"""
+
+import argparse
+import json
+import os
+import re
+import tempfile
+import time
+from array import array
+from pathlib import Path
+from typing import BinaryIO, Iterator, List
+
+import numpy as np
+
+from jsonl_store import record_key
+
+INPUT_FILE = Path("../data/generated/qa_pairs.jsonl")
+OUTPUT_FILE = Path("../data/generated/qa_pairs.dedup.jsonl")
+CLUSTERS_FILE = Path("../data/generated/qa_pairs.clusters.jsonl")
+
+TEXT_FIELDS = ("instruction", "output")
+NUM_PERM = 128  # Länge der MinHash-Signatur
+THRESHOLD = 0.8  # geschätzte Jaccard-Ähnlichkeit, ab der ein Kandidat als Duplikat gilt
+CANDIDATE_RECALL = 0.99  # Mindestwahrscheinlichkeit, dass ein Paar mit Ähnlichkeit = THRESHOLD Kandidat wird
+SHINGLE_WORDS = 3
+BATCH_RECORDS = 2048
+PERM_CHUNK = 16  # Permutationen pro Rechenschritt (begrenzt die Matrixgröße)
+MERGE_KEYS = 1 << 20  # Band-Schlüssel im kleinen Lauf, bevor er in den großen einsortiert wird
+
+POLY_BASE = 0x100000001B3  # ungerade → invertierbar modulo 2**64
+POLY_BASE_INV = pow(POLY_BASE, -1, 1 << 64)
+COMBINE_PRIME = np.uint64(0x9E3779B97F4A7C15)
+
+# Wortzeichen auf Byte-Ebene: ASCII-Buchstaben, Ziffern, "_" und alle Bytes von Nicht-ASCII-Zeichen
+WORD_BYTES = np.zeros(256, dtype=bool)
+for _chars in (b"0123456789_", bytes(range(ord("a"), ord("z") + 1)), bytes(range(ord("A"), ord("Z") + 1))):
+    WORD_BYTES[list(_chars)] = True
+WORD_BYTES[0x80:] = True
+WORD = re.compile(r"[0-9A-Za-z_\x80-\U0010FFFF]+")  # dieselbe Wortdefinition für Python-Code
+
+
+def normalize(record: dict) -> str:
+    """Vergleichstext eines Paares: instruction und output, kleingeschrieben."""
+    return "\n".join(str(record.get(field) or "") for field in TEXT_FIELDS).lower()
+
+
+def shingles(text: str, shingle_words: int = SHINGLE_WORDS) -> set:
+    """Shingle-Menge eines normalisierten Texts in Python (Referenz für Tests und Auswertungen)."""
+    words = WORD.findall(text)
+    if len(words) < shingle_words:
+        return {tuple(words)}
+    return {tuple(words[i:i + shingle_words]) for i in range(len(words) - shingle_words + 1)}
+
+
+def lsh_parameters(num_perm: int, threshold: float, recall: float = CANDIDATE_RECALL) -> tuple[int, int]:
+    """
+    Wählt Bänder × Zeilen (≤ num_perm) so, dass ein Paar mit Ähnlichkeit threshold mindestens mit
+    Wahrscheinlichkeit recall Kandidat wird (1 - (1 - s^r)^b), bei möglichst vielen Zeilen pro Band,
+    also möglichst wenigen unähnlichen Kandidaten.
+    """
+    for rows in range(num_perm, 0, -1):
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= recall:
+            return bands, rows
+    return num_perm, 1
+
+
+def mix64(x: np.ndarray) -> np.ndarray:
+    """splitmix64-Finalizer: verteilt die Bits eines uint64-Hashes gleichmäßig."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+class _PowerTable:
+    """Potenzen von POLY_BASE und seinem Inversen modulo 2**64, wächst bei Bedarf."""
+
+    def __init__(self):
+        self.powers = np.ones(1, dtype=np.uint64)
+        self.inverse = np.ones(1, dtype=np.uint64)
+
+    def get(self, n: int) -> tuple[np.ndarray, np.ndarray]:
+        if len(self.powers) <= n:
+            size = max(n + 1, 2 * len(self.powers))
+            one = np.ones(1, dtype=np.uint64)
+            self.powers = np.concatenate((one, np.cumprod(np.full(size - 1, POLY_BASE, dtype=np.uint64))))
+            self.inverse = np.concatenate((one, np.cumprod(np.full(size - 1, POLY_BASE_INV, dtype=np.uint64))))
+        return self.powers[:n + 1], self.inverse[:n + 1]
+
+
+class MinHasher:
+    """
+    Berechnet MinHash-Signaturen (uint32, num_perm Werte) für einen Batch normalisierter Texte.
+
+    Jedes Shingle wird einmal gehasht; die Permutationen sind Multiply-Shift-Hashfunktionen
+    (a * x + b) >> 32 mit zufälligen 64-Bit-Parametern aus seed.
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, shingle_words: int = SHINGLE_WORDS, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_words = shingle_words
+        self.a = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)
+        self._powers = _PowerTable()
+
+    def word_hashes(self, texts: List[str]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Hash jedes Worts aller Texte eines Batches (Texte hintereinander, Wörter in Textreihenfolge).
+
+        :return: (Worthashes, Anzahl Wörter pro Text)
+        """
+        encoded = [text.encode("utf-8") for text in texts]
+        data = np.frombuffer(b"\n".join(encoded), dtype=np.uint8)
+        n = len(data)
+        text_starts = np.zeros(len(texts), dtype=np.int64)
+        if len(texts) > 1:
+            np.cumsum(np.fromiter((len(e) + 1 for e in encoded[:-1]), dtype=np.int64, count=len(texts) - 1),
+                      out=text_starts[1:])
+
+        word = WORD_BYTES[data]
+        boundary = np.flatnonzero(np.diff(np.concatenate(([False], word, [False])).view(np.int8)))
+        word_starts, word_ends = boundary[0::2], boundary[1::2]
+
+        # Hash eines Bereichs [s, e) = (C[e] - C[s]) * BASE^-s mit C = Präfixsumme von data[j] * BASE^j
+        powers, inverse = self._powers.get(n)
+        prefix = np.zeros(n + 1, dtype=np.uint64)
+        np.cumsum(data * powers[:n], out=prefix[1:])
+        hashes = mix64((prefix[word_ends] - prefix[word_starts]) * inverse[word_starts])
+
+        words_per_text = np.bincount(np.searchsorted(text_starts, word_starts, side="right") - 1,
+                                     minlength=len(texts))
+        return hashes, words_per_text
+
+    def shingle_hashes(self, texts: List[str]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Hashes aller Shingles eines Batches, nach Text gruppiert. Ein Shingle sind k aufeinanderfolgende
+        Wörter; Trennzeichen dazwischen spielen keine Rolle.
+
+        :return: (Hashes, Startindex der Shingles jedes Texts); jeder Text hat mindestens ein Shingle
+                 (kürzere Texte: alle ihre Wörter, leere Texte: ein fester Wert)
+        """
+        words, words_per_text = self.word_hashes(texts)
+        k = self.shingle_words
+        first_word = np.concatenate(([0], np.cumsum(words_per_text)[:-1]))
+        shingles_per_text = np.maximum(words_per_text - k + 1, 1)
+        shingle_offsets = np.concatenate(([0], np.cumsum(shingles_per_text)[:-1]))
+
+        # Erstes Wort jedes Shingles: fortlaufend innerhalb eines Texts
+        text_of_shingle = np.repeat(np.arange(len(texts)), shingles_per_text)
+        start = first_word[text_of_shingle] + np.arange(len(text_of_shingle)) - shingle_offsets[text_of_shingle]
+        length = np.minimum(words_per_text[text_of_shingle], k)
+
+        hashes = np.zeros(len(start), dtype=np.uint64)
+        padded = np.concatenate((words, np.zeros(k, dtype=np.uint64)))
+        for j in range(k):
+            hashes = np.where(length > j, hashes * COMBINE_PRIME + padded[start + j], hashes)
+        return mix64(hashes), shingle_offsets
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        """MinHash-Signaturen, Form (len(texts), num_perm), dtype uint32."""
+        hashes, offsets = self.shingle_hashes(texts)
+        result = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        values = np.empty((PERM_CHUNK, len(hashes)), dtype=np.uint64)
+        shift = np.uint64(32)
+        for start in range(0, self.num_perm, PERM_CHUNK):
+            chunk = values[:min(PERM_CHUNK, self.num_perm - start)]
+            np.multiply(self.a[start:start + len(chunk), None], hashes[None, :], out=chunk)
+            chunk += self.b[start:start + len(chunk), None]
+            chunk >>= shift
+            result[:, start:start + len(chunk)] = np.minimum.reduceat(chunk, offsets, axis=1).T
+        return result
+
+
+def band_keys(signatures: np.ndarray, bands: int, rows: int) -> np.ndarray:
+    """
+    Ein 64-Bit-Schlüssel pro (Datensatz, Band) aus den ersten bands × rows Signaturwerten;
+    gleiche Bandwerte ⇒ gleicher Schlüssel. Die Bandnummer fließt ein, sodass sich alle
+    Bänder eine Tabelle teilen können.
+    """
+    count = len(signatures)
+    values = signatures[:, :bands * rows].reshape(count, bands, rows).astype(np.uint64)
+    keys = np.broadcast_to(np.arange(bands, dtype=np.uint64), (count, bands)).copy()
+    for j in range(rows):
+        keys = (keys ^ values[:, :, j]) * COMBINE_PRIME
+    return mix64(keys)
+
+
+class BandTable:
+    """
+    LSH-Buckets als sortierte NumPy-Arrays (Schlüssel → Index des behaltenen Datensatzes).
+
+    Neue Schlüssel werden in einen kleinen sortierten Lauf eingefügt, der ab MERGE_KEYS in den
+    großen einsortiert wird; Abfragen laufen vektorisiert per searchsorted über beide Läufe.
+    """
+
+    def __init__(self):
+        self.runs = [(np.empty(0, np.uint64), np.empty(0, np.uint32)),
+                     (np.empty(0, np.uint64), np.empty(0, np.uint32))]
+
+    def __len__(self) -> int:
+        return sum(len(keys) for keys, _ in self.runs)
+
+    def lookup(self, keys: np.ndarray) -> dict[int, set]:
+        """
+        :param keys: Band-Schlüssel, Form (Datensätze, Bänder)
+        :return: Zeile → Menge der Indizes behaltener Datensätze mit gemeinsamem Band
+        """
+        flat = keys.ravel()
+        found: dict[int, set] = {}
+        for run_keys, run_values in self.runs:
+            if not len(run_keys):
+                continue
+            left = np.searchsorted(run_keys, flat, side="left")
+            right = np.searchsorted(run_keys, flat, side="right")
+            for position in np.flatnonzero(right > left):
+                row = int(position) // keys.shape[1]
+                found.setdefault(row, set()).update(run_values[left[position]:right[position]].tolist())
+        return found
+
+    def insert(self, keys: np.ndarray, values: np.ndarray):
+        order = np.argsort(keys, kind="stable")
+        keys, values = keys[order], values[order]
+        small_keys, small_values = self.runs[1]
+        positions = np.searchsorted(small_keys, keys)
+        small_keys, small_values = np.insert(small_keys, positions, keys), np.insert(small_values, positions, values)
+        if len(small_keys) >= MERGE_KEYS:
+            big_keys, big_values = self.runs[0]
+            positions = np.searchsorted(big_keys, small_keys)
+            self.runs[0] = (np.insert(big_keys, positions, small_keys), np.insert(big_values, positions, small_values))
+            small_keys, small_values = np.empty(0, np.uint64), np.empty(0, np.uint32)
+        self.runs[1] = (small_keys, small_values)
+
+
+class SignatureStore:
+    """Signaturen der behaltenen Datensätze in einer Temp-Datei, gelesen per np.memmap."""
+
+    def __init__(self, num_perm: int):
+        self.num_perm = num_perm
+        self.count = 0
+        self._file = tempfile.TemporaryFile(prefix="minhash-")
+        self._map = None
+
+    def append(self, signatures: np.ndarray):
+        if not len(signatures):
+            return
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(np.ascontiguousarray(signatures, dtype=np.uint32).tobytes())
+        self._file.flush()
+        self.count += len(signatures)
+        self._map = np.memmap(self._file, dtype=np.uint32, mode="r", shape=(self.count, self.num_perm))
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        return self._map[index]
+
+    def close(self):
+        self._map = None
+        self._file.close()
+
+
+def iter_batches(f: BinaryIO, batch_size: int, stats: dict) -> Iterator[list[tuple[int, bytes, dict]]]:
+    """
+    Liest vollständige JSONL-Zeilen als (Byte-Offset, Zeile, Datensatz) in Batches.
+    Ungültige Zeilen werden gezählt und übersprungen, eine unvollständige letzte Zeile beendet das Lesen.
+    """
+    batch, position = [], 0
+    for line in f:
+        if not line.endswith(b"\n"):
+            stats["incomplete"] += 1
+            break
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            record = None
+        if isinstance(record, dict):
+            batch.append((position, line, record))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        else:
+            stats["invalid"] += 1
+        position += len(line)
+    if batch:
+        yield batch
+
+
+def deduplicate(input_path: Path, output_path: Path, clusters_path: Path, threshold: float = THRESHOLD,
+                num_perm: int = NUM_PERM, bands: int | None = None, shingle_words: int = SHINGLE_WORDS,
+                batch_size: int = BATCH_RECORDS, seed: int = 1) -> dict:
+    """
+    Schreibt die behaltenen Zeilen unverändert nach output_path und pro verworfenem Datensatz eine
+    Zeile {"id", "duplicate_of", "similarity"} nach clusters_path (beide atomar per os.replace).
+
+    :param bands: LSH-Bänder (Zeilen pro Band = num_perm // bands); None = aus threshold abgeleitet
+    :return: Statistik (records, kept, duplicates, clusters, invalid, incomplete, bands, rows, seconds)
+    """
+    if bands is None:
+        bands, rows = lsh_parameters(num_perm, threshold)
+    else:
+        rows = num_perm // bands
+        if not rows:
+            raise ValueError(f"bands ({bands}) darf nicht größer als num_perm ({num_perm}) sein")
+    hasher = MinHasher(num_perm, shingle_words, seed)
+    table = BandTable()
+    store = SignatureStore(num_perm)
+    kept_offsets = array("Q")  # Byte-Offset jedes behaltenen Datensatzes in der Eingabe
+    kept_ordinals = array("Q")
+    has_duplicates = bytearray()
+    stats = {"records": 0, "kept": 0, "duplicates": 0, "clusters": 0, "invalid": 0, "incomplete": 0,
+             "bands": bands, "rows": rows}
+    start_time = time.perf_counter()
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    clusters_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_output = output_path.with_name(output_path.name + ".tmp")
+    tmp_clusters = clusters_path.with_name(clusters_path.name + ".tmp")
+
+    with open(input_path, "rb") as src, open(input_path, "rb") as lookup, \
+            open(tmp_output, "wb") as out, open(tmp_clusters, "wb") as clusters:
+
+        def stored_key(kept_index: int) -> str:
+            lookup.seek(kept_offsets[kept_index])
+            return record_key(json.loads(lookup.readline()), kept_ordinals[kept_index])
+
+        for batch in iter_batches(src, batch_size, stats):
+            first_ordinal = stats["records"]
+            stats["records"] += len(batch)
+            signatures = hasher.signatures([normalize(record) for _, _, record in batch])
+            keys = band_keys(signatures, bands, rows)
+            earlier = table.lookup(keys)  # Kandidaten aus früheren Batches (Index behaltener Datensätze)
+            in_batch = _batch_collisions(keys)  # Kandidaten im selben Batch (Zeilen davor)
+
+            # Nur Zeilen mit Kandidaten werden einzeln entschieden, in Dateireihenfolge
+            kept = np.ones(len(batch), dtype=bool)
+            duplicate_of: dict[int, tuple[bool, int, float]] = {}  # Zeile → (aus Batch?, Zeile/Index, Ähnlichkeit)
+            for row in sorted(earlier.keys() | in_batch.keys()):
+                options = [(False, index, store[index]) for index in earlier.get(row, ())]
+                options += [(True, other, signatures[other]) for other in in_batch.get(row, ()) if kept[other]]
+                if not options:
+                    continue
+                similarity = np.count_nonzero(np.stack([sig for _, _, sig in options]) == signatures[row], axis=1)
+                best = int(np.argmax(similarity))
+                if similarity[best] >= threshold * num_perm:
+                    kept[row] = False
+                    local, target, _ = options[best]
+                    duplicate_of[row] = (local, target, similarity[best] / num_perm)
+
+            kept_rows = np.flatnonzero(kept)
+            batch_base = store.count
+            for row in kept_rows.tolist():
+                offset, line, _ = batch[row]
+                kept_offsets.append(offset)
+                kept_ordinals.append(first_ordinal + row)
+                out.write(line)
+            has_duplicates.extend(bytes(len(kept_rows)))
+
+            for row, (local, target, similarity) in duplicate_of.items():
+                if local:
+                    target_key = record_key(batch[target][2], first_ordinal + target)
+                    target = batch_base + int(np.searchsorted(kept_rows, target))
+                else:
+                    target_key = stored_key(target)
+                if not has_duplicates[target]:
+                    has_duplicates[target] = 1
+                    stats["clusters"] += 1
+                entry = {"id": record_key(batch[row][2], first_ordinal + row), "duplicate_of": target_key,
+                         "similarity": round(float(similarity), 4)}
+                clusters.write((json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8"))
+            stats["duplicates"] += len(duplicate_of)
+
+            if len(kept_rows):
+                store.append(signatures[kept_rows])
+                indices = np.arange(batch_base, batch_base + len(kept_rows), dtype=np.uint32)
+                table.insert(keys[kept_rows].ravel(), np.repeat(indices, bands))
+
+        for f in (out, clusters):
+            f.flush()
+            os.fsync(f.fileno())
+    store.close()
+    os.replace(tmp_output, output_path)
+    os.replace(tmp_clusters, clusters_path)
+
+    stats["kept"] = stats["records"] - stats["duplicates"]
+    stats["seconds"] = time.perf_counter() - start_time
+    return stats
+
+
+def _batch_collisions(keys: np.ndarray) -> dict[int, list[int]]:
+    """Zeile → frühere Zeilen desselben Batches mit mindestens einem gleichen Band-Schlüssel."""
+    flat = keys.ravel()
+    order = np.argsort(flat, kind="stable")  # stabil: innerhalb eines Schlüssels in Zeilenreihenfolge
+    sorted_keys = flat[order]
+    new_group = np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))
+    repeated = np.flatnonzero(~new_group)
+    if not len(repeated):
+        return {}
+    group_begin = np.flatnonzero(new_group)[np.cumsum(new_group) - 1]  # Gruppenanfang je Position
+    rows = (order // keys.shape[1]).tolist()
+    collisions: dict[int, set] = {}
+    for position, begin in zip(repeated.tolist(), group_begin[repeated].tolist()):
+        collisions.setdefault(rows[position], set()).update(rows[begin:position])
+    return {row: sorted(others - {row}) for row, others in collisions.items()}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Beinahe-Duplikate in QA-Paaren entfernen (MinHash/LSH)")
+    ap.add_argument("--input", type=Path, default=INPUT_FILE)
+    ap.add_argument("--output", type=Path, default=OUTPUT_FILE)
+    ap.add_argument("--clusters", type=Path, default=CLUSTERS_FILE)
+    ap.add_argument("--threshold", type=float, default=THRESHOLD, help="Mindestähnlichkeit (Jaccard, geschätzt)")
+    ap.add_argument("--num-perm", type=int, default=NUM_PERM)
+    ap.add_argument("--bands", type=int, help="LSH-Bänder (Standard: aus --threshold abgeleitet)")
+    ap.add_argument("--shingle-words", type=int, default=SHINGLE_WORDS)
+    ap.add_argument("--batch", type=int, default=BATCH_RECORDS, help="Datensätze pro Batch")
+    args = ap.parse_args()
+
+    print(f"🔎 Deduplizierung: {args.input} (Schwelle {args.threshold}, {args.num_perm} Permutationen, "
+          f"{args.shingle_words}-Wort-Shingles)")
+    stats = deduplicate(args.input, args.output, args.clusters, args.threshold, args.num_perm,
+                        args.bands, args.shingle_words, args.batch)
+    rate = stats["records"] / stats["seconds"] if stats["seconds"] else 0
+    print(f"✅ {stats['records']} Datensätze in {stats['seconds']:.1f} s ({rate:.0f}/s, "
+          f"LSH {stats['bands']}×{stats['rows']}): {stats['kept']} behalten, "
+          f"{stats['duplicates']} Duplikate in {stats['clusters']} Clustern")
+    if stats["invalid"] or stats["incomplete"]:
+        print(f"⚠️  {stats['invalid']} ungültige Zeilen übersprungen"
+              + (", letzte Zeile unvollständig" if stats["incomplete"] else ""))
+    print(f"📄 {args.output}\n📄 {args.clusters}")
+
+
+if __name__ == "__main__":
+    main()
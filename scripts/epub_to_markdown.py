@@ -8,6 +8,9 @@ Benötigte Pakete:
     pip install ebooklib beautifulsoup4 markdownify
 """
 
+import argparse
+import re
+from functools import partial
 from pathlib import Path
 
 import ebooklib
@@ -15,9 +18,14 @@ from bs4 import BeautifulSoup
 from ebooklib import epub
 from markdownify import markdownify as md
 
+from conversion_manifest import ConversionManifest, converter_version
+from find_duplicate_sources import exclude_duplicates
+from text_normalization import NON_PRINTABLE, Pipeline, Stage, StageTimings
+
 # ➡️  Ordnerpfade anpassen, falls nötig
 EPUB_FOLDER = "../data/epub"
 OUTPUT_FOLDER = "../data/markdown"
+CONVERTER_VERSION = "1"  # Erhöhen, wenn sich die erzeugte Markdown-Ausgabe ändert
 
 
 def convert_epub_to_markdown(epub_path: Path) -> str:
@@ -44,6 +52,25 @@ def convert_epub_to_markdown(epub_path: Path) -> str:
     return "\n\n---\n\n".join(markdown_parts)
 
 
+NUMBERED_ITEM = re.compile(r"(\d+\.)\s*")  # auf den Zeileninhalt ohne Einrückung angewendet
+LIST_START = ("-", "*")
+BLOCK_START = ("#", "-", "*")
+
+MD_LINK_OR_IMAGE = re.compile(r"(!?\[.*?\]\(.*?\))")
+MD_CODE = re.compile(r"`{1,3}(.*?)`{1,3}")
+MD_EMPHASIS = re.compile(r"[*_]{1,3}(.*?)?[*_]{1,3}")
+MD_HEADER_MARK = re.compile(r"#+ ")
+
+
+def _strip_markdown(text: str) -> str:
+    # Sehr einfache Markdown‑Entfernung
+    text = MD_LINK_OR_IMAGE.sub("", text)
+    text = MD_CODE.sub(r"\1", text)
+    text = MD_EMPHASIS.sub(r"\1", text)
+    text = MD_HEADER_MARK.sub("", text)
+    return text.strip()
+
+
 def clean_markdown(
         markdown_text: str,
         fix_spacing: bool = True,
@@ -52,107 +79,81 @@ def clean_markdown(
         remove_multiple_blanks: bool = True,
         extract_text: bool = False,
         remove_non_printable: bool = True,
+        timings: StageTimings | None = None,
 ) -> str:
     """
     Bereinigt Markdown‑Text mithilfe verschiedener Strategien.
 
-    Parameter siehe PDF‑Skript.
+    Parameter siehe PDF‑Skript; timings sammelt die Laufzeit pro Normalisierungsstufe.
+    """
+    stages = [NON_PRINTABLE] if remove_non_printable else []
+    stages.append(Stage("markdown_lines", partial(
+        fix_markdown_lines,
+        fix_spacing=fix_spacing,
+        standardize_headers=standardize_headers,
+        fix_lists=fix_lists,
+        remove_multiple_blanks=remove_multiple_blanks,
+        extract_text=extract_text,
+    )))
+    return Pipeline(stages, timings).run(markdown_text)
+
+
+def fix_markdown_lines(
+        markdown_text: str,
+        fix_spacing: bool,
+        standardize_headers: bool,
+        fix_lists: bool,
+        remove_multiple_blanks: bool,
+        extract_text: bool,
+) -> str:
+    """
+    Zeilenregeln von clean_markdown in einem Durchlauf über die Zeilen; die Zeile ohne
+    Einrückung wird dabei nur nach einer Änderung neu berechnet.
     """
-    import re
-    import unicodedata
-
-    def _remove_non_printable(s: str) -> str:
-        return "".join(
-            c for c in s if unicodedata.category(c)[0] != "C" or c in ("\n", "\t")
-        )
-
-    def _fix_header(line: str) -> str:
-        match = re.match(r"^(#+)(.*)$", line.lstrip())
-        if match:
-            hashes, content = match.groups()
-            return f"{hashes} {content.lstrip()}"
-        return line
-
-    def _fix_list_item(line: str) -> str:
-        indent = len(line) - len(line.lstrip())
-        content = line.lstrip()
-
-        match = re.match(r"^(\d+\.)\s*(.*)", content)  # nummerierte Liste
-        if match:
-            number, item = match.groups()
-            return " " * indent + f"{number} {item.strip()}"
-
-        match = re.match(r"^([-*])\s*(.*)", content)  # Bullet‑Liste
-        if match:
-            bullet, item = match.groups()
-            return " " * indent + f"{bullet} {item.strip()}"
-
-        return line
-
-    def _strip_markdown(text: str) -> str:
-        # Sehr einfache Markdown‑Entfernung
-        text = re.sub(r"(!?\[.*?\]\(.*?\))", "", text)
-        text = re.sub(r"`{1,3}(.*?)`{1,3}", r"\1", text)
-        text = re.sub(r"[*_]{1,3}(.*?)?[*_]{1,3}", r"\1", text)
-        text = re.sub(r"#+ ", "", text)
-        return text.strip()
-
-    if remove_non_printable:
-        markdown_text = _remove_non_printable(markdown_text)
-
-    lines = markdown_text.splitlines()
     cleaned_lines = []
-    prev_line = ""
+    prev_blank = True  # Leerzeilen am Textanfang entfallen
     in_list = False
-    i = 0
-
-    while i < len(lines):
-        line = lines[i]
 
+    for i, line in enumerate(markdown_text.splitlines()):
         if fix_spacing:
             line = line.rstrip()
+        content = line.lstrip()
+
+        if standardize_headers and content.startswith("#"):
+            level = len(content) - len(content.lstrip("#"))
+            line = content = f"{content[:level]} {content[level:].lstrip()}"
+
+        numbered = NUMBERED_ITEM.match(content)
+        is_list_item = fix_lists and (numbered is not None or content.startswith(LIST_START))
+        if is_list_item:
+            indent = " " * (len(line) - len(content))
+            if numbered:
+                line = f"{indent}{numbered.group(1)} {content[numbered.end():].strip()}"
+            else:
+                line = f"{indent}{content[0]} {content[1:].strip()}"
+            content = line.lstrip()
 
-        if standardize_headers and line.lstrip().startswith("#"):
-            line = _fix_header(line)
-
-        is_list_item = False
-        if fix_lists and (
-                line.lstrip().startswith(("- ", "* ", "-", "*"))
-                or re.match(r"^\s*\d+\.", line)
-        ):
-            line = _fix_list_item(line)
-            is_list_item = True
-
-        if remove_multiple_blanks:
-            if line.strip() == "" and prev_line.strip() == "":
-                i += 1
-                continue
-
-        if i > 0 and (
-                line.lstrip().startswith(("#", "-", "*")) or re.match(r"^\s*\d+\.", line)
-        ):
-            if cleaned_lines and cleaned_lines[-1].strip() != "":
-                if not (in_list and is_list_item):
-                    cleaned_lines.append("")
+        is_blank = not content
+        if remove_multiple_blanks and is_blank and prev_blank:
+            continue
+
+        if i > 0 and (numbered is not None or content.startswith(BLOCK_START)):
+            if cleaned_lines and cleaned_lines[-1].strip() and not (in_list and is_list_item):
+                cleaned_lines.append("")
 
         cleaned_lines.append(line)
-        prev_line = line
+        prev_blank = is_blank
         in_list = is_list_item
-        i += 1
 
     # trailing blanks
-    while cleaned_lines and cleaned_lines[-1].strip() == "":
+    while cleaned_lines and not cleaned_lines[-1].strip():
         cleaned_lines.pop()
-    cleaned_lines.append("")
-
-    final_text = "\n".join(cleaned_lines)
 
     if extract_text:
-        return "\n".join(
-            _strip_markdown(line) for line in final_text.splitlines() if line.strip()
-        )
+        return "\n".join(_strip_markdown(line) for line in cleaned_lines if line.strip())
 
-    return final_text
+    cleaned_lines.append("")
+    return "\n".join(cleaned_lines)
 
 
 def save_markdown(markdown_text: str, output_path: Path):
@@ -167,13 +168,14 @@ def save_markdown(markdown_text: str, output_path: Path):
         f.write(markdown_text)
 
 
-def process_all_epubs(input_dir: Path, output_dir: Path):
+def process_all_epubs(input_dir: Path, output_dir: Path, force: bool = False):
     """
     Durchläuft alle EPUB‑Dateien im Eingabeordner und konvertiert sie.
 
     Args:
         input_dir (Path): Verzeichnis mit EPUBs.
         output_dir (Path): Zielverzeichnis für Markdown.
+        force (bool): Auch unveränderte Dateien (laut Manifest) neu konvertieren.
     """
     if not input_dir.exists():
         print(f"❌ Eingabeordner nicht gefunden: {input_dir}")
@@ -185,30 +187,51 @@ def process_all_epubs(input_dir: Path, output_dir: Path):
     if not epub_files:
         print("⚠️  Keine EPUB‑Dateien gefunden.")
         return
+    epub_files = exclude_duplicates(epub_files)
+
+    manifest = ConversionManifest(
+        output_dir, "epub", converter_version(CONVERTER_VERSION, "EbookLib", "markdownify", "beautifulsoup4")
+    )
+    if not force:
+        pending = [p for p in epub_files if manifest.needs_conversion(p, output_dir / (p.stem + ".md"))]
+        if len(pending) < len(epub_files):
+            print(f"⏭️  {len(epub_files) - len(pending)} unveränderte EPUB‑Datei(en) übersprungen")
+        epub_files = pending
 
     print(f"📚 {len(epub_files)} EPUB‑Datei(en) werden verarbeitet...")
 
-    for epub_file in epub_files:
-        try:
-            print(f"🔄 Verarbeite: {epub_file.name}")
-            markdown = convert_epub_to_markdown(epub_file)
-            markdown = clean_markdown(markdown)
-            output_file = output_dir / (epub_file.stem + ".md")
-            save_markdown(markdown, output_file)
-            print(f"✅ Gespeichert: {output_file.name}")
-        except Exception as e:
-            print(f"❌ Fehler bei {epub_file.name}: {e}")
+    timings = StageTimings()
+    try:
+        for epub_file in epub_files:
+            try:
+                print(f"🔄 Verarbeite: {epub_file.name}")
+                markdown = convert_epub_to_markdown(epub_file)
+                markdown = clean_markdown(markdown, timings=timings)
+                output_file = output_dir / (epub_file.stem + ".md")
+                save_markdown(markdown, output_file)
+                manifest.record(epub_file, output_file)
+                print(f"✅ Gespeichert: {output_file.name}")
+            except Exception as e:
+                print(f"❌ Fehler bei {epub_file.name}: {e}")
+    finally:
+        manifest.save()
+    print(timings.report())
 
 
 def main():
     """
     Einstiegspunkt für die Massenkonvertierung.
     """
+    ap = argparse.ArgumentParser(description="Konvertiert EPUB-Dateien nach Markdown.")
+    ap.add_argument("--force", action="store_true",
+                    help="Alle Dateien neu konvertieren, auch wenn sie laut Manifest unverändert sind")
+    args = ap.parse_args()
+
     input_dir = Path(EPUB_FOLDER)
     output_dir = Path(OUTPUT_FOLDER)
 
     print("🚀 Starte EPUB → Markdown Konvertierung")
-    process_all_epubs(input_dir, output_dir)
+    process_all_epubs(input_dir, output_dir, force=args.force)
     print("🏁 Konvertierung abgeschlossen.")
 
 
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Findet byte-identische Quelldokumente in data/pdf, data/epub und data/rtf, bevor sie konvertiert
+und an das LLM geschickt werden.
+
+Vorgehen (die meisten Dateien werden nie vollständig gelesen):
+1. Dateigröße – nur Dateien mit gleicher Größe können identisch sein.
+2. Hash der ersten PREFIX_BYTES – trennt gleich große, verschiedene Dateien billig.
+3. Vollständiger MD5 – nur für die verbleibenden Kandidaten.
+Gehasht wird parallel in Threads (hashlib gibt bei großen Blöcken den GIL frei). Vollständige
+Hashes des letzten Laufs werden bei unveränderter Größe und mtime wiederverwendet.
+
+Der Bericht (data/duplicates.json) enthält pro Duplikatgruppe die behaltene Datei und die übrigen
+sowie eine Skip-Liste, die die Konverter beachten. Gleichnamige Dateien in verschiedenen Formaten
+(z.B. buch.pdf und buch.epub) werden nur gemeldet: sie sind nicht byte-gleich, würden aber
+dieselbe Markdown-Datei schreiben.
+
+Beispiel:
+    python find_duplicate_sources.py
+    python find_duplicate_sources.py --threads 16
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from hashlib import md5
+from pathlib import Path
+from typing import Iterable, List
+
+DATA_FOLDER = Path("../data")
+SOURCE_FOLDERS = {"pdf": "*.pdf", "epub": "*.epub", "rtf": "*.rtf"}  # Unterordner → Muster wie in den Konvertern
+REPORT_FILE = DATA_FOLDER / "duplicates.json"
+
+PREFIX_BYTES = 64 * 1024
+CHUNK_BYTES = 1 << 20
+DEFAULT_THREADS = min(16, (os.cpu_count() or 4) * 2)
+
+
+def hash_prefix(path: Path) -> str:
+    with open(path, "rb") as f:
+        return md5(f.read(PREFIX_BYTES)).hexdigest()
+
+
+def hash_file(path: Path) -> str:
+    """Vollständiger MD5, blockweise gelesen."""
+    hash_md5 = md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_BYTES), b""):
+            hash_md5.update(chunk)
+    return hash_md5.hexdigest()
+
+
+def relative_name(path: Path, base: Path) -> str:
+    try:
+        return path.resolve().relative_to(base.resolve()).as_posix()
+    except ValueError:
+        return str(path.resolve())
+
+
+def collect_sources(data_dir: Path) -> List[Path]:
+    files = []
+    for folder, pattern in SOURCE_FOLDERS.items():
+        files += sorted((data_dir / folder).glob(pattern))
+    return [f for f in files if f.is_file()]
+
+
+def _load_report(report_path: Path) -> dict:
+    try:
+        with open(report_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _hash_groups(groups: Iterable[List[Path]], fn, threads: int) -> tuple[List[List[Path]], dict[Path, str]]:
+    """
+    Teilt Gruppen nach fn(Datei) auf (parallel).
+
+    :return: Teilgruppen mit ≥ 2 Dateien, berechnete Hashes
+    """
+    groups = [g for g in groups if len(g) > 1]
+    files = [f for g in groups for f in g]
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        hashes = dict(zip(files, pool.map(fn, files)))
+    result = []
+    for group in groups:
+        split = defaultdict(list)
+        for f in group:
+            split[hashes[f]].append(f)
+        result += [g for g in split.values() if len(g) > 1]
+    return result, hashes
+
+
+def find_duplicates(data_dir: Path = DATA_FOLDER, report_path: Path = REPORT_FILE,
+                    threads: int = DEFAULT_THREADS) -> dict:
+    """
+    Sucht byte-identische Quelldateien und schreibt den Bericht atomar nach report_path.
+
+    :return: Bericht (groups, skip, name_conflicts, files, stats)
+    """
+    start = time.perf_counter()
+    previous = _load_report(report_path).get("files", {})
+    base = report_path.parent
+    sources = collect_sources(data_dir)
+    file_stats = {f: f.stat() for f in sources}
+
+    by_size = defaultdict(list)
+    for f in sources:
+        by_size[file_stats[f].st_size].append(f)
+    same_size = [g for g in by_size.values() if len(g) > 1]
+
+    # Kleine Dateien sind mit dem Präfix bereits vollständig gehasht
+    small = [g for g in same_size if file_stats[g[0]].st_size <= PREFIX_BYTES]
+    large = [g for g in same_size if file_stats[g[0]].st_size > PREFIX_BYTES]
+    candidates, _ = _hash_groups(large, hash_prefix, threads)
+    prefix_hashed = sum(len(g) for g in large)
+
+    # Vollständige Hashes des letzten Laufs übernehmen, solange Größe und mtime gleich sind
+    cached = {}
+    for f in (f for g in small + candidates for f in g):
+        stat, entry = file_stats[f], previous.get(relative_name(f, base), {})
+        if entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            cached[f] = entry["md5"]
+    duplicates, full_hashes = _hash_groups(small + candidates, lambda f: cached.get(f) or hash_file(f), threads)
+    reused = len(cached)
+
+    # Behalten wird je Gruppe die Datei im ersten Ordner (pdf, epub, rtf) mit dem kürzesten Namen,
+    # also eher "buch.pdf" als "buch (1).pdf"
+    folder_rank = {folder: i for i, folder in enumerate(SOURCE_FOLDERS)}
+    order = {f: (folder_rank.get(f.parent.name, len(folder_rank)), len(f.name), f.name) for f in sources}
+    groups, skip = [], []
+    for group in sorted((sorted(g, key=order.get) for g in duplicates), key=lambda g: order[g[0]]):
+        keep, *others = group
+        groups.append({
+            "md5": full_hashes[keep],
+            "size": file_stats[keep].st_size,
+            "keep": relative_name(keep, base),
+            "duplicates": [relative_name(f, base) for f in others],
+        })
+        skip += [relative_name(f, base) for f in others]
+
+    by_stem = defaultdict(list)
+    for f in sources:
+        by_stem[f.stem].append(relative_name(f, base))
+    skipped = set(skip)
+    name_conflicts = [{"stem": stem, "files": files} for stem, files in sorted(by_stem.items())
+                      if len([f for f in files if f not in skipped]) > 1]
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "groups": groups,
+        "skip": skip,
+        "name_conflicts": name_conflicts,
+        "files": {
+            relative_name(path, base): {"size": file_stats[path].st_size,
+                                        "mtime_ns": file_stats[path].st_mtime_ns, "md5": digest}
+            for path, digest in sorted(full_hashes.items())
+        },
+        "stats": {
+            "files": len(sources),
+            "prefix_hashed": prefix_hashed,
+            "full_hashed": len(full_hashes) - reused,
+            "reused": reused,
+            "seconds": round(time.perf_counter() - start, 3),
+        },
+    }
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = report_path.with_name(report_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, report_path)
+    return report
+
+
+def _unchanged(path: Path, entry: dict) -> bool:
+    """True, wenn path noch mit Größe und mtime aus dem Bericht existiert."""
+    try:
+        stat = path.stat()
+    except OSError:
+        return False
+    return entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns
+
+
+def exclude_duplicates(files: List[Path], report_path: Path = REPORT_FILE) -> List[Path]:
+    """
+    Entfernt Dateien, die laut Duplikatbericht übersprungen werden sollen. Eine Datei wird nur
+    übersprungen, solange sie selbst und die behaltene Datei ihrer Gruppe noch mit Größe und
+    mtime dem Stand des Berichts entsprechen; wurde die behaltene Datei gelöscht, verschoben
+    oder geändert, werden die Duplikate wieder konvertiert.
+    """
+    report = _load_report(report_path)
+    skip = set(report.get("skip", ()))
+    if not skip:
+        return files
+    base, entries = report_path.parent, report.get("files", {})
+    keep_of = {name: group["keep"] for group in report.get("groups", ()) for name in group["duplicates"]}
+    keep_valid: dict[str, bool] = {}
+    kept, skipped, stale = [], 0, 0
+    for f in files:
+        name = relative_name(f, base)
+        if name not in skip:
+            kept.append(f)
+            continue
+        keep = keep_of.get(name)
+        if keep is not None and keep not in keep_valid:
+            keep_valid[keep] = _unchanged(base / keep, entries.get(keep, {}))
+        if keep_valid.get(keep) and _unchanged(f, entries.get(name, {})):
+            skipped += 1
+        else:
+            stale += 1
+            kept.append(f)
+    if skipped:
+        print(f"⏭️  {skipped} Duplikat(e) laut {report_path.name} übersprungen")
+    if stale:
+        print(f"⚠️  {stale} Datei(en) seit dem Duplikatbericht verändert – bitte find_duplicate_sources.py "
+              f"erneut ausführen")
+    return kept
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Findet byte-identische Quelldokumente (PDF/EPUB/RTF).")
+    ap.add_argument("--data-dir", type=Path, default=DATA_FOLDER)
+    ap.add_argument("--report", type=Path, default=REPORT_FILE)
+    ap.add_argument("--threads", type=int, default=DEFAULT_THREADS)
+    args = ap.parse_args()
+
+    if args.threads <= 0:
+        ap.error("--threads muss positiv sein")
+
+    report = find_duplicates(args.data_dir, args.report, args.threads)
+    stats = report["stats"]
+    print(f"🔍 {stats['files']} Quelldateien in {stats['seconds']:.2f} s geprüft: "
+          f"{stats['prefix_hashed']} Präfix-Hashes, {stats['full_hashed']} vollständige Hashes "
+          f"({stats['reused']} aus dem letzten Lauf übernommen)")
+    for group in report["groups"]:
+        print(f"♻️  {group['keep']} ({group['size'] / 1_000_000:.1f} MB)")
+        for name in group["duplicates"]:
+            print(f"     = {name} → wird übersprungen")
+    for conflict in report["name_conflicts"]:
+        print(f"⚠️  Gleicher Name, verschiedener Inhalt: {', '.join(conflict['files'])} "
+              f"(schreiben dieselbe {conflict['stem']}.md)")
+    if not report["groups"]:
+        print("✅ Keine Duplikate gefunden.")
+    print(f"📄 Bericht: {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,47 @@
+import argparse
+import json
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from hashlib import md5
 from datetime import datetime, timezone
 import fitz  # PyMuPDF
-import json
 
 PDF_FOLDER = "../data/pdf"
 OUTPUT_FILE = "../data/markdown/metadata.jsonl"
 
 DEFAULT_SOURCE = "Unbekannt"
 DEFAULT_LICENSE = "Unbekannt"
+DEFAULT_WORKERS = os.cpu_count() or 1
 
-def compute_md5(path: Path) -> str:
-    """
-    Berechnet den MD5-Hash einer Datei.
-    """
-    hash_md5 = md5()
-    with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
+# Von Hand gepflegte Felder, die bei einer erneuten Extraktion erhalten bleiben
+MANUAL_FIELDS = ("source", "license")
 
 
 def extract_pdf_metadata(path: Path) -> dict:
     """
-    Extrahiert Metadaten aus einer PDF-Datei.
+    Extrahiert Metadaten aus einer PDF-Datei. Die Datei wird per mmap einmal gelesen:
+    derselbe Puffer dient für den MD5-Hash und als Eingabe für PyMuPDF.
     """
-    doc = fitz.open(path)
-    meta = doc.metadata
+    stat = path.stat()
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        file_hash = md5(buffer).hexdigest()
+        with memoryview(buffer) as view:
+            doc = fitz.open(stream=view, filetype="pdf")
+            try:
+                meta = doc.metadata or {}
+                num_pages = doc.page_count
+            finally:
+                doc.close()
 
     return {
         "filename": path.name,
         "file_path": str(path),
-        "file_hash_md5": compute_md5(path),
-        "num_pages": doc.page_count,
+        "file_hash_md5": file_hash,
+        "file_size": stat.st_size,
+        "file_mtime_ns": stat.st_mtime_ns,
+        "num_pages": num_pages,
         "title": meta.get("title") or "",
         "author": meta.get("author") or "",
         "subject": meta.get("subject") or "",
@@ -43,28 +52,113 @@ def extract_pdf_metadata(path: Path) -> dict:
     }
 
 
-def main():
-    input_dir = Path(PDF_FOLDER)
-    output_path = Path(OUTPUT_FILE)
-    pdf_files = list(input_dir.glob("*.pdf"))
+def _extract(path: Path) -> tuple[Path, dict | None, str | None]:
+    try:
+        return path, extract_pdf_metadata(path), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def load_existing(output_path: Path) -> dict[str, dict]:
+    """
+    Bisherige Einträge nach Dateiname.
+    """
+    entries = {}
+    if not output_path.exists():
+        return entries
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+                entries[entry["filename"]] = entry
+            except (json.JSONDecodeError, KeyError, TypeError):
+                continue
+    return entries
+
+
+def is_unchanged(entry: dict | None, path: Path) -> bool:
+    if entry is None:
+        return False
+    stat = path.stat()
+    return entry.get("file_size") == stat.st_size and entry.get("file_mtime_ns") == stat.st_mtime_ns
+
+
+def write_metadata(output_path: Path, entries: dict[str, dict]):
+    """
+    Schreibt alle Einträge nach Dateinamen sortiert (stabile Reihenfolge) atomar neu.
+    """
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as out_f:
+        for filename in sorted(entries):
+            out_f.write(json.dumps(entries[filename], ensure_ascii=False) + "\n")
+    os.replace(tmp_path, output_path)
 
+
+def update_metadata(input_dir: Path, output_path: Path, workers: int = DEFAULT_WORKERS, force: bool = False):
+    """
+    Aktualisiert metadata.jsonl inkrementell: nur neue oder geänderte PDFs (Größe/mtime) werden
+    gelesen, parallel in Worker-Prozessen. Handgepflegte Felder (MANUAL_FIELDS) bleiben erhalten,
+    Einträge gelöschter PDFs entfallen.
+    """
+    pdf_files = sorted(input_dir.glob("*.pdf"))
     if not pdf_files:
         print("⚠️ Keine PDF-Dateien gefunden.")
         return
 
-    print(f"📊 {len(pdf_files)} PDF-Dateien gefunden. Starte Metadaten-Extraktion...")
+    existing = load_existing(output_path)
+    pending = [p for p in pdf_files if force or not is_unchanged(existing.get(p.name), p)]
+    entries = {p.name: existing[p.name] for p in pdf_files if p.name in existing}
+    removed = len(existing.keys() - {p.name for p in pdf_files})
 
-    with open(output_path, "w", encoding="utf-8") as out_f:
-        for pdf_path in pdf_files:
-            try:
-                print(f"🔍 Analysiere: {pdf_path.name}")
-                meta = extract_pdf_metadata(pdf_path)
-                out_f.write(json.dumps(meta, ensure_ascii=False) + "\n")
-                print(f"✅ Metadaten geschrieben: {pdf_path.name}")
-            except Exception as e:
-                print(f"❌ Fehler bei {pdf_path.name}: {e}")
-
-    print(f"✅ Metadaten gespeichert in: {output_path}")
+    print(f"📊 {len(pdf_files)} PDF-Dateien gefunden, {len(pdf_files) - len(pending)} unverändert. "
+          f"Starte Metadaten-Extraktion für {len(pending)}...")
+
+    failed = 0
+    if pending:
+        if workers > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+                results = pool.map(_extract, pending, chunksize=max(1, len(pending) // (workers * 4)))
+                for path, meta, error in results:
+                    failed += _merge(entries, path, meta, error)
+        else:
+            for path in pending:
+                failed += _merge(entries, *_extract(path))
+
+    if pending or removed:
+        write_metadata(output_path, entries)
+    if removed:
+        print(f"🗑️  {removed} Einträge entfernt (PDF nicht mehr vorhanden)")
+    print(f"✅ Metadaten gespeichert in: {output_path} ({len(pending) - failed} aktualisiert, {failed} Fehler)")
+
+
+def _merge(entries: dict[str, dict], path: Path, meta: dict | None, error: str | None) -> int:
+    if error is not None:
+        print(f"❌ Fehler bei {path.name}: {error}")
+        return 1
+    previous = entries.get(path.name)
+    if previous is not None:
+        for field in MANUAL_FIELDS:
+            if previous.get(field) not in (None, "", DEFAULT_SOURCE, DEFAULT_LICENSE):
+                meta[field] = previous[field]
+    entries[path.name] = meta
+    print(f"✅ Metadaten geschrieben: {path.name}")
+    return 0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Extrahiert Metadaten aus PDF-Dateien nach metadata.jsonl.")
+    ap.add_argument("--input-dir", default=PDF_FOLDER)
+    ap.add_argument("--output", default=OUTPUT_FILE)
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                    help="Anzahl paralleler Worker-Prozesse (1 = seriell)")
+    ap.add_argument("--force", action="store_true", help="Alle PDFs neu auslesen")
+    args = ap.parse_args()
+
+    if args.workers <= 0:
+        ap.error("--workers muss positiv sein")
+
+    update_metadata(Path(args.input_dir), Path(args.output), args.workers, args.force)
 
 
 if __name__ == "__main__":
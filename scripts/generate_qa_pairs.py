@@ -1,25 +1,47 @@
+import argparse
+import asyncio
 import json
+import math
 import uuid
 import httpx
 import hashlib
+from collections import deque
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import List
+from typing import Iterator, List, Tuple
+
+import numpy as np
 from tiktoken import encoding_for_model
 
+from jsonl_writer import JsonlWriter
+from llm_cache import ResponseCache
+from markdown_chunker import chunk_markdown
+from metadata_index import MetadataIndex
+from qa_progress import ProgressLedger
+
 # Pfade und API-Endpunkt
 MARKDOWN_FOLDER = Path("../data/markdown")
 METADATA_FILE = Path("../data/markdown/metadata.jsonl")
 OUTPUT_FILE = Path("../data/generated/qa_pairs.jsonl")
+PROGRESS_FILE = Path("../data/generated/qa_progress.jsonl")
+CACHE_FILE = Path("../data/generated/llm_cache.sqlite")
 LMSTUDIO_API = "http://localhost:1234/v1/chat/completions"
 
 # LLM-Konfiguration
 MODEL = "qwen/qwen3-4b"
 TEMPERATURE = 0.8
 MAX_TOKENS = 32768  # Maximale Tokenanzahl der Ausgabe
-WINDOW_TOKENS = 2048  # Sliding Window Größe
+WINDOW_TOKENS = 2048  # Sliding Window Größe bzw. maximale Segmentgröße
 STRIDE_TOKENS = 1024  # Schrittweite für Sliding Window
+CHUNKING = "structure"  # "structure" = an Überschriften/§-Marken packen, "window" = reines Sliding Window
 HEADERS = {"Content-Type": "application/json"}
+REQUEST_TIMEOUT = 120.0  # Sekunden pro LLM-Anfrage
+MAX_IN_FLIGHT = 8  # Gleichzeitige Segmente im Async-Modus
+CACHE_MAX_MB = 512  # Maximale Größe des Antwort-Caches
+
+# Antwort-Cache (wird in main() geöffnet, None = deaktiviert)
+response_cache: ResponseCache | None = None
 
 # Debug-Modus
 DEBUG = True
@@ -46,43 +68,82 @@ def detokenize(tokens: List[int]) -> str:
     return tokenizer.decode(tokens)
 
 
-def sliding_windows(text: str, window_size: int, stride: int) -> List[str]:
+@lru_cache(maxsize=None)
+def token_char_tables() -> Tuple[np.ndarray, np.ndarray]:
     """
-    Erzeugt überlappende Textfenster basierend auf Tokenlängen (Sliding-Window-Prinzip).
+    Lookup-Tabellen pro Token-ID (einmalig pro Prozess berechnet):
+    - Anzahl der UTF-8-Zeichen, die im Token beginnen
+    - 1, wenn das Token mitten in einem UTF-8-Zeichen beginnt (Folgebyte 0x80–0xBF)
+    """
+    char_counts = np.zeros(tokenizer.n_vocab, dtype=np.uint32)
+    starts_mid_char = np.zeros(tokenizer.n_vocab, dtype=np.uint8)
+    for token_id in range(tokenizer.n_vocab):
+        try:
+            token_bytes = tokenizer.decode_single_token_bytes(token_id)
+        except KeyError:
+            continue  # Lücke im Vokabular
+        char_counts[token_id] = sum(1 for byte in token_bytes if not 0x80 <= byte < 0xC0)
+        starts_mid_char[token_id] = bool(token_bytes) and 0x80 <= token_bytes[0] < 0xC0
+    return char_counts, starts_mid_char
+
+
+def token_char_offsets(text: str) -> np.ndarray:
+    """
+    Tokenisiert den Text genau einmal und liefert die Zeichen-Offsets aller Tokengrenzen
+    (Länge Tokenanzahl + 1) als kompaktes uint32-Array.
+
+    Die Offsets werden allein über die Lookup-Tabellen berechnet, es wird nichts dekodiert.
+    Beginnt ein Token mitten in einem UTF-8-Zeichen, zeigt sein Offset auf dieses Zeichen.
+    """
+    token_ids = tokenizer.encode_to_numpy(text)
+    char_counts, starts_mid_char = token_char_tables()
+
+    offsets = np.empty(len(token_ids) + 1, dtype=np.uint32)
+    offsets[0] = 0
+    np.cumsum(char_counts[token_ids], out=offsets[1:])
+    offsets[:-1] -= starts_mid_char[token_ids]
+    return offsets
+
+
+def count_windows(num_tokens: int, window_size: int, stride: int) -> int:
+    """
+    Anzahl der Fenster, die sliding_windows für num_tokens Tokens erzeugt.
     """
-    token_ids = tokenize(text)
-    windows = []
+    if num_tokens == 0:
+        return 0
+    return 1 + math.ceil(max(0, num_tokens - window_size) / stride)
+
+
+def window_spans(offsets: np.ndarray, window_size: int, stride: int) -> Iterator[Tuple[int, int]]:
+    """
+    Liefert die Zeichenbereiche (start, ende) der Sliding-Window-Fenster über den Token-Offsets.
+    """
+    num_tokens = len(offsets) - 1
     i = 0
-    while i < len(token_ids):
-        chunk = token_ids[i:i + window_size]
-        windows.append(detokenize(chunk))
-        if i + window_size >= len(token_ids):
+    while i < num_tokens:
+        yield int(offsets[i]), int(offsets[min(i + window_size, num_tokens)])
+        if i + window_size >= num_tokens:
             break
         i += stride
-    return windows
 
 
-def load_metadata() -> dict:
+def sliding_windows(text: str, window_size: int, stride: int) -> Iterator[str]:
     """
-    Lädt die Metadaten aus einer JSONL-Datei und erstellt ein Mapping nach Dateinamen.
+    Erzeugt überlappende Textfenster basierend auf Tokenlängen (Sliding-Window-Prinzip).
+
+    Die Fenster werden lazy direkt aus dem Originaltext geschnitten, statt jedes Fenster
+    aus seinen Token-IDs zurückzudekodieren.
     """
-    if not METADATA_FILE.exists():
-        print("⚠️  Metadaten-Datei nicht gefunden!")
-        return {}
-    metadata = {}
-    with open(METADATA_FILE, "r", encoding="utf-8") as f:
-        for line in f:
-            data = json.loads(line)
-            metadata[data["filename"]] = data
-    return metadata
+    offsets = token_char_offsets(text)
+    for start, end in window_spans(offsets, window_size, stride):
+        yield text[start:end]
 
 
-def call_llm(prompt: str) -> dict:
+def build_payload(prompt: str) -> dict:
     """
-    Sendet einen Prompt an das lokal laufende Sprachmodell (LM Studio) und erwartet strukturierte JSON-Antwort.
-    Zusätzlich wird der tatsächliche Tokenverbrauch überwacht.
+    Erstellt den Request-Body für den /v1/chat/completions-Endpunkt.
     """
-    payload = {
+    return {
         "model": MODEL,
         "temperature": TEMPERATURE,
         "max_tokens": MAX_TOKENS,
@@ -92,35 +153,231 @@ def call_llm(prompt: str) -> dict:
         ]
     }
 
+
+def parse_llm_response(raw: dict) -> dict:
+    """
+    Extrahiert die strukturierte JSON-Antwort aus der Chat-Completion und protokolliert den Tokenverbrauch.
+    """
+    content = raw["choices"][0]["message"]["content"]
+    usage = raw.get("usage", {})
+
+    if DEBUG:
+        print(f"🧪 Tokenverbrauch (Prompt/Input): {usage.get('prompt_tokens')} Tokens")
+        print(f"🧪 Tokenverbrauch (Output): {usage.get('completion_tokens')} Tokens")
+        print(f"🧪 Gesamt: {usage.get('total_tokens')} Tokens")
+
+    # Entferne evtl. <think> Wrapper
+    if "<think>" in content:
+        content = content.split("<think>")[-1]
+    if "</think>" in content:
+        content = content.split("</think>")[0]
+
+    start = content.find("{")
+    end = content.rfind("}") + 1
+    json_str = content[start:end]
+
+    return json.loads(json_str)
+
+
+def cache_key(prompt: str) -> str:
+    return ResponseCache.make_key(MODEL, TEMPERATURE, MAX_TOKENS, prompt)
+
+
+def cache_lookup(prompt: str) -> dict | None:
+    """
+    Liefert eine bereits gespeicherte Antwort für diesen Prompt (inkl. Modellparameter) oder None.
+    """
+    if response_cache is None:
+        return None
+    cached = response_cache.get(cache_key(prompt))
+    if cached is not None:
+        debug_print("🗃️  Antwort aus dem Cache")
+    return cached
+
+
+def cache_store(prompt: str, llm_response: dict):
+    # Fehlgeschlagene Aufrufe ({}) werden nicht gecacht
+    if response_cache is not None and llm_response:
+        response_cache.put(cache_key(prompt), llm_response)
+
+
+def call_llm(prompt: str) -> dict:
+    """
+    Sendet einen Prompt an das lokal laufende Sprachmodell (LM Studio) und erwartet strukturierte JSON-Antwort.
+    Zusätzlich wird der tatsächliche Tokenverbrauch überwacht.
+    """
+    cached = cache_lookup(prompt)
+    if cached is not None:
+        return cached
+
     try:
-        response = httpx.post(LMSTUDIO_API, headers=HEADERS, json=payload, timeout=120.0)
+        response = httpx.post(LMSTUDIO_API, headers=HEADERS, json=build_payload(prompt), timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
-        raw = response.json()
+        llm_response = parse_llm_response(response.json())
 
-        content = raw["choices"][0]["message"]["content"]
-        usage = raw.get("usage", {})
+    except Exception as e:
+        print(f"❌ Fehler beim LLM-Aufruf: {e}")
+        return {}
 
-        if DEBUG:
-            print(f"🧪 Tokenverbrauch (Prompt/Input): {usage.get('prompt_tokens')} Tokens")
-            print(f"🧪 Tokenverbrauch (Output): {usage.get('completion_tokens')} Tokens")
-            print(f"🧪 Gesamt: {usage.get('total_tokens')} Tokens")
+    cache_store(prompt, llm_response)
+    return llm_response
 
-        # Entferne evtl. <think> Wrapper
-        if "<think>" in content:
-            content = content.split("<think>")[-1]
-        if "</think>" in content:
-            content = content.split("</think>")[0]
 
-        start = content.find("{")
-        end = content.rfind("}") + 1
-        json_str = content[start:end]
+async def call_llm_async(client: httpx.AsyncClient, prompt: str) -> dict:
+    """
+    Asynchrone Variante von call_llm über einen gemeinsam genutzten httpx.AsyncClient (Connection-Pool).
+    """
+    cached = cache_lookup(prompt)
+    if cached is not None:
+        return cached
 
-        return json.loads(json_str)
+    try:
+        response = await client.post(LMSTUDIO_API, headers=HEADERS, json=build_payload(prompt))
+        response.raise_for_status()
+        llm_response = parse_llm_response(response.json())
 
     except Exception as e:
         print(f"❌ Fehler beim LLM-Aufruf: {e}")
         return {}
 
+    cache_store(prompt, llm_response)
+    return llm_response
+
+
+def structure_segments(text: str) -> List[str]:
+    """
+    Strukturbewusste Segmente: Überschriften, Tabellen und §/Art./Rn.-Einheiten werden greedy bis
+    WINDOW_TOKENS gepackt; nur zu lange Einzelblöcke werden per Sliding Window überlappend geteilt.
+    """
+    return chunk_markdown(
+        text,
+        max_tokens=WINDOW_TOKENS,
+        count_tokens=lambda s: len(tokenizer.encode(s)),
+        split_oversized=lambda s: sliding_windows(s, window_size=WINDOW_TOKENS, stride=STRIDE_TOKENS),
+    )
+
+
+def segmentation_key() -> str:
+    """
+    Kennung der aktuellen Segmentierung. Sie ist Teil des Fortschrittsschlüssels, damit geänderte
+    Fenster-/Schrittweiten nur die betroffenen Einträge ungültig machen.
+    """
+    if CHUNKING == "structure":
+        return f"structure,window={WINDOW_TOKENS},stride={STRIDE_TOKENS}"
+    return f"window={WINDOW_TOKENS},stride={STRIDE_TOKENS}"
+
+
+def iter_segments(ledger: ProgressLedger) -> Iterator[Tuple[Path, str, int, int, str]]:
+    """
+    Liefert alle noch offenen Segmente aller Markdown-Dateien in fester Reihenfolge
+    als Tupel (Datei, Datei-Hash, Segmentindex, Segmentanzahl, Segmenttext).
+    Bereits im Fortschrittsjournal abgeschlossene Segmente werden übersprungen.
+    """
+    segmentation = segmentation_key()
+    total_segments = total_windows = 0
+    for md_path in sorted(MARKDOWN_FOLDER.glob("*.md")):
+        raw = md_path.read_bytes()
+        file_hash = hashlib.md5(raw).hexdigest()
+        if ledger.is_file_done(file_hash, segmentation):
+            print(f"⏭️  Bereits vollständig verarbeitet: {md_path.name}")
+            continue
+
+        print(f"📄 Verarbeite Datei: {md_path.name}")
+        text = raw.decode("utf-8")
+        offsets = token_char_offsets(text)
+        windows = count_windows(len(offsets) - 1, WINDOW_TOKENS, STRIDE_TOKENS)
+
+        if CHUNKING == "structure":
+            segments = structure_segments(text)
+            total = len(segments)
+            print(f"🧩 {total} strukturierte Segmente statt {windows} Sliding-Window-Segmenten "
+                  f"({reduction(total, windows)})")
+        else:
+            segments = (text[start:end] for start, end in window_spans(offsets, WINDOW_TOKENS, STRIDE_TOKENS))
+            total = windows
+        total_segments += total
+        total_windows += windows
+
+        skipped = 0
+        for i, segment in enumerate(segments):
+            if ledger.is_done(file_hash, segmentation, i):
+                skipped += 1
+                continue
+            yield md_path, file_hash, i, total, segment
+        if skipped:
+            print(f"⏭️  {skipped} bereits abgeschlossene Segmente übersprungen: {md_path.name}")
+
+    if CHUNKING == "structure" and total_windows:
+        print(f"🧩 Gesamt: {total_segments} strukturierte Segmente statt {total_windows} "
+              f"Sliding-Window-Segmenten ({reduction(total_segments, total_windows)})")
+
+
+def reduction(segments: int, windows: int) -> str:
+    if not windows:
+        return "±0 %"
+    return f"{(segments - windows) / windows * 100:+.1f} %"
+
+
+def store_qa_pairs(writer: JsonlWriter, llm_response: dict, md_path: Path, file_hash: str,
+                   metadata: MetadataIndex) -> int | None:
+    """
+    Übergibt die QA-Paare einer LLM-Antwort als JSONL-Einträge an den Writer von OUTPUT_FILE.
+
+    :return: Anzahl gespeicherter QA-Paare oder None, wenn das Segment erneut angefragt werden soll
+    """
+    if not llm_response:
+        return None  # LLM-Aufruf fehlgeschlagen
+    if not llm_response.get("qa_pairs"):
+        print("⚠️  Keine QA-Paare empfangen. Segment wird übersprungen.")
+        return 0
+
+    provenance = metadata.lookup(md_path)
+    try:
+        entries = [
+            {
+                "id": str(uuid.uuid4()),
+                "instruction": pair["instruction"],
+                "input": pair["input"],
+                "output": pair["output"],
+                "source_file": md_path.name,
+                "file_path": str(md_path.resolve()),
+                "file_hash_md5": file_hash,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "license": provenance.get("license", "Unbekannt"),
+                "source": provenance.get("source", "Unbekannt")
+            }
+            for pair in llm_response["qa_pairs"]
+        ]
+    except Exception as e:
+        print(f"❌ Fehler beim Parsen der Antwort: {e}")
+        print(f"Antwort-Content: {llm_response}")
+        return None
+
+    for entry in entries:
+        writer.write(entry)
+        print(f"✅ QA-Paar gespeichert: {entry['id']}")
+    return len(entries)
+
+
+def checkpoint(writer: JsonlWriter, ledger: ProgressLedger):
+    """
+    Sichert zuerst die QA-Paare (fsync) und erst danach das Fortschrittsjournal.
+    """
+    writer.checkpoint()
+    ledger.checkpoint()
+
+
+def complete_segment(writer: JsonlWriter, ledger: ProgressLedger, llm_response: dict, md_path: Path,
+                     file_hash: str, i: int, total: int, metadata: MetadataIndex):
+    """
+    Speichert die QA-Paare eines Segments und vermerkt es anschließend im Fortschrittsjournal.
+    """
+    stored = store_qa_pairs(writer, llm_response, md_path, file_hash, metadata)
+    if stored is not None:
+        ledger.mark_done(file_hash, segmentation_key(), i, total, stored)
+        if writer.checkpoint_due():
+            checkpoint(writer, ledger)
+
 
 def generate_qa_pairs():
     """
@@ -130,43 +387,97 @@ def generate_qa_pairs():
     - Sendet diese an das LLM
     - Speichert strukturierte QA-Daten in JSONL
     """
-    metadata_map = load_metadata()
-    OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
+    metadata = MetadataIndex(METADATA_FILE)
+    ledger = ProgressLedger(PROGRESS_FILE)
+    writer = JsonlWriter(OUTPUT_FILE)
 
-    for md_path in MARKDOWN_FOLDER.glob("*.md"):
-        print(f"📄 Verarbeite Datei: {md_path.name}")
-        text = md_path.read_text(encoding="utf-8")
-        segments = sliding_windows(text, window_size=WINDOW_TOKENS, stride=STRIDE_TOKENS)
+    try:
+        for md_path, file_hash, i, total, segment in iter_segments(ledger):
+            print(f"✂️  Segment {i + 1} von {total}")
+            complete_segment(writer, ledger, call_llm(segment), md_path, file_hash, i, total, metadata)
+    finally:
+        checkpoint(writer, ledger)
+        writer.close()
+        ledger.close()
+        metadata.close()
 
-        for i, segment in enumerate(segments):
-            print(f"✂️  Sliding-Window Segment {i + 1} von {len(segments)}")
 
-            llm_response = call_llm(segment)
-            if not llm_response.get("qa_pairs"):
-                print("⚠️  Keine QA-Paare empfangen. Segment wird übersprungen.")
-                continue
+async def generate_qa_pairs_async(max_in_flight: int = MAX_IN_FLIGHT):
+    """
+    Asynchrone QA-Generierung: bis zu max_in_flight Segmente (dateiübergreifend) sind gleichzeitig
+    beim LLM in Bearbeitung. Die Antworten werden trotzdem strikt in Datei-/Segment-Reihenfolge
+    gespeichert, sodass qa_pairs.jsonl deterministisch aufgebaut wird wie im synchronen Modus.
+    """
+    metadata = MetadataIndex(METADATA_FILE)
+    ledger = ProgressLedger(PROGRESS_FILE)
+    writer = JsonlWriter(OUTPUT_FILE)
+
+    limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+    try:
+        async with httpx.AsyncClient(limits=limits, timeout=REQUEST_TIMEOUT) as client:
+            pending = deque()
+
+            async def store_oldest():
+                md_path, file_hash, i, total, task = pending.popleft()
+                llm_response = await task
+                print(f"✂️  Segment {i + 1} von {total} ({md_path.name})")
+                complete_segment(writer, ledger, llm_response, md_path, file_hash, i, total, metadata)
+
+            for md_path, file_hash, i, total, segment in iter_segments(ledger):
+                task = asyncio.create_task(call_llm_async(client, segment))
+                pending.append((md_path, file_hash, i, total, task))
+                if len(pending) >= max_in_flight:
+                    await store_oldest()
 
-            try:
-                for pair in llm_response["qa_pairs"]:
-                    entry = {
-                        "id": str(uuid.uuid4()),
-                        "instruction": pair["instruction"],
-                        "input": pair["input"],
-                        "output": pair["output"],
-                        "source_file": md_path.name,
-                        "file_path": str(md_path.resolve()),
-                        "file_hash_md5": hashlib.md5(md_path.read_bytes()).hexdigest(),
-                        "created_at": datetime.now(timezone.utc).isoformat(),
-                        "license": metadata_map.get(md_path.name, {}).get("license", "Unbekannt"),
-                        "source": metadata_map.get(md_path.name, {}).get("source", "Unbekannt")
-                    }
-                    with open(OUTPUT_FILE, "a", encoding="utf-8") as out:
-                        out.write(json.dumps(entry, ensure_ascii=False) + "\n")
-                    print(f"✅ QA-Paar gespeichert: {entry['id']}")
-            except Exception as e:
-                print(f"❌ Fehler beim Parsen der Antwort: {e}")
-                print(f"Antwort-Content: {llm_response}")
+            while pending:
+                await store_oldest()
+    finally:
+        checkpoint(writer, ledger)
+        writer.close()
+        ledger.close()
+        metadata.close()
+
+
+def main():
+    global LMSTUDIO_API, CHUNKING, response_cache
+
+    ap = argparse.ArgumentParser(description="Generiert QA-Paare aus Markdown-Dateien per LLM.")
+    ap.add_argument("--async", dest="use_async", action="store_true",
+                    help="Segmente nebenläufig an das LLM senden")
+    ap.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT,
+                    help=f"Max. gleichzeitige Anfragen im Async-Modus (default {MAX_IN_FLIGHT})")
+    ap.add_argument("--api-url", default=LMSTUDIO_API,
+                    help="Chat-Completions-Endpunkt (z.B. lokaler Stub für Tests)")
+    ap.add_argument("--chunking", choices=["structure", "window"], default=CHUNKING,
+                    help=f"Segmentierung: strukturbewusst oder reines Sliding Window (default {CHUNKING})")
+    ap.add_argument("--reset-progress", action="store_true",
+                    help="Fortschrittsjournal verwerfen und alle Segmente neu generieren")
+    ap.add_argument("--no-cache", action="store_true",
+                    help="Antwort-Cache umgehen (weder lesen noch schreiben)")
+    ap.add_argument("--cache-max-mb", type=int, default=CACHE_MAX_MB,
+                    help=f"Maximale Cache-Größe in MB, danach LRU-Verdrängung (default {CACHE_MAX_MB})")
+    args = ap.parse_args()
+
+    if args.max_in_flight <= 0:
+        ap.error("--max-in-flight muss positiv sein")
+    LMSTUDIO_API = args.api_url
+    CHUNKING = args.chunking
+    if args.reset_progress:
+        ProgressLedger(PROGRESS_FILE).reset()
+        print(f"🗑️  Fortschrittsjournal zurückgesetzt: {PROGRESS_FILE}")
+    if not args.no_cache:
+        response_cache = ResponseCache(CACHE_FILE, max_bytes=args.cache_max_mb * 1_000_000)
+
+    try:
+        if args.use_async:
+            asyncio.run(generate_qa_pairs_async(args.max_in_flight))
+        else:
+            generate_qa_pairs()
+    finally:
+        if response_cache is not None:
+            print(f"🗃️  Antwort-Cache: {response_cache.summary()}")
+            response_cache.close()
 
 
 if __name__ == "__main__":
-    generate_qa_pairs()
+    main()
@@ -1,7 +1,7 @@
 import pandas as pd
-import json
 from datetime import datetime, timezone
-from pathlib import Path
+
+from jsonl_writer import JsonlWriter
 
 INPUT_FILE = "../data/excel/dataset.xlsx"
 OUTPUT_FILE = "../data/dataset.jsonl"
@@ -49,10 +49,8 @@ def write_jsonl(records: list, path: str, append: bool = True):
     """
     Schreibt die Liste von Datensätzen in eine JSONL-Datei.
     """
-    mode = "a" if append and Path(path).exists() else "w"
-    with open(path, mode, encoding="utf-8") as f:
-        for record in records:
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    with JsonlWriter(path, append=append) as writer:
+        writer.write_many(records)
 
 
 def main():
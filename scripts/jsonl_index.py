@@ -0,0 +1,226 @@
+import json
+import os
+import sys
+import threading
+import uuid
+from array import array
+from hashlib import md5
+from itertools import chain
+from pathlib import Path
+from typing import Iterable, List, Sequence
+
+INDEX_VERSION = 3
+EDGE_BYTES = 64 * 1024  # Anfang und Ende des indizierten Bereichs für die Erkennung einer neu geschriebenen Datei
+
+
+class JsonlIndex:
+    """
+    Persistenter Zeilenindex für eine JSONL-Datei: Byte-Offset jedes gültigen Datensatzes
+    (<datei>.idx, array('Q')) und Posting-Listen pro Wert von key_field (<datei>.idx.json).
+
+    Datensätze werden über ihre Ordinalzahl (Position unter den gültigen Zeilen) angesprochen
+    und per seek() gelesen, ohne die Datei vollständig zu parsen. Wächst die Datei nur (Anhängen),
+    werden beim nächsten Zugriff lediglich die neuen Zeilen indiziert; wurde sie ersetzt, gekürzt
+    oder am Anfang bzw. Ende des indizierten Bereichs (je EDGE_BYTES) verändert, wird der Index neu
+    aufgebaut. Eine Änderung an Ort und Stelle, die nur Bytes dazwischen betrifft und die Länge
+    nicht ändert, bleibt unerkannt. Unvollständige letzte Zeilen bleiben außen vor.
+
+    generation wechselt, wenn refresh() eine fremd ersetzte oder veränderte Datei neu indiziert
+    oder install() eine andere Anzahl Datensätze übernimmt; abgeleitete Indizes erkennen daran,
+    dass sie nicht nur ergänzt, sondern neu erstellt werden müssen. Eine Verdichtung, die dieselben
+    Datensätze in gleicher Reihenfolge neu schreibt, behält die generation.
+
+    :param path: JSONL-Datei
+    :param key_field: Feld, für dessen Werte Posting-Listen geführt werden
+    """
+
+    def __init__(self, path: Path | str, key_field: str = "source_file"):
+        self.path = Path(path)
+        self.key_field = key_field
+        self.offsets_path = self.path.with_name(self.path.name + ".idx")
+        self.header_path = self.path.with_name(self.path.name + ".idx.json")
+        self.lock = threading.RLock()
+        self.generation = uuid.uuid4().hex
+        self._clear()
+        self._load()
+
+    def _clear(self):
+        self.offsets = array("Q")
+        self.postings: dict[str, List[int]] = {}
+        self.indexed_bytes = 0
+        self._inode = None
+        self._mtime_ns = None
+        self._edges = ""
+
+    def _edge_signature(self, length: int) -> str:
+        """MD5 über die ersten und letzten EDGE_BYTES der ersten length Bytes."""
+        digest = md5()
+        with open(self.path, "rb") as f:
+            digest.update(f.read(min(length, EDGE_BYTES)))
+            if length > EDGE_BYTES:
+                f.seek(max(length - EDGE_BYTES, EDGE_BYTES))
+                digest.update(f.read(length - f.tell()))
+        return digest.hexdigest()
+
+    def _load(self):
+        try:
+            with open(self.header_path, "r", encoding="utf-8") as f:
+                header = json.load(f)
+            offsets = array("Q")
+            with open(self.offsets_path, "rb") as f:
+                offsets.frombytes(f.read())
+        except (OSError, ValueError):
+            return  # kein oder defekter Index → Aufbau beim ersten Zugriff
+        if (header.get("version") != INDEX_VERSION or header.get("key_field") != self.key_field
+                or header.get("byteorder") != sys.byteorder or header.get("records") != len(offsets)):
+            return
+        self.offsets = offsets
+        self.postings = header["postings"]
+        self.indexed_bytes = header["indexed_bytes"]
+        self._inode = header["inode"]
+        self._mtime_ns = header["mtime_ns"]
+        self._edges = header["edges_md5"]
+        self.generation = header["generation"]
+
+    def _save(self):
+        tmp_offsets = self.offsets_path.with_name(self.offsets_path.name + ".tmp")
+        with open(tmp_offsets, "wb") as f:
+            self.offsets.tofile(f)
+        os.replace(tmp_offsets, self.offsets_path)
+
+        header = {
+            "version": INDEX_VERSION,
+            "key_field": self.key_field,
+            "byteorder": sys.byteorder,
+            "records": len(self.offsets),
+            "indexed_bytes": self.indexed_bytes,
+            "inode": self._inode,
+            "mtime_ns": self._mtime_ns,
+            "edges_md5": self._edges,
+            "generation": self.generation,
+            "postings": self.postings,
+        }
+        tmp_header = self.header_path.with_name(self.header_path.name + ".tmp")
+        with open(tmp_header, "w", encoding="utf-8") as f:
+            json.dump(header, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_header, self.header_path)
+
+    def refresh(self) -> int:
+        """
+        Bringt den Index auf den Stand der Datei.
+
+        :return: Anzahl neu indizierter Datensätze
+        """
+        with self.lock:
+            try:
+                stat = self.path.stat()
+            except FileNotFoundError:
+                if self._inode is not None:
+                    self._clear()
+                    self.generation = uuid.uuid4().hex
+                return 0
+            if (stat.st_ino == self._inode and stat.st_size == self.indexed_bytes
+                    and stat.st_mtime_ns == self._mtime_ns):
+                return 0
+
+            appended = (stat.st_ino == self._inode and stat.st_size >= self.indexed_bytes
+                        and self._edge_signature(self.indexed_bytes) == self._edges)
+            if not appended:
+                self._clear()
+                self.generation = uuid.uuid4().hex
+            before = len(self.offsets)
+            self._scan()
+            self._inode = stat.st_ino
+            self._mtime_ns = stat.st_mtime_ns
+            self._save()
+            return len(self.offsets) - before
+
+    def install(self, offsets: array, postings: dict[str, List[int]], indexed_bytes: int):
+        """
+        Übernimmt einen extern (z.B. beim Neuschreiben der Datei) erstellten Index für den
+        aktuellen Dateistand. Der Aufrufer hält self.lock über Ersetzen der Datei und install().
+
+        Bleibt die Anzahl der Datensätze gleich (Verdichtung: gleiche Ordinalzahlen, nur Inhalte
+        eingearbeitet), bleibt die generation erhalten; sonst wird sie neu vergeben.
+        """
+        with self.lock:
+            stat = self.path.stat()
+            if len(offsets) != len(self.offsets):
+                self.generation = uuid.uuid4().hex
+            self.offsets = offsets
+            self.postings = postings
+            self.indexed_bytes = indexed_bytes
+            self._inode = stat.st_ino
+            self._mtime_ns = stat.st_mtime_ns
+            self._edges = self._edge_signature(indexed_bytes)
+            self._save()
+
+    def _scan(self):
+        position = self.indexed_bytes
+        with open(self.path, "rb") as f:
+            f.seek(position)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Zeile wird gerade noch geschrieben
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    entry = None
+                if isinstance(entry, dict):
+                    ordinal = len(self.offsets)
+                    self.offsets.append(position)
+                    self.postings.setdefault(str(entry.get(self.key_field, "")), []).append(ordinal)
+                position += len(line)
+        self.indexed_bytes = position
+        self._edges = self._edge_signature(position)
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self.offsets)
+
+    def keys(self) -> List[str]:
+        """
+        Alle vorkommenden Werte von key_field (ohne leere), sortiert.
+        """
+        self.refresh()
+        return sorted(key for key in self.postings if key)
+
+    def select(self, key_filter: str = "") -> Sequence[int]:
+        """
+        Ordinalzahlen aller Datensätze, deren key_field key_filter enthält (Groß-/Kleinschreibung
+        egal), in Dateireihenfolge. Ohne Filter alle Datensätze.
+        """
+        with self.lock:
+            self.refresh()
+            if not key_filter:
+                return range(len(self.offsets))
+            needle = key_filter.lower()
+            lists = [ordinals for key, ordinals in self.postings.items() if needle in key.lower()]
+        if len(lists) == 1:
+            return lists[0]
+        return sorted(chain.from_iterable(lists))
+
+    def read(self, ordinals: Iterable[int]) -> List[dict]:
+        """
+        Liest die Datensätze mit den angegebenen Ordinalzahlen per seek().
+        """
+        with self.lock:
+            offsets = [self.offsets[ordinal] for ordinal in ordinals]
+            records = []
+            with open(self.path, "rb") as f:
+                for offset in offsets:
+                    f.seek(offset)
+                    records.append(json.loads(f.readline()))
+        return records
+
+    def page(self, page_size: int, page_number: int, key_filter: str = "") -> tuple[List[dict], List[int], int]:
+        """
+        Eine Seite der (gefilterten) Datensätze.
+
+        :return: (Datensätze, ihre Ordinalzahlen, Gesamtzahl der Treffer)
+        """
+        with self.lock:  # Datei darf zwischen Auswahl und Lesen nicht ersetzt werden
+            selected = self.select(key_filter)
+            start = page_size * page_number
+            ordinals = list(selected[start:start + page_size])
+            return self.read(ordinals), ordinals, len(selected)
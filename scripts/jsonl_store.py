@@ -0,0 +1,227 @@
+import json
+import os
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import List
+
+from jsonl_index import JsonlIndex
+
+COMPACT_AFTER = 500  # Anzahl Patches, ab der im Hintergrund verdichtet wird
+WRITER_IDLE_SECONDS = 30.0  # so lange unverändert, bevor die Basisdatei ersetzt werden darf
+
+
+def record_key(record: dict, ordinal: int) -> str:
+    """
+    Schlüssel eines Datensatzes für das Patch-Log: seine 'id', ersatzweise "@<Ordinalzahl>".
+    Die Verdichtung behält alle Zeilen in ihrer Reihenfolge bei, Ordinalzahlen bleiben also stabil.
+    """
+    record_id = record.get("id")
+    return record_id if isinstance(record_id, str) and record_id else f"@{ordinal}"
+
+
+class JsonlStore:
+    """
+    Bearbeitbare JSONL-Datei aus Basisdatei, Zeilenindex und Append-only-Patch-Log
+    (<datei>.patches.jsonl).
+
+    Gespeicherte Änderungen werden nur als Patches angehängt (Aufwand proportional zur Seite)
+    und beim Lesen über die Basisdaten gelegt. Ab COMPACT_AFTER Patches schreibt ein
+    Hintergrund-Thread die Basisdatei mit allen Patches über eine Temp-Datei neu und ersetzt
+    sie atomar; erst danach werden die eingearbeiteten Patches aus dem Log entfernt.
+
+    Der Filter nach key_field arbeitet auf dem Index der Basisdatei; ändert ein Patch dieses
+    Feld, wirkt sich das erst nach der nächsten Verdichtung auf die Filterung aus.
+    """
+
+    def __init__(self, path: Path | str, key_field: str = "source_file", compact_after: int = COMPACT_AFTER):
+        self.path = Path(path)
+        self.index = JsonlIndex(self.path, key_field=key_field)
+        self.patch_path = self.path.with_name(self.path.name + ".patches.jsonl")
+        self.compact_after = compact_after
+        self.patches: dict[str, dict] = {}
+        self._patch_count = 0
+        self._patch_bytes = 0
+        self._patch_inode = None
+        self._lock = threading.RLock()
+        self._compaction: threading.Thread | None = None
+
+    # ------------------------------------------------------------------ Patch-Log
+
+    def _refresh_patches(self):
+        """Liest neu angehängte Patches (auch aus anderen Prozessen) nach."""
+        try:
+            stat = self.patch_path.stat()
+        except FileNotFoundError:
+            self.patches.clear()
+            self._patch_count = self._patch_bytes = 0
+            self._patch_inode = None
+            return
+        if stat.st_ino != self._patch_inode or stat.st_size < self._patch_bytes:
+            self.patches.clear()  # Log wurde verdichtet → neu einlesen
+            self._patch_count = self._patch_bytes = 0
+            self._patch_inode = stat.st_ino
+        if stat.st_size == self._patch_bytes:
+            return
+        with open(self.patch_path, "rb") as f:
+            f.seek(self._patch_bytes)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                self._patch_bytes += len(line)
+                try:
+                    patch = json.loads(line)
+                    self.patches[patch["key"]] = patch["record"]
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    continue
+                self._patch_count += 1
+
+    def save(self, updates: dict[str, dict]) -> int:
+        """
+        Hängt geänderte Datensätze (Schlüssel → vollständiger Datensatz) an das Patch-Log an.
+
+        :return: Anzahl geschriebener Patches
+        """
+        if not updates:
+            return 0
+        payload = "".join(
+            json.dumps({"key": key, "record": record}, ensure_ascii=False) + "\n"
+            for key, record in updates.items()
+        ).encode("utf-8")
+        with self._lock:
+            with open(self.patch_path, "ab") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            self._refresh_patches()
+            pending = self._patch_count
+        if pending >= self.compact_after:
+            self.compact_in_background()
+        return len(updates)
+
+    def patch_snapshot(self) -> tuple[str, dict[str, dict]]:
+        """
+        Aktueller Stand des Patch-Logs: Kennung (ändert sich mit jedem neuen Patch) und Patches.
+        """
+        with self._lock:
+            self._refresh_patches()
+            return f"{self._patch_inode}:{self._patch_bytes}", dict(self.patches)
+
+    # ------------------------------------------------------------------ Lesen
+
+    def keys(self) -> List[str]:
+        return self.index.keys()
+
+    def read(self, ordinals: List[int]) -> tuple[List[dict], List[str]]:
+        """
+        Datensätze mit eingearbeiteten Patches und ihre Patch-Schlüssel (aus der Basisfassung).
+        """
+        with self.index.lock:  # keine Verdichtung zwischen Lesen und Überlagern
+            records = self.index.read(ordinals)
+            patched = self.overlay(records, ordinals)
+        return patched, [record_key(record, ordinal) for record, ordinal in zip(records, ordinals)]
+
+    def page(self, page_size: int, page_number: int, key_filter: str = "") -> tuple[List[dict], List[str], int]:
+        """
+        Eine Seite der (gefilterten) Datensätze mit eingearbeiteten Patches.
+
+        :return: (Datensätze, ihre Patch-Schlüssel, Gesamtzahl der Treffer)
+        """
+        with self.index.lock:
+            selected = self.index.select(key_filter)
+            start = page_size * page_number
+            records, keys = self.read(list(selected[start:start + page_size]))
+        return records, keys, len(selected)
+
+    def overlay(self, records: List[dict], ordinals: List[int]) -> List[dict]:
+        """Ersetzt Datensätze, zu denen ein Patch existiert, durch die gepatchte Fassung."""
+        with self._lock:
+            self._refresh_patches()
+            return [self.patches.get(record_key(record, ordinal), record)
+                    for record, ordinal in zip(records, ordinals)]
+
+    # ------------------------------------------------------------------ Verdichtung
+
+    def compact_in_background(self):
+        with self._lock:
+            if self._compaction is not None and self._compaction.is_alive():
+                return
+            self._compaction = threading.Thread(target=self.compact, name="jsonl-compaction", daemon=True)
+            self._compaction.start()
+
+    def compact(self) -> int:
+        """
+        Arbeitet alle bisherigen Patches in die Basisdatei ein (Temp-Datei + os.replace) und
+        kürzt das Patch-Log um die eingearbeiteten Einträge. Speichern bleibt währenddessen
+        möglich; neue Patches landen hinter dem Schnappschuss und bleiben erhalten.
+
+        Schreibt ein anderer Prozess noch in die Basisdatei (z.B. die QA-Generierung, die ihre
+        Datei offen hält), würde er nach dem Ersetzen ins Leere schreiben. Die Verdichtung wird
+        dann verschoben: bei Änderungen innerhalb von WRITER_IDLE_SECONDS oder während des Kopierens.
+
+        :return: Anzahl eingearbeiteter Patches (0 = nichts zu tun oder verschoben)
+        """
+        with self._lock:
+            self._refresh_patches()
+            snapshot = dict(self.patches)
+            snapshot_bytes = self._patch_bytes
+        if not snapshot or not self.path.exists():
+            return 0
+        if time.time() - self.path.stat().st_mtime < WRITER_IDLE_SECONDS:
+            return 0
+
+        tmp_path = self.path.with_name(self.path.name + ".compact.tmp")
+        offsets, postings = array("Q"), {}
+        with open(self.path, "rb") as src, open(tmp_path, "wb") as dst:
+            self._copy_patched(src, dst, snapshot, offsets, postings)
+            dst.flush()
+            os.fsync(dst.fileno())
+            with self.index.lock, self._lock:
+                if os.fstat(src.fileno()).st_size != src.tell():
+                    dst.close()
+                    tmp_path.unlink()
+                    return 0  # Basisdatei wurde währenddessen beschrieben
+                os.replace(tmp_path, self.path)
+                # Index gleich beim Kopieren mit aufgebaut: kein erneutes Parsen der Datei
+                self.index.install(offsets, postings, dst.tell())
+                self._truncate_patch_log(snapshot_bytes)
+        return len(snapshot)
+
+    def _copy_patched(self, src, dst, snapshot: dict[str, dict], offsets: array, postings: dict):
+        """
+        Kopiert vollständige Zeilen von src nach dst, ersetzt gepatchte Datensätze und führt
+        Offsets und Posting-Listen für die neue Datei mit. An einer unvollständigen letzten
+        Zeile wird angehalten (src.tell() steht dann davor).
+        """
+        key_field = self.index.key_field
+        while True:
+            line = src.readline()
+            if not line.endswith(b"\n"):
+                src.seek(-len(line), os.SEEK_CUR)  # (noch) unvollständige Zeile später erneut lesen
+                return
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                record = None
+            if isinstance(record, dict):
+                ordinal = len(offsets)
+                patched = snapshot.get(record_key(record, ordinal))
+                if patched is not None:
+                    record = patched
+                    line = (json.dumps(patched, ensure_ascii=False) + "\n").encode("utf-8")
+                offsets.append(dst.tell())
+                postings.setdefault(str(record.get(key_field, "")), []).append(ordinal)
+            dst.write(line)
+
+    def _truncate_patch_log(self, consumed_bytes: int):
+        with open(self.patch_path, "rb") as f:
+            f.seek(consumed_bytes)
+            rest = f.read()
+        tmp_path = self.patch_path.with_name(self.patch_path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(rest)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.patch_path)
+        self._refresh_patches()
@@ -0,0 +1,66 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Iterable
+
+
+class JsonlWriter:
+    """
+    Gepufferter JSONL-Writer: hält die Datei für die gesamte Laufzeit offen, sammelt Datensätze
+    und schreibt sie gebündelt. checkpoint() schreibt den Puffer und erzwingt per fsync, dass
+    alles bis hierhin auf der Platte liegt.
+
+    :param path: Ziel-JSONL-Datei
+    :param append: An bestehende Datei anhängen (sonst überschreiben)
+    :param batch_size: Puffergröße in Datensätzen; None = nur bei flush()/checkpoint() schreiben
+    :param checkpoint_interval: Sekunden, nach denen checkpoint_due() True liefert
+    """
+
+    def __init__(self, path: Path | str, append: bool = True, batch_size: int | None = 256,
+                 checkpoint_interval: float = 5.0):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.checkpoint_interval = checkpoint_interval
+        self.written = 0
+        self._buffer: list[str] = []
+        self._last_checkpoint = time.monotonic()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, record: dict):
+        self._buffer.append(json.dumps(record, ensure_ascii=False) + "\n")
+        if self.batch_size is not None and len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, records: Iterable[dict]):
+        for record in records:
+            self.write(record)
+
+    def flush(self):
+        if self._buffer:
+            self._file.write("".join(self._buffer))
+            self.written += len(self._buffer)
+            self._buffer.clear()
+        self._file.flush()
+
+    def checkpoint(self):
+        self.flush()
+        os.fsync(self._file.fileno())
+        self._last_checkpoint = time.monotonic()
+
+    def checkpoint_due(self) -> bool:
+        return time.monotonic() - self._last_checkpoint >= self.checkpoint_interval
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.checkpoint()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
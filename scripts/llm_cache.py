@@ -0,0 +1,85 @@
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+
+class ResponseCache:
+    """
+    Inhaltsadressierter Festplatten-Cache (SQLite) für LLM-Antworten.
+
+    Der Schlüssel ist ein SHA-256 über Modell, Temperatur, max_tokens und Prompt-Text.
+    Überschreitet der Cache max_bytes, werden die am längsten nicht genutzten Einträge
+    verdrängt (LRU).
+    """
+
+    def __init__(self, path: Path, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses(last_access)")
+        self.total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(model: str, temperature: float, max_tokens: int, prompt: str) -> str:
+        material = json.dumps([model, temperature, max_tokens, prompt], ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> dict | None:
+        row = self._db.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key: str, response: dict):
+        payload = json.dumps(response, ensure_ascii=False)
+        size = len(payload.encode("utf-8"))
+        old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        self._db.execute(
+            "INSERT OR REPLACE INTO responses (key, response, size, last_access) VALUES (?, ?, ?, ?)",
+            (key, payload, size, time.time()),
+        )
+        self.total_bytes += size - (old[0] if old else 0)
+        self._evict()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes:
+            victims = self._db.execute(
+                "SELECT key, size FROM responses ORDER BY last_access LIMIT 64"
+            ).fetchall()
+            if not victims:
+                self.total_bytes = 0
+                break
+            evicted = []
+            for key, size in victims:
+                if self.total_bytes <= self.max_bytes:
+                    break
+                evicted.append((key,))
+                self.total_bytes -= size
+            self._db.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def summary(self) -> str:
+        return (f"{self.hits} Treffer, {self.misses} Fehlschläge, {len(self)} Einträge, "
+                f"{self.total_bytes / 1_000_000:.1f} MB")
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,132 @@
+import re
+from typing import Callable, Iterable, List
+
+# Struktur-Grenzen: Überschriften und juristische Gliederungsmarken am Zeilenanfang
+HEADING = re.compile(r"^#{1,6}(\s|$)")
+LEGAL_MARKER = re.compile(r"^[*_\s]*(?:§+|Art\.|Rn\.)\s*\d")
+
+# Blöcke, die nie an Leerzeilen aufgetrennt werden
+FENCE = "```"
+MD_TABLE_START = "<MD_TABLE>"
+MD_TABLE_END = "<MD_END>"
+
+BLOCK_SEPARATOR = "\n\n"
+
+
+def split_blocks(text: str) -> List[str]:
+    """
+    Zerlegt Markdown an Leerzeilen in Blöcke (Absätze, Tabellen, Listen).
+    Code-Fences und <MD_TABLE>…<MD_END>-Blöcke bleiben als Ganzes erhalten.
+    """
+    blocks, current = [], []
+    closing = None  # Endmarke des aktuell offenen atomaren Blocks
+
+    for line in text.splitlines():
+        stripped = line.strip()
+        if closing is not None:
+            current.append(line)
+            if stripped.startswith(closing):
+                closing = None
+            continue
+
+        if not stripped:
+            if current:
+                blocks.append("\n".join(current))
+                current = []
+            continue
+
+        if stripped.startswith(FENCE):
+            closing = FENCE
+        elif stripped.startswith(MD_TABLE_START) and MD_TABLE_END not in stripped:
+            closing = MD_TABLE_END
+        current.append(line)
+
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def is_heading(block: str) -> bool:
+    return "\n" not in block and bool(HEADING.match(block))
+
+
+def starts_section(block: str) -> bool:
+    first_line = block.lstrip("\n").split("\n", 1)[0]
+    return bool(HEADING.match(first_line) or LEGAL_MARKER.match(first_line))
+
+
+def split_sections(blocks: Iterable[str]) -> List[List[str]]:
+    """
+    Gruppiert Blöcke zu Abschnitten, die an Überschriften bzw. §/Art./Rn.-Marken beginnen.
+    Reine Überschriften-Abschnitte werden mit dem folgenden Abschnitt verbunden,
+    damit eine Überschrift nie ohne Inhalt am Ende eines Segments steht.
+    """
+    sections: List[List[str]] = []
+    for block in blocks:
+        only_headings = bool(sections) and all(is_heading(b) for b in sections[-1])
+        if not sections or (starts_section(block) and not only_headings):
+            sections.append([block])
+        else:
+            sections[-1].append(block)
+    return sections
+
+
+def chunk_markdown(
+        text: str,
+        max_tokens: int,
+        count_tokens: Callable[[str], int],
+        split_oversized: Callable[[str], Iterable[str]],
+) -> List[str]:
+    """
+    Strukturbewusstes Chunking: Abschnitte (bzw. bei zu langen Abschnitten deren Blöcke)
+    werden greedy bis max_tokens zu Segmenten gepackt. Nur ein einzelner Block, der allein
+    länger als max_tokens ist, wird per split_oversized (Sliding Window mit Überlappung) geteilt.
+
+    :param text: Markdown-Text
+    :param max_tokens: Maximale Tokenanzahl pro Segment
+    :param count_tokens: Tokenzähler
+    :param split_oversized: Teilt einen zu langen Block in überlappende Fenster
+    :return: Liste der Segmente in Dokumentreihenfolge
+    """
+    separator_tokens = count_tokens(BLOCK_SEPARATOR)
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            chunks.append(BLOCK_SEPARATOR.join(current))
+        current, current_tokens = [], 0
+
+    def add(piece: str, tokens: int) -> bool:
+        """Hängt das Stück an das aktuelle Segment an (ggf. nach einem Flush); False, wenn es zu groß ist."""
+        nonlocal current_tokens
+        if tokens > max_tokens:
+            return False
+        needed = tokens + (separator_tokens if current else 0)
+        if current_tokens + needed > max_tokens:
+            flush()
+            needed = tokens
+        current.append(piece)
+        current_tokens += needed
+        return True
+
+    for section in split_sections(split_blocks(text)):
+        block_tokens = [count_tokens(block) for block in section]
+        section_tokens = sum(block_tokens) + separator_tokens * (len(section) - 1)
+        if add(BLOCK_SEPARATOR.join(section), section_tokens):
+            continue
+
+        for block, tokens in zip(section, block_tokens):
+            if add(block, tokens):
+                continue
+            if all(is_heading(b) for b in current):
+                # Offene Überschriften dem Block voranstellen, statt sie allein abzuschicken
+                block = BLOCK_SEPARATOR.join(current + [block])
+                current.clear()
+            flush()
+            chunks.extend(split_oversized(block))
+    flush()
+    return chunks
+
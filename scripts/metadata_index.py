@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Nachschlage-Index für metadata.jsonl (<metadata.jsonl>.index.sqlite).
+
+Die Metadaten werden nach Inhalts-Hash (file_hash_md5 der Quelldatei) und Dateistamm indiziert,
+damit eine Markdown-Datei ihrer Quelle zugeordnet werden kann, ohne metadata.jsonl in jeden
+Prozess zu laden. Zusätzlich wird aus dem Konvertierungs-Manifest die Zuordnung
+Ausgabedatei → MD5 der Quelldatei übernommen. Auflösung einer Markdown-Datei:
+
+1. über das Manifest: buch.md → MD5 von buch.pdf → Metadaten mit diesem Hash
+2. sonst über den Dateistamm: buch.md → buch.pdf
+
+Der Index wird beim ersten Zugriff geöffnet und neu aufgebaut, sobald sich Größe oder mtime von
+metadata.jsonl oder Manifest geändert haben. Der Neuaufbau schreibt in eine Temp-Datei, die per
+Rename ersetzt wird, sodass parallel lesende Prozesse nie einen halben Index sehen.
+
+Beispiel:
+    python metadata_index.py buch.md
+    python metadata_index.py --rebuild
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from pathlib import Path
+
+from conversion_manifest import MANIFEST_NAME
+
+METADATA_FILE = Path("../data/markdown/metadata.jsonl")
+SCHEMA_VERSION = "1"
+
+
+def _signature(*paths: Path) -> str:
+    parts = []
+    for path in paths:
+        try:
+            stat = path.stat()
+            parts.append(f"{stat.st_size}:{stat.st_mtime_ns}")
+        except FileNotFoundError:
+            parts.append("-")
+    return f"{SCHEMA_VERSION}|" + "|".join(parts)
+
+
+class MetadataIndex:
+    """
+    Index über metadata.jsonl mit Nachschlagen nach Inhalts-Hash, Dateistamm oder Markdown-Datei.
+    Ergebnisse werden pro Prozess zwischengespeichert.
+    """
+
+    def __init__(self, metadata_path: Path = METADATA_FILE, manifest_path: Path | None = None,
+                 index_path: Path | None = None):
+        self.metadata_path = Path(metadata_path)
+        self.manifest_path = manifest_path or self.metadata_path.with_name(MANIFEST_NAME)
+        self.index_path = index_path or self.metadata_path.with_name(self.metadata_path.name + ".index.sqlite")
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self._signature: str | None = None
+        self._cache: dict[str, dict] = {}
+
+    # ------------------------------------------------------------------ Aufbau
+
+    def _source_signature(self) -> str:
+        return _signature(self.metadata_path, self.manifest_path)
+
+    def _ensure(self):
+        """Öffnet den Index und baut ihn neu auf, wenn Metadaten oder Manifest sich geändert haben."""
+        signature = self._source_signature()
+        if self._db is not None and self._signature == signature:
+            return
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+        self._cache.clear()
+
+        if self._read_signature() != signature:
+            self.rebuild(signature)
+        self._db = sqlite3.connect(f"file:{self.index_path}?mode=ro", uri=True, check_same_thread=False)
+        self._signature = signature
+
+    def _read_signature(self) -> str | None:
+        if not self.index_path.exists():
+            return None
+        try:
+            with closing(sqlite3.connect(f"file:{self.index_path}?mode=ro", uri=True)) as db:
+                row = db.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+            return row[0] if row else None
+        except sqlite3.Error:
+            return None
+
+    def _read_outputs(self) -> list[tuple[str, str]]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return []
+        return [(entry["output"], entry["md5"])
+                for section in manifest.values() if isinstance(section, dict)
+                for entry in section.values()
+                if isinstance(entry, dict) and entry.get("output") and entry.get("md5")]
+
+    def rebuild(self, signature: str | None = None) -> int:
+        """
+        Baut den Index vollständig aus metadata.jsonl und Manifest auf.
+
+        :return: Anzahl indizierter Metadaten-Einträge
+        """
+        signature = signature or self._source_signature()
+        tmp_path = self.index_path.with_name(f"{self.index_path.name}.{os.getpid()}.tmp")
+        tmp_path.unlink(missing_ok=True)
+        count = 0
+        db = sqlite3.connect(str(tmp_path))
+        try:
+            db.executescript(
+                "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);"
+                "CREATE TABLE entries (filename TEXT, stem TEXT, md5 TEXT, record TEXT NOT NULL);"
+                "CREATE TABLE outputs (output TEXT, md5 TEXT);"
+            )
+            if self.metadata_path.exists():
+                rows = []
+                with open(self.metadata_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        if not isinstance(entry, dict):
+                            continue
+                        filename = entry.get("filename") or ""
+                        rows.append((filename, Path(filename).stem, entry.get("file_hash_md5"),
+                                     json.dumps(entry, ensure_ascii=False)))
+                db.executemany("INSERT INTO entries VALUES (?, ?, ?, ?)", rows)
+                count = len(rows)
+            db.executemany("INSERT INTO outputs VALUES (?, ?)", self._read_outputs())
+            db.executescript(
+                "CREATE INDEX entries_md5 ON entries(md5);"
+                "CREATE INDEX entries_stem ON entries(stem);"
+                "CREATE INDEX outputs_output ON outputs(output);"
+            )
+            db.execute("INSERT INTO meta VALUES ('signature', ?)", (signature,))
+            db.commit()
+        finally:
+            db.close()
+        os.replace(tmp_path, self.index_path)
+        return count
+
+    # ------------------------------------------------------------------ Abfragen
+
+    def _query(self, sql: str, params: tuple) -> dict | None:
+        row = self._db.execute(sql, params).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def by_hash(self, file_hash: str) -> dict | None:
+        """Metadaten der Quelldatei mit diesem MD5-Hash."""
+        with self._lock:
+            self._ensure()
+            return self._query("SELECT record FROM entries WHERE md5 = ? ORDER BY filename LIMIT 1", (file_hash,))
+
+    def by_stem(self, stem: str) -> dict | None:
+        """Metadaten der Quelldatei mit diesem Dateistamm (buch.pdf → "buch")."""
+        with self._lock:
+            self._ensure()
+            return self._query("SELECT record FROM entries WHERE stem = ? ORDER BY filename LIMIT 1", (stem,))
+
+    def lookup(self, md_path: Path) -> dict:
+        """
+        Metadaten zur Quelle einer Markdown-Datei, erst über den Quell-Hash aus dem Manifest,
+        dann über den Dateistamm. Leeres Dict, wenn keine Quelle bekannt ist.
+        """
+        name = Path(md_path).name
+        with self._lock:
+            cached = self._cache.get(name)
+            if cached is not None and self._signature == self._source_signature():
+                return cached
+            self._ensure()
+            meta = self._query(
+                "SELECT e.record FROM outputs o JOIN entries e ON e.md5 = o.md5 "
+                "WHERE o.output = ? ORDER BY e.filename LIMIT 1", (name,)
+            ) or self._query(
+                "SELECT record FROM entries WHERE stem = ? ORDER BY filename LIMIT 1", (Path(name).stem,)
+            ) or {}
+            self._cache[name] = meta
+            return meta
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Schlägt die Quell-Metadaten von Markdown-Dateien nach.")
+    ap.add_argument("files", nargs="*", help="Markdown-Dateinamen (z.B. buch.md)")
+    ap.add_argument("--metadata", type=Path, default=METADATA_FILE)
+    ap.add_argument("--rebuild", action="store_true", help="Index unabhängig vom Stand neu aufbauen")
+    args = ap.parse_args()
+
+    index = MetadataIndex(args.metadata)
+    if args.rebuild:
+        count = index.rebuild()
+        print(f"🗂️  Index neu aufgebaut: {count} Einträge → {index.index_path}")
+    for name in args.files:
+        meta = index.lookup(Path(name))
+        if meta:
+            print(f"📄 {name} → {meta.get('filename')} (Quelle: {meta.get('source', 'Unbekannt')}, "
+                  f"Lizenz: {meta.get('license', 'Unbekannt')})")
+        else:
+            print(f"⚠️  {name}: keine Metadaten gefunden")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,33 @@
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+from collections import deque
+from multiprocessing.connection import wait
 from pathlib import Path
+from typing import Callable
+
+import pymupdf
 import pymupdf4llm
 
+from conversion_manifest import ConversionManifest, converter_version
+from find_duplicate_sources import exclude_duplicates
+from text_normalization import NON_PRINTABLE, PAGE_FOOTER, Pipeline, StageTimings
+
 PDF_FOLDER = "../data/pdf"
 OUTPUT_FOLDER = "../data/markdown"
+CONVERTER_VERSION = "3"  # Erhöhen, wenn sich die erzeugte Markdown-Ausgabe ändert
+
+DEFAULT_WORKERS = 1  # 1 = serielle Verarbeitung im Hauptprozess
+DEFAULT_TIMEOUT = None  # Sekunden pro Dokument (nur im Prozess-Pool)
+DEFAULT_PAGE_BATCH = 50  # Seiten pro Stapel im Streaming-Modus
+CLEANING_STAGES = (NON_PRINTABLE, PAGE_FOOTER)  # Nachbearbeitung der pymupdf4llm-Ausgabe
+
+try:
+    import resource  # nur unter Unix verfügbar
+except ImportError:
+    resource = None
 
 
 def convert_pdf_to_markdown(pdf_path: Path) -> str:
@@ -30,47 +55,372 @@ def save_markdown(markdown_text: str, output_path: Path):
         f.write(markdown_text)
 
 
-def process_all_pdfs(input_dir: Path, output_dir: Path):
+def peak_rss_mb() -> float | None:
+    """
+    Spitzen-Speicherverbrauch (RSS) des aktuellen Prozesses in MB, sofern ermittelbar.
+    """
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: KiB
+
+
+def _load_stream_progress(progress_file: Path, partial_file: Path, source_stat, page_batch: int) -> dict | None:
+    """
+    Lädt den Fortschritt einer abgebrochenen Streaming-Konvertierung, sofern er zur
+    unveränderten Quelldatei und Stapelgröße passt.
+    """
+    if not progress_file.exists() or not partial_file.exists():
+        return None
+    try:
+        with open(progress_file, "r", encoding="utf-8") as f:
+            progress = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    expected = {"size": source_stat.st_size, "mtime_ns": source_stat.st_mtime_ns, "page_batch": page_batch}
+    if any(progress.get(key) != value for key, value in expected.items()):
+        return None
+    if partial_file.stat().st_size < progress.get("bytes", 0):
+        return None
+    return progress
+
+
+def convert_pdf_streaming(pdf_path: Path, output_path: Path, page_batch: int = DEFAULT_PAGE_BATCH,
+                          cleaner: Pipeline | None = None) -> int:
+    """
+    Konvertiert eine PDF-Datei stapelweise (page_batch Seiten) und hängt jeden Stapel sofort an
+    die Ausgabedatei an, statt das gesamte Markdown im Speicher aufzubauen. Nach jedem Stapel
+    wird der Fortschritt in <ausgabe>.progress vermerkt; ein abgebrochener Lauf setzt beim
+    letzten vollständigen Seitenbereich wieder auf.
+
+    Args:
+        pdf_path (Path): Pfad zur PDF-Datei.
+        output_path (Path): Zielpfad der Markdown-Datei.
+        page_batch (int): Seiten pro Stapel.
+        cleaner (Pipeline | None): Normalisierung, die auf jeden Stapel angewendet wird.
+
+    Returns:
+        int: Seitenzahl des Dokuments.
+    """
+    partial_file = output_path.with_suffix(".md.part")
+    progress_file = output_path.with_suffix(".md.progress")
+    source_stat = pdf_path.stat()
+
+    with pymupdf.open(pdf_path) as doc:
+        pages = doc.page_count
+        progress = _load_stream_progress(progress_file, partial_file, source_stat, page_batch)
+        next_page = progress["next_page"] if progress else 0
+        if next_page:
+            print(f"↪️  Setze {pdf_path.name} ab Seite {next_page + 1} von {pages} fort")
+
+        # Überschriften-Ebenen einmal über das ganze Dokument bestimmen (Legacy-Modus von
+        # pymupdf4llm), damit alle Stapel dieselbe Zuordnung verwenden wie eine Gesamtkonvertierung.
+        options = {}
+        if hasattr(pymupdf4llm, "IdentifyHeaders"):
+            options["hdr_info"] = pymupdf4llm.IdentifyHeaders(doc)
+
+        with open(partial_file, "r+b" if progress else "wb") as f:
+            f.truncate(progress["bytes"] if progress else 0)
+            f.seek(0, os.SEEK_END)
+            for start in range(next_page, pages, page_batch):
+                end = min(start + page_batch, pages)
+                markdown = pymupdf4llm.to_markdown(doc, pages=list(range(start, end)), **options)
+                if cleaner is not None:
+                    markdown = cleaner.run(markdown)  # Stapel enden an Seiten- und damit Absatzgrenzen
+                f.write(markdown.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+
+                tmp_file = progress_file.with_suffix(".tmp")
+                with open(tmp_file, "w", encoding="utf-8") as pf:
+                    json.dump({"size": source_stat.st_size, "mtime_ns": source_stat.st_mtime_ns,
+                               "page_batch": page_batch, "next_page": end, "bytes": f.tell()}, pf)
+                os.replace(tmp_file, progress_file)
+
+    os.replace(partial_file, output_path)
+    progress_file.unlink(missing_ok=True)
+    return pages
+
+
+def convert_file(pdf_file: Path, output_dir: Path, page_batch: int | None = None) -> dict:
+    """
+    Konvertiert eine PDF-Datei und speichert das Ergebnis. Wird vom seriellen Pfad und von den
+    Pool-Workern gleichermaßen genutzt, damit beide identische Ausgaben erzeugen. Die Datei wird
+    erst nach erfolgreicher Konvertierung an ihren Zielort verschoben, ein abgebrochener Lauf
+    hinterlässt also keine halbe Markdown-Datei.
+
+    Args:
+        page_batch (int | None): Seiten pro Stapel im Streaming-Modus, None = ganzes Dokument.
+
+    Returns:
+        dict: Ergebnis mit Dateiname, Status, Seitenzahl, Dauer, Spitzen-RSS und Laufzeiten
+        der Normalisierungsstufen.
+    """
+    start = time.perf_counter()
+    output_file = output_dir / (pdf_file.stem + ".md")
+    cleaner = Pipeline(CLEANING_STAGES)
+    if page_batch:
+        pages = convert_pdf_streaming(pdf_file, output_file, page_batch, cleaner)
+    else:
+        with pymupdf.open(pdf_file) as doc:
+            pages = doc.page_count
+        markdown = cleaner.run(convert_pdf_to_markdown(pdf_file))
+        partial_file = output_file.with_suffix(".md.part")
+        save_markdown(markdown, partial_file)
+        os.replace(partial_file, output_file)
+    return {"file": pdf_file.name, "status": "ok", "pages": pages,
+            "seconds": time.perf_counter() - start, "output": output_file.name,
+            "peak_rss_mb": peak_rss_mb(), "normalization": cleaner.timings.as_dict()}
+
+
+def _worker_loop(conn):
+    """
+    Pool-Worker: meldet sich nach dem Start bereit und erhält dann Aufträge
+    (pdf_file, output_dir, page_batch) über die Pipe, bis None kommt.
+    """
+    conn.send("ready")
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        pdf_file, output_dir, page_batch = task
+        try:
+            result = convert_file(pdf_file, output_dir, page_batch)
+        except Exception as e:
+            result = {"file": pdf_file.name, "status": "error", "error": str(e)}
+        conn.send(result)
+
+
+def convert_serial(pdf_files: list[Path], output_dir: Path, page_batch: int | None,
+                   on_result: Callable[[dict], None]) -> list[dict]:
+    results = []
+    for pdf_file in pdf_files:
+        print(f"🔄 Verarbeite: {pdf_file.name}")
+        try:
+            result = convert_file(pdf_file, output_dir, page_batch)
+            print(f"✅ Gespeichert: {result['output']}")
+        except Exception as e:
+            print(f"❌ Fehler bei {pdf_file.name}: {e}")
+            result = {"file": pdf_file.name, "status": "error", "error": str(e)}
+        results.append(result)
+        on_result(result)
+    return results
+
+
+def convert_parallel(pdf_files: list[Path], output_dir: Path, workers: int, timeout: float | None,
+                     page_batch: int | None, on_result: Callable[[dict], None]) -> list[dict]:
+    """
+    Verteilt die PDFs auf einen Pool aus Worker-Prozessen. Überschreitet ein Dokument das
+    Zeitlimit, wird sein Worker beendet und durch einen neuen ersetzt. Das Zeitlimit zählt erst
+    ab der Übergabe an einen betriebsbereiten Worker (nicht während des Prozessstarts).
+    """
+    ctx = mp.get_context("spawn")
+    queue = deque(pdf_files)
+    results = []
+    starting = {}  # Pipe -> Prozess (wartet auf "ready")
+    idle = []
+    busy = {}  # Pipe -> (Prozess, PDF, Startzeit)
+
+    def start_worker():
+        parent_conn, child_conn = ctx.Pipe()
+        proc = ctx.Process(target=_worker_loop, args=(child_conn,), daemon=True)
+        proc.start()
+        child_conn.close()
+        starting[parent_conn] = proc
+
+    for _ in range(min(workers, len(pdf_files))):
+        start_worker()
+
+    while queue or busy:
+        if not starting and not idle and not busy:
+            break  # alle Worker beim Start gescheitert
+        while queue and idle:
+            proc, conn = idle.pop()
+            pdf_file = queue.popleft()
+            print(f"🔄 Verarbeite: {pdf_file.name}")
+            conn.send((pdf_file, output_dir, page_batch))
+            busy[conn] = (proc, pdf_file, time.monotonic())
+
+        wait_for = None
+        if timeout is not None and busy:
+            oldest = min(started for _, _, started in busy.values())
+            wait_for = max(0.0, oldest + timeout - time.monotonic())
+        ready = wait([*starting, *(proc.sentinel for proc in starting.values()),
+                      *busy, *(proc.sentinel for proc, _, _ in busy.values())], timeout=wait_for)
+
+        for conn in list(starting):
+            proc = starting[conn]
+            if conn in ready or conn.poll():
+                try:
+                    conn.recv()
+                    idle.append((proc, conn))
+                except EOFError:
+                    print(f"❌ Worker konnte nicht gestartet werden (Exit-Code {proc.exitcode})")
+                    conn.close()
+                del starting[conn]
+            elif not proc.is_alive():
+                print(f"❌ Worker konnte nicht gestartet werden (Exit-Code {proc.exitcode})")
+                conn.close()
+                del starting[conn]
+
+        for conn in list(busy):
+            proc, pdf_file, started = busy[conn]
+            worker_alive = True
+            if conn in ready or conn.poll():
+                try:
+                    result = conn.recv()
+                except EOFError:
+                    worker_alive = False
+                    result = {"file": pdf_file.name, "status": "error",
+                              "error": f"Worker beendet (Exit-Code {proc.exitcode})"}
+            elif not proc.is_alive():
+                worker_alive = False
+                result = {"file": pdf_file.name, "status": "error",
+                          "error": f"Worker beendet (Exit-Code {proc.exitcode})"}
+            elif timeout is not None and time.monotonic() - started >= timeout:
+                proc.kill()
+                worker_alive = False
+                result = {"file": pdf_file.name, "status": "timeout",
+                          "error": f"Zeitlimit von {timeout:g} s überschritten"}
+            else:
+                continue
+
+            del busy[conn]
+            results.append(result)
+            on_result(result)
+            if result["status"] == "ok":
+                print(f"✅ Gespeichert: {result['output']}")
+            else:
+                print(f"❌ Fehler bei {pdf_file.name}: {result['error']}")
+
+            if worker_alive:
+                idle.append((proc, conn))
+            else:
+                proc.join()
+                conn.close()
+                if not page_batch:  # im Streaming-Modus bleibt der Teilstand für die Fortsetzung erhalten
+                    (output_dir / (pdf_file.stem + ".md.part")).unlink(missing_ok=True)
+                if queue:
+                    start_worker()
+
+    for pdf_file in queue:
+        results.append({"file": pdf_file.name, "status": "error", "error": "Kein Worker verfügbar"})
+    for proc, conn in idle:
+        conn.send(None)
+        proc.join()
+        conn.close()
+    return results
+
+
+def print_summary(results: list[dict]):
+    """
+    Gibt pro Datei Seiten, Dauer, Seiten/Sekunde und Spitzen-RSS aus. Der RSS-Wert ist der
+    Höchststand des jeweiligen Prozesses bis zum Ende dieser Datei (im Pool: des Workers).
+    """
+    print("\n📊 Zusammenfassung")
+    total_pages = total_seconds = 0.0
+    for result in sorted(results, key=lambda r: r["file"]):
+        if result["status"] != "ok":
+            print(f"  {result['file']:50s} {result['status']}: {result['error']}")
+            continue
+        rate = result["pages"] / result["seconds"] if result["seconds"] else 0.0
+        total_pages += result["pages"]
+        total_seconds += result["seconds"]
+        rss = f"{result['peak_rss_mb']:8.0f} MB" if result.get("peak_rss_mb") is not None else ""
+        print(f"  {result['file']:50s} {result['pages']:6d} S. {result['seconds']:8.1f} s {rate:8.2f} S./s {rss}")
+    ok = sum(1 for r in results if r["status"] == "ok")
+    print(f"  {ok}/{len(results)} Dateien, {int(total_pages)} Seiten, {total_seconds:.1f} s Konvertierungszeit")
+
+
+def process_all_pdfs(input_dir: Path, output_dir: Path, workers: int = DEFAULT_WORKERS,
+                     timeout: float | None = DEFAULT_TIMEOUT, force: bool = False,
+                     page_batch: int | None = None):
     """
     Durchläuft alle PDF-Dateien im Eingabeordner und konvertiert sie in Markdown-Dateien.
 
     Args:
         input_dir (Path): Verzeichnis mit PDF-Dateien.
         output_dir (Path): Zielverzeichnis für Markdown-Dateien.
+        workers (int): Anzahl paralleler Worker-Prozesse (1 = seriell).
+        timeout (float | None): Zeitlimit pro Dokument in Sekunden (erzwingt den Prozess-Pool).
+        force (bool): Auch unveränderte Dateien (laut Manifest) neu konvertieren.
+        page_batch (int | None): Streaming-Modus mit dieser Stapelgröße in Seiten.
     """
     if not input_dir.exists():
         print(f"❌ Eingabeordner nicht gefunden: {input_dir}")
         return
 
     output_dir.mkdir(parents=True, exist_ok=True)
-    pdf_files = list(input_dir.glob("*.pdf"))
+    pdf_files = sorted(input_dir.glob("*.pdf"))
 
     if not pdf_files:
         print("⚠️ Keine PDF-Dateien gefunden.")
         return
+    pdf_files = exclude_duplicates(pdf_files)
+
+    manifest = ConversionManifest(output_dir, "pdf", converter_version(CONVERTER_VERSION, "pymupdf4llm"))
+    if not force:
+        pending = [p for p in pdf_files if manifest.needs_conversion(p, output_dir / (p.stem + ".md"))]
+        if len(pending) < len(pdf_files):
+            print(f"⏭️  {len(pdf_files) - len(pending)} unveränderte PDF-Datei(en) übersprungen")
+        pdf_files = pending
+    if not pdf_files:
+        manifest.save()
+        return
 
     print(f"📄 {len(pdf_files)} PDF-Datei(en) werden verarbeitet...")
 
-    for pdf_file in pdf_files:
-        try:
-            print(f"🔄 Verarbeite: {pdf_file.name}")
-            markdown = convert_pdf_to_markdown(pdf_file)
-            output_file = output_dir / (pdf_file.stem + ".md")
-            save_markdown(markdown, output_file)
-            print(f"✅ Gespeichert: {output_file.name}")
-        except Exception as e:
-            print(f"❌ Fehler bei {pdf_file.name}: {e}")
+    def on_result(result: dict):
+        if result["status"] == "ok":
+            manifest.record(input_dir / result["file"], output_dir / result["output"])
+
+    start = time.perf_counter()
+    try:
+        if workers > 1 or timeout is not None:
+            print(f"⚙️  Prozess-Pool mit {workers} Worker(n), Zeitlimit: {timeout or '–'} s")
+            results = convert_parallel(pdf_files, output_dir, workers, timeout, page_batch, on_result)
+        else:
+            results = convert_serial(pdf_files, output_dir, page_batch, on_result)
+    finally:
+        manifest.save()
+
+    print_summary(results)
+    timings = StageTimings()
+    for result in results:
+        timings.merge(result.get("normalization", {}))
+    print(timings.report())
+    print(f"⏱️  Gesamtdauer: {time.perf_counter() - start:.1f} s")
 
 
 def main():
     """
     Hauptfunktion zum Starten der Konvertierung.
     """
-    input_dir = Path(PDF_FOLDER)
-    output_dir = Path(OUTPUT_FOLDER)
+    ap = argparse.ArgumentParser(description="Konvertiert PDF-Dateien nach Markdown.")
+    ap.add_argument("--input-dir", default=PDF_FOLDER)
+    ap.add_argument("--output-dir", default=OUTPUT_FOLDER)
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                    help="Anzahl paralleler Worker-Prozesse (default 1 = seriell)")
+    ap.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                    help="Zeitlimit pro Dokument in Sekunden")
+    ap.add_argument("--force", action="store_true",
+                    help="Alle Dateien neu konvertieren, auch wenn sie laut Manifest unverändert sind")
+    ap.add_argument("--stream", action="store_true",
+                    help="Seitenweise streamen statt das ganze Dokument im Speicher aufzubauen (fortsetzbar)")
+    ap.add_argument("--page-batch", type=int, default=DEFAULT_PAGE_BATCH,
+                    help=f"Seiten pro Stapel im Streaming-Modus (default {DEFAULT_PAGE_BATCH})")
+    args = ap.parse_args()
+
+    if args.workers <= 0:
+        ap.error("--workers muss positiv sein")
+    if args.page_batch <= 0:
+        ap.error("--page-batch muss positiv sein")
+
+    input_dir = Path(args.input_dir)
+    output_dir = Path(args.output_dir)
 
     print("🚀 Starte PDF → Markdown Konvertierung")
-    process_all_pdfs(input_dir, output_dir)
+    process_all_pdfs(input_dir, output_dir, workers=args.workers, timeout=args.timeout, force=args.force,
+                     page_batch=args.page_batch if args.stream else None)
     print("✅ Konvertierung abgeschlossen.")
 
 
@@ -0,0 +1,94 @@
+import json
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+from jsonl_writer import JsonlWriter
+
+
+class ProgressLedger:
+    """
+    Persistentes Fortschrittsjournal (JSONL) für die QA-Generierung.
+
+    Jede Zeile markiert ein abgeschlossenes Segment, identifiziert über den MD5-Hash der
+    Markdown-Datei, die Segmentierung (z.B. Fenster-/Schrittweite) und den Segmentindex.
+    Ändert sich eine Datei oder die Segmentierung, passen die alten Einträge nicht mehr
+    und nur die betroffenen Segmente werden neu erzeugt.
+
+    Einträge werden erst bei checkpoint() geschrieben. Der Aufrufer sichert vorher die
+    zugehörigen QA-Paare, damit kein Segment als erledigt gilt, dessen Daten fehlen.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.completed = set()
+        self.totals = {}
+        self._done_per_file = Counter()
+        self._writer: JsonlWriter | None = None
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    key = (entry["file_hash_md5"], entry["segmentation"], entry["segment"])
+                except (json.JSONDecodeError, KeyError):
+                    continue  # z.B. abgeschnittene letzte Zeile nach Absturz
+                self._remember(key, entry.get("total"))
+
+    def _remember(self, key: tuple, total: int | None):
+        if key in self.completed:
+            return
+        self.completed.add(key)
+        self._done_per_file[key[:2]] += 1
+        if total is not None:
+            self.totals[key[:2]] = total
+
+    def is_done(self, file_hash: str, segmentation: str, segment: int) -> bool:
+        return (file_hash, segmentation, segment) in self.completed
+
+    def is_file_done(self, file_hash: str, segmentation: str) -> bool:
+        """
+        True, wenn alle Segmente der Datei bereits abgeschlossen sind (ohne erneute Tokenisierung prüfbar).
+        """
+        total = self.totals.get((file_hash, segmentation))
+        return total is not None and self._done_per_file[(file_hash, segmentation)] >= total
+
+    def mark_done(self, file_hash: str, segmentation: str, segment: int, total: int, qa_pairs: int):
+        """
+        Vermerkt ein abgeschlossenes Segment (persistiert beim nächsten checkpoint()).
+        """
+        if self._writer is None:
+            self._writer = JsonlWriter(self.path, batch_size=None)
+        self._writer.write({
+            "file_hash_md5": file_hash,
+            "segmentation": segmentation,
+            "segment": segment,
+            "total": total,
+            "qa_pairs": qa_pairs,
+            "completed_at": datetime.now(timezone.utc).isoformat(),
+        })
+        self._remember((file_hash, segmentation, segment), total)
+
+    def checkpoint(self):
+        if self._writer is not None:
+            self._writer.checkpoint()
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def reset(self):
+        """
+        Verwirft den gesamten Fortschritt.
+        """
+        self.close()
+        if self.path.exists():
+            self.path.unlink()
+        self.completed.clear()
+        self.totals.clear()
+        self._done_per_file.clear()
@@ -0,0 +1,205 @@
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, List
+
+from jsonl_store import JsonlStore
+
+TEXT_FIELDS = ("instruction", "input", "output")
+SCHEMA_VERSION = "1"
+SYNC_BATCH = 5000
+
+# Anzeigename → ORDER-BY-Ausdruck (Relevanz nur bei Textsuche, sonst Dateireihenfolge)
+SORT_OPTIONS = {
+    "Datei-Reihenfolge": "r.ordinal",
+    "Relevanz": "bm25(fts)",
+    "Quelle": "r.source_file",
+    "Lizenz": "r.license",
+    "Erstellt": "r.created_at",
+}
+DEFAULT_SORT = "Datei-Reihenfolge"
+
+SEARCH_TERM = re.compile(r"\w+\*?")
+
+
+def is_missing(value) -> bool:
+    """Leer im Sinne der Annotator-Markierung: fehlt, None/NaN oder nur Leerraum."""
+    return value is None or value != value or str(value).strip() == ""
+
+
+def _as_text(value) -> str | None:
+    return None if value is None else str(value)
+
+
+def fts_query(text: str) -> str | None:
+    """
+    Wandelt eine Freitexteingabe in eine FTS5-Abfrage: alle Wörter müssen vorkommen,
+    ein abschließendes * sucht nach Präfixen. Sonderzeichen der FTS5-Syntax werden ignoriert.
+    """
+    terms = []
+    for term in SEARCH_TERM.findall(text):
+        prefix = term.endswith("*")
+        terms.append(f'"{term.rstrip("*")}"' + ("*" if prefix else ""))
+    return " ".join(terms) or None
+
+
+class QASearchIndex:
+    """
+    Lokaler Such-Index (SQLite FTS5) über eine JsonlStore-Datei (<datei>.search.sqlite).
+
+    Pro Datensatz (Ordinalzahl) werden Quelle, Lizenz, Erstellzeit und fehlende Felder in
+    einer Tabelle geführt, instruction/input/output im Volltextindex. Der Index folgt der
+    Datei inkrementell: neue Zeilen werden ergänzt, gespeicherte Patches nachgezogen; nur
+    nach einem Neuaufbau des Zeilenindex (z.B. Verdichtung) wird er komplett neu erstellt.
+    """
+
+    def __init__(self, store: JsonlStore, db_path: Path | None = None):
+        self.store = store
+        self.db_path = db_path or store.path.with_name(store.path.name + ".search.sqlite")
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(str(self.db_path), isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.create_function("py_lower", 1, lambda s: s.lower() if isinstance(s, str) else s,
+                                 deterministic=True)
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        if self._meta("schema") != SCHEMA_VERSION:
+            self._reset()
+
+    # ------------------------------------------------------------------ Aufbau
+
+    def _meta(self, key: str) -> str | None:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value):
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _reset(self):
+        self._db.executescript(
+            "DROP TABLE IF EXISTS records;"
+            "DROP TABLE IF EXISTS fts;"
+            "CREATE TABLE records ("
+            " ordinal INTEGER PRIMARY KEY,"
+            " key TEXT NOT NULL,"
+            " source_file TEXT,"
+            " license TEXT,"
+            " created_at TEXT,"
+            " missing_instruction INTEGER NOT NULL,"
+            " missing_input INTEGER NOT NULL,"
+            " missing_output INTEGER NOT NULL);"
+            "CREATE INDEX records_key ON records(key);"
+            "CREATE INDEX records_source ON records(source_file);"
+            "CREATE INDEX records_license ON records(license);"
+            "CREATE VIRTUAL TABLE fts USING fts5(instruction, input, output,"
+            " tokenize = 'unicode61 remove_diacritics 2');"
+            "DELETE FROM meta;"
+        )
+        self._set_meta("schema", SCHEMA_VERSION)
+
+    def _upsert(self, rows: Iterable[tuple[int, dict, str]]):
+        """rows: (Ordinalzahl, Datensatz, Schlüssel)"""
+        records, texts = [], []
+        for ordinal, record, key in rows:
+            records.append((
+                ordinal, key,
+                *(_as_text(record.get(field)) for field in ("source_file", "license", "created_at")),
+                *(int(is_missing(record.get(field))) for field in TEXT_FIELDS),
+            ))
+            texts.append((ordinal, *("" if is_missing(record.get(f)) else str(record[f]) for f in TEXT_FIELDS)))
+        self._db.executemany("DELETE FROM fts WHERE rowid = ?", [(row[0],) for row in texts])
+        self._db.executemany("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?)", records)
+        self._db.executemany("INSERT INTO fts (rowid, instruction, input, output) VALUES (?, ?, ?, ?)", texts)
+
+    def sync(self) -> int:
+        """
+        Bringt den Such-Index auf den Stand von Datei und Patch-Log.
+
+        :return: Anzahl neu aufgenommener Datensätze
+        """
+        with self._lock:
+            index = self.store.index
+            with index.lock:
+                index.refresh()
+                generation, total = index.generation, len(index.offsets)
+            # neue generation nur bei fremd ersetzter Datei; Verdichtungen behalten sie
+            if self._meta("generation") != generation:
+                self._reset()
+                self._set_meta("generation", generation)
+            indexed = int(self._meta("records") or 0)
+            patch_state, patches = self.store.patch_snapshot()
+
+            self._db.execute("BEGIN")
+            try:
+                for start in range(indexed, total, SYNC_BATCH):
+                    ordinals = list(range(start, min(start + SYNC_BATCH, total)))
+                    records, keys = self.store.read(ordinals)
+                    self._upsert(zip(ordinals, records, keys))
+                self._set_meta("records", total)
+
+                if self._meta("patches") != patch_state:
+                    rows = []
+                    for key, record in patches.items():
+                        for (ordinal,) in self._db.execute("SELECT ordinal FROM records WHERE key = ?", (key,)):
+                            rows.append((ordinal, record, key))
+                    self._upsert(rows)
+                    self._set_meta("patches", patch_state)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            return max(total - indexed, 0)
+
+    # ------------------------------------------------------------------ Abfragen
+
+    def licenses(self) -> List[str]:
+        self.sync()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT DISTINCT license FROM records WHERE license IS NOT NULL ORDER BY license"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def search(self, text: str = "", source: str = "", license: str = "", missing: Iterable[str] = (),
+               sort_by: str = DEFAULT_SORT, descending: bool = False,
+               limit: int = 10, offset: int = 0) -> tuple[List[int], int]:
+        """
+        Sucht Datensätze nach Volltext (alle Wörter in instruction/input/output), Teilstring der
+        Quelle, exakter Lizenz und fehlenden Feldern.
+
+        :return: (Ordinalzahlen der angefragten Seite, Gesamtzahl der Treffer)
+        """
+        self.sync()
+        joins, where, params = "", [], []
+        match = fts_query(text) if text else None
+        if match:
+            joins = "JOIN fts ON fts.rowid = r.ordinal"
+            where.append("fts MATCH ?")
+            params.append(match)
+        if source:
+            where.append("instr(py_lower(r.source_file), ?) > 0")
+            params.append(source.lower())
+        if license:
+            where.append("r.license = ?")
+            params.append(license)
+        for field in missing or ():
+            if field not in TEXT_FIELDS:
+                raise ValueError(f"Unbekanntes Feld: {field}")
+            where.append(f"r.missing_{field} = 1")
+
+        order = SORT_OPTIONS.get(sort_by, SORT_OPTIONS[DEFAULT_SORT])
+        if order.startswith("bm25") and not match:
+            order = SORT_OPTIONS[DEFAULT_SORT]
+        direction = "DESC" if descending else "ASC"
+        clause = f"FROM records r {joins}" + (" WHERE " + " AND ".join(where) if where else "")
+
+        with self._lock:
+            total = self._db.execute(f"SELECT count(*) {clause}", params).fetchone()[0]
+            rows = self._db.execute(
+                f"SELECT r.ordinal {clause} ORDER BY {order} {direction}, r.ordinal LIMIT ? OFFSET ?",
+                [*params, limit, offset],
+            ).fetchall()
+        return [row[0] for row in rows], total
+
+    def close(self):
+        self._db.close()
@@ -1,52 +1,69 @@
+import argparse
 import re
 from pathlib import Path
 from striprtf.striprtf import rtf_to_text
 
+from conversion_manifest import ConversionManifest, converter_version
+from find_duplicate_sources import exclude_duplicates
+from text_normalization import PAGE_FOOTER, CharFilter, Pipeline, RegexFilter, StageTimings
+
 
 # 📁 Eingabe- und Ausgabeverzeichnisse
 RTF_FOLDER = Path("../data/rtf")
 MARKDOWN_FOLDER = Path("../data/markdown")
 MARKDOWN_FOLDER.mkdir(parents=True, exist_ok=True)
+CONVERTER_VERSION = "3"  # Erhöhen, wenn sich die erzeugte Markdown-Ausgabe ändert
+
+
+UNPRINTABLE = CharFilter("non_printable", remove=lambda c: not c.isprintable() and c not in "\r\n\t")
+HYPHEN_MARK = CharFilter("hyphen_mark", replace={"¬": " "})
+
+
+def _join_line_breaks(match: re.Match) -> str:
+    if match.group("bullet"):
+        return "* "
+    return (match.group("marker") or match.group("single")) + " "
+
+
+# Alle Zeilenumbruch-Korrekturen als eine Alternation (ein Durchlauf):
+#   •-Aufzählungen → "* ", Umbruch (samt Leerzeile) nach "1)", "12)", "*)" bzw. "123)" → Leerzeichen
+LINE_BREAKS = RegexFilter(
+    "line_breaks",
+    r"(?P<bullet>^•\t\s*\r?\n|•\r?\n)"
+    r"|^(?P<marker>(?:\d{1,2}|\*)\))\s*\r?\n\s*\r?\n"
+    r"|^(?P<single>(?:\d{1,3}|\*)\))\r?\n",
+    _join_line_breaks,
+    re.MULTILINE,
+)
+# Option: Simuliere einfache Kursiv-Umwandlung durch Erkennung von typischen *kursiv* Mustern
+ITALIC_TO_QUOTE = RegexFilter("italic_to_quote", r"(?<!\*)\*([^\*]+)\*(?!\*)", r"> \1")
 
 
 def clean_text(text: str,
                remove_non_printable: bool = True,
                apply_regex_filters: bool = True,
                remove_footer: bool = True,
-               convert_italic_to_quote: bool = True) -> str:
+               convert_italic_to_quote: bool = True,
+               timings: StageTimings | None = None) -> str:
     """
     Bereinigt den extrahierten Text durch verschiedene konfigurierbare Filter.
+    Zeichenfilter laufen gemeinsam in einem translate-Durchlauf, die Zeilenumbruch-Regeln
+    in einem Regex-Durchlauf; timings sammelt die Laufzeit pro Stufe.
     """
-
+    stages = []
     if remove_non_printable:
-        text = ''.join(c for c in text if c.isprintable() or c in '\r\n\t')
-
+        stages.append(UNPRINTABLE)
     if apply_regex_filters:
-        # Bullet Point-Korrekturen
-        text = re.sub(r"^[•]\t\s*\r?\n", "* ", text, flags=re.MULTILINE)
-        text = re.sub(r"•\r?\n", "* ", text)
-
-        # Aufzählungszeichenbereinigung
-        text = re.sub(r"(?<=^\d\d\))\s*\r?\n\s*\r?\n", " ", text, flags=re.MULTILINE)
-        text = re.sub(r"(?<=^[\d\*]\))\s*\r?\n\s*\r?\n", " ", text, flags=re.MULTILINE)
-        text = text.replace("¬", " ")
-
-        # In korrekter Reihenfolge:
-        text = re.sub(r"(?<=^\d{3}\))\r?\n", " ", text, flags=re.MULTILINE)
-        text = re.sub(r"(?<=^\d{2}\))\r?\n", " ", text, flags=re.MULTILINE)
-        text = re.sub(r"(?<=^[\d\*]\))\r?\n", " ", text, flags=re.MULTILINE)
-
+        stages += [HYPHEN_MARK, LINE_BREAKS]
     if remove_footer:
-        text = re.sub(r"(Seite\s+\d+\s+von\s+\d+)", "", text, flags=re.IGNORECASE)
-
+        stages.append(PAGE_FOOTER)
     if convert_italic_to_quote:
-        # Option: Simuliere einfache Kursiv-Umwandlung durch Erkennung von typischen *kursiv* Mustern
-        text = re.sub(r"(?<!\*)\*([^\*]+)\*(?!\*)", r"> \1", text)
+        stages.append(ITALIC_TO_QUOTE)
 
-    return text.strip()
+    return Pipeline(stages, timings).run(text).strip()
 
 
-def convert_rtf_to_markdown(input_path: Path, output_path: Path):
+def convert_rtf_to_markdown(input_path: Path, output_path: Path, timings: StageTimings | None = None):
     """
     Konvertiert ein RTF-Dokument zu Markdown und speichert das Ergebnis.
     """
@@ -54,7 +71,7 @@ def convert_rtf_to_markdown(input_path: Path, output_path: Path):
         rtf_content = file.read()
 
     plain_text = rtf_to_text(rtf_content)
-    cleaned_text = clean_text(plain_text)
+    cleaned_text = clean_text(plain_text, timings=timings)
 
     with open(output_path, "w", encoding="utf-8") as md_file:
         md_file.write(cleaned_text)
@@ -62,15 +79,31 @@ def convert_rtf_to_markdown(input_path: Path, output_path: Path):
     print(f"✅ Konvertiert: {input_path.name} → {output_path.name}")
 
 
-def batch_convert_all_rtf_files():
+def batch_convert_all_rtf_files(force: bool = False):
     """
-    Durchsucht den RTF-Ordner und konvertiert alle Dateien in das Markdown-Format.
+    Durchsucht den RTF-Ordner und konvertiert alle neuen oder geänderten Dateien in das Markdown-Format.
     """
-    for rtf_file in RTF_FOLDER.glob("*.rtf"):
-        md_filename = rtf_file.stem + ".md"
-        md_path = MARKDOWN_FOLDER / md_filename
-        convert_rtf_to_markdown(rtf_file, md_path)
+    manifest = ConversionManifest(MARKDOWN_FOLDER, "rtf", converter_version(CONVERTER_VERSION, "striprtf"))
+    timings = StageTimings()
+    skipped = 0
+    try:
+        for rtf_file in exclude_duplicates(sorted(RTF_FOLDER.glob("*.rtf"))):
+            md_filename = rtf_file.stem + ".md"
+            md_path = MARKDOWN_FOLDER / md_filename
+            if not force and not manifest.needs_conversion(rtf_file, md_path):
+                skipped += 1
+                continue
+            convert_rtf_to_markdown(rtf_file, md_path, timings)
+            manifest.record(rtf_file, md_path)
+    finally:
+        manifest.save()
+    if skipped:
+        print(f"⏭️  {skipped} unveränderte RTF-Datei(en) übersprungen")
+    print(timings.report())
 
 
 if __name__ == "__main__":
-    batch_convert_all_rtf_files()
+    ap = argparse.ArgumentParser(description="Konvertiert RTF-Dateien nach Markdown.")
+    ap.add_argument("--force", action="store_true",
+                    help="Alle Dateien neu konvertieren, auch wenn sie laut Manifest unverändert sind")
+    batch_convert_all_rtf_files(force=ap.parse_args().force)
@@ -0,0 +1,180 @@
+import re
+import time
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from typing import Callable, Iterable, List
+
+
+def is_non_printable(char: str) -> bool:
+    """
+    Steuer-, Format-, private und nicht zugewiesene Zeichen (Unicode-Kategorie C) außer
+    Zeilenumbruch und Tab.
+    """
+    return unicodedata.category(char)[0] == "C" and char not in "\n\t"
+
+
+class StageTimings:
+    """
+    Summiert Laufzeit, Aufrufe und verarbeitete Zeichen pro Stufe, auch über mehrere
+    Pipelines und Prozesse hinweg (merge()).
+    """
+
+    def __init__(self):
+        self.seconds = Counter()
+        self.chars = Counter()
+        self.calls = Counter()
+
+    def add(self, stage: str, seconds: float, chars: int):
+        self.seconds[stage] += seconds
+        self.chars[stage] += chars
+        self.calls[stage] += 1
+
+    def as_dict(self) -> dict:
+        return {stage: {"seconds": self.seconds[stage], "chars": self.chars[stage], "calls": self.calls[stage]}
+                for stage in self.seconds}
+
+    def merge(self, timings: dict):
+        for stage, values in timings.items():
+            self.seconds[stage] += values["seconds"]
+            self.chars[stage] += values["chars"]
+            self.calls[stage] += values["calls"]
+
+    def report(self, title: str = "Normalisierung") -> str:
+        total = sum(self.seconds.values())
+        if not total:
+            return f"⏱️  {title}: keine Daten"
+        lines = [f"⏱️  {title}: {total:.2f} s"]
+        for stage, seconds in self.seconds.most_common():
+            mb = self.chars[stage] / 1_000_000
+            rate = f"{mb / seconds:8.1f} MZ/s" if seconds else ""
+            lines.append(f"  {stage:30s} {seconds:8.2f} s {100 * seconds / total:5.1f} % {rate}")
+        return "\n".join(lines)
+
+
+class Stage:
+    """
+    Eine Normalisierungsstufe: Funktion str → str mit Namen für die Zeitmessung.
+
+    :param name: Name im Timing-Bericht
+    :param fn: Transformation des Texts
+    """
+
+    def __init__(self, name: str, fn: Callable[[str], str]):
+        self.name = name
+        self.fn = fn
+
+    def apply(self, text: str) -> str:
+        return self.fn(text)
+
+
+class CharFilter(Stage):
+    """
+    Zeichenweise Ersetzung bzw. Entfernung per str.translate. Die Übersetzungstabelle wird
+    lazy gefüllt: jedes Zeichen wird nur beim ersten Auftreten geprüft. Benachbarte
+    CharFilter einer Pipeline werden zu einer Tabelle (einem Durchlauf) verschmolzen.
+
+    :param remove: Prädikat für zu entfernende Zeichen
+    :param replace: Feste Ersetzungen (Zeichen → Text), haben Vorrang vor remove
+    """
+
+    def __init__(self, name: str, remove: Callable[[str], bool] | None = None,
+                 replace: dict[str, str] | None = None):
+        self.remove = remove
+        self.replace = replace or {}
+        self.table = _TranslationTable(self.map_char)
+        super().__init__(name, self._translate)
+
+    def map_char(self, char: str) -> str:
+        if char in self.replace:
+            return self.replace[char]
+        return "" if self.remove is not None and self.remove(char) else char
+
+    def _translate(self, text: str) -> str:
+        return text.translate(self.table)
+
+
+class _TranslationTable(dict):
+    def __init__(self, map_char: Callable[[str], str]):
+        super().__init__()
+        self.map_char = map_char
+
+    def __missing__(self, codepoint: int) -> str:
+        value = self.map_char(chr(codepoint))
+        self[codepoint] = value
+        return value
+
+
+class _FusedCharFilter(CharFilter):
+    """Mehrere CharFilter hintereinander, als eine Tabelle ausgeführt."""
+
+    def __init__(self, filters: tuple):
+        self.filters = filters
+        super().__init__("+".join(f.name for f in filters))
+
+    def map_char(self, char: str) -> str:
+        for char_filter in self.filters:
+            char = char.translate(char_filter.table)
+        return char
+
+
+@lru_cache(maxsize=None)
+def _fuse(filters: tuple) -> CharFilter:
+    # Gecacht, damit die lazy gefüllte Tabelle über Pipeline-Instanzen hinweg erhalten bleibt
+    return filters[0] if len(filters) == 1 else _FusedCharFilter(filters)
+
+
+class RegexFilter(Stage):
+    """
+    Vorkompilierter re.sub-Durchlauf. repl darf wie bei re.sub ein String oder eine Funktion
+    sein; mehrere Regeln lassen sich so als Alternation in einem Durchlauf zusammenfassen.
+    """
+
+    def __init__(self, name: str, pattern: str, repl: str | Callable[[re.Match], str], flags: int = 0):
+        self.pattern = re.compile(pattern, flags)
+        self.repl = repl
+        super().__init__(name, self._sub)
+
+    def _sub(self, text: str) -> str:
+        return self.pattern.sub(self.repl, text)
+
+
+class Pipeline:
+    """
+    Folge von Normalisierungsstufen mit Zeitmessung pro Stufe.
+
+    :param stages: Stufen in Ausführungsreihenfolge
+    :param timings: Gemeinsamer Timing-Sammler (sonst ein eigener)
+    """
+
+    def __init__(self, stages: Iterable[Stage], timings: StageTimings | None = None):
+        self.stages: List[Stage] = []
+        pending: list[CharFilter] = []
+        for stage in stages:
+            if isinstance(stage, CharFilter):
+                pending.append(stage)
+                continue
+            if pending:
+                self.stages.append(_fuse(tuple(pending)))
+                pending = []
+            self.stages.append(stage)
+        if pending:
+            self.stages.append(_fuse(tuple(pending)))
+        self.timings = timings if timings is not None else StageTimings()
+
+    def _apply(self, stage: Stage, text: str) -> str:
+        start = time.perf_counter()
+        result = stage.apply(text)
+        self.timings.add(stage.name, time.perf_counter() - start, len(text))
+        return result
+
+    def run(self, text: str) -> str:
+        for stage in self.stages:
+            text = self._apply(stage, text)
+        return text
+
+
+# Gemeinsame Stufen der Konverter
+NON_PRINTABLE = CharFilter("non_printable", remove=is_non_printable)
+# Nur innerhalb einer Zeile, damit kein Text über Absätze hinweg entfernt wird
+PAGE_FOOTER = RegexFilter("page_footer", r"(Seite[^\S\n]+\d+[^\S\n]+von[^\S\n]+\d+)", "", re.IGNORECASE)
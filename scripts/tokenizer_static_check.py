@@ -10,11 +10,40 @@ Static sanity-check & quick stats für einen Hugging-Face-Tokenizer.
 """
 
 import argparse
+import json
 import pathlib
+import random
+import re
 import sys
-from collections import Counter
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from itertools import chain
+from typing import Iterable, Iterator
 
-from tokenizers import Tokenizer
+import numpy as np
+from tokenizers import Encoding, Tokenizer
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet-Ausgabe ist optional
+    pa = pq = None
+
+BATCH_FILES = 256            # Dateien pro encode_batch-Aufruf
+BATCH_CHARS = 8_000_000      # … bzw. höchstens so viele Zeichen
+READ_THREADS = 4             # Threads zum Vorauslesen der nächsten Batches
+MARKERS = "Ġ▁Ċ"              # Präfix-Marker der Pre-Tokenizer
+
+# Histogramme des Berichts (pro Unterordner, über die Dateien)
+RATIO_EDGES = np.round(np.linspace(0.0, 1.0, 41), 3)          # Tokens/Char in Schritten von 0,025
+TOKEN_EDGES = np.array([0] + [2 ** i for i in range(4, 25)])  # Tokens pro Datei, logarithmisch
+BYTE_TOKEN = re.compile(r"<0x[0-9A-Fa-f]{2}>")               # byte_fallback-Tokens (SentencePiece-Stil)
+
+# Verifikation: Kontexte, in denen jedes Spezial-Token geprüft wird
+TOKENS_MD = pathlib.Path(__file__).resolve().parent.parent / "docs" / "TOKENS.md"
+PROBE_CONTEXTS = ("{t}", "Vgl. {t} 242 und {t}.", "x{t}y", "{t}\n{t}", "Straße {t}, Rn. 15")
 
 
 # ───────────────────────── Hilfsfunktionen ──────────────────────────
@@ -35,6 +64,16 @@ def load_specials(path: str) -> list[str]:
         sys.exit(2)
 
 
+def load_examples(path: str) -> list[str]:
+    try:
+        return tokens_md_examples(pathlib.Path(path))
+    except Exception as e:
+        banner("✗ FEHLER beim Laden von TOKENS.md")
+        print(f"Pfad        : {path}")
+        print(f"Exception   : {type(e).__name__}: {e}")
+        sys.exit(2)
+
+
 def load_tokenizer(path: str) -> Tokenizer:
     try:
         return Tokenizer.from_file(path)
@@ -67,44 +106,228 @@ def special_token_atomic(tok: Tokenizer, specials: list[str]) -> bool:
     return True
 
 
+def iter_corpus_files(p: pathlib.Path) -> Iterator[pathlib.Path]:
+    if p.is_file():
+        yield p
+    else:
+        yield from p.rglob("*.txt")
+
+
+def sample_files(files: Iterable[pathlib.Path], k: int, seed: int) -> tuple[list[pathlib.Path], int]:
+    """
+    Reproduzierbare Zufallsstichprobe von k Dateien (Reservoir-Sampling, ein Durchlauf) in
+    sortierter Reihenfolge.
+
+    :return: (Stichprobe, Gesamtzahl der Dateien)
+    """
+    rnd = random.Random(seed)
+    reservoir: list[pathlib.Path] = []
+    total = 0
+    for total, fp in enumerate(files, start=1):
+        if len(reservoir) < k:
+            reservoir.append(fp)
+        else:
+            j = rnd.randrange(total)
+            if j < k:
+                reservoir[j] = fp
+    return sorted(reservoir), total
+
+
+def _read_batch(paths: list[pathlib.Path]) -> tuple[list[pathlib.Path], list[str]]:
+    return paths, [fp.read_text(encoding="utf-8", errors="ignore") for fp in paths]
+
+
+def _file_batches(paths: Iterable[pathlib.Path], batch_files: int) -> Iterator[list[pathlib.Path]]:
+    batch, size = [], 0
+    for fp in paths:
+        batch.append(fp)
+        try:
+            size += fp.stat().st_size
+        except OSError:
+            pass
+        if len(batch) >= batch_files or size >= BATCH_CHARS:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+def iter_encoded(tok: Tokenizer, paths: Iterable[pathlib.Path], batch_files: int = BATCH_FILES
+                 ) -> Iterator[tuple[list[pathlib.Path], list[str], list[Encoding]]]:
+    """
+    Liest die Dateien in Batches (Threads lesen voraus) und kodiert jeden Batch mit
+    encode_batch, das parallel in Rust arbeitet.
+
+    :return: je Batch (Pfade, Texte, Encodings)
+    """
+    with ThreadPoolExecutor(max_workers=READ_THREADS) as pool:
+        pending = deque()
+        for batch in _file_batches(paths, batch_files):
+            pending.append(pool.submit(_read_batch, batch))
+            if len(pending) > READ_THREADS:
+                batch_paths, texts = pending.popleft().result()
+                yield batch_paths, texts, tok.encode_batch(texts, add_special_tokens=False)
+        while pending:
+            batch_paths, texts = pending.popleft().result()
+            yield batch_paths, texts, tok.encode_batch(texts, add_special_tokens=False)
+
+
+def special_token_lookup(tok: Tokenizer) -> tuple[np.ndarray, list[str]]:
+    """
+    Lookup-Array Token-ID → Index in names (-1 = kein Spezial-Token). Als Spezial-Token zählt jedes
+    Token, das ohne Präfix-Marker mit "<" beginnt; Varianten mit Marker werden zusammengefasst.
+    """
+    vocab = tok.get_vocab(with_added_tokens=True)
+    lookup = np.full(max(vocab.values(), default=-1) + 1, -1, dtype=np.int32)
+    names: dict[str, int] = {}
+    for token, tid in vocab.items():
+        clean = token.lstrip(MARKERS)
+        if clean.startswith("<"):
+            lookup[tid] = names.setdefault(clean, len(names))
+    return lookup, list(names)
+
+
+def tokens_md_examples(path: pathlib.Path) -> list[str]:
+    """Beispiele der Spalte "Beispiel (im Dataset)" aus docs/TOKENS.md (ohne Backticks, \\| → |)."""
+    examples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.startswith("| `<"):
+                continue
+            cells = [c.strip() for c in re.split(r"(?<!\\)\|", line.strip())[1:-1]]
+            example = cells[-1] if cells else ""
+            if len(example) > 1 and example.startswith("`") and example.endswith("`"):
+                example = example[1:-1]
+            example = example.replace("\\|", "|")
+            if example and example != "—":
+                examples.append(example)
+    return examples
+
+
+def expected_roundtrip(tok: Tokenizer, text: str, pattern: re.Pattern) -> str:
+    """Erwartete Ausgabe von decode(encode(text)): Spezial-Tokens unverändert, übriger Text normalisiert."""
+    if tok.normalizer is None:
+        return text
+    parts = pattern.split(text) if pattern.pattern else [text]
+    specials = pattern.findall(text) if pattern.pattern else []
+    out = [tok.normalizer.normalize_str(parts[0])]
+    for special, part in zip(specials, parts[1:]):
+        out += [special, tok.normalizer.normalize_str(part)]
+    return "".join(out)
+
+
+def verify_specials(tok: Tokenizer, specials: list[str], examples: list[str]) -> bool:
+    """
+    Prüft alle Spezial-Tokens in einem encode_batch-/decode_batch-Durchlauf:
+    - Vokabular: Token vorhanden und als Added Token registriert
+    - Normalizer: würde er das Token verändern (z.B. <BGH> → <bgh> durch Lowercase) und ist das
+      Token nicht vor der Normalisierung geschützt (normalized=False), kann es nie erkannt werden
+    - Atomarität im Kontext: jedes Vorkommen in den Probesätzen und TOKENS.md-Beispielen ergibt
+      genau eine Token-ID
+    - Round-Trip: decode(encode(x)) entspricht x mit normalisiertem Fließtext
+    """
+    start = time.perf_counter()
+    banner("SPECIAL-TOKEN VERIFIKATION")
+    problems: dict[str, list[str]] = defaultdict(list)
+
+    added = {token.content: token for token in tok.get_added_tokens_decoder().values()}
+    ids = {sp: tok.token_to_id(sp) for sp in specials}
+    for sp, tid in ids.items():
+        if tid is None:
+            problems["Nicht im Vokabular"].append(sp)
+        elif sp not in added:
+            problems["Nicht als Added Token registriert"].append(sp)
+        if tok.normalizer is not None and tok.normalizer.normalize_str(sp) != sp:
+            if sp in added and not added[sp].normalized:
+                problems["(Info) Normalizer würde verändern, geschützt"].append(sp)
+            else:
+                problems["Normalizer verändert Token"].append(f"{sp} → {tok.normalizer.normalize_str(sp)}")
+    if tok.decoder is None:
+        problems["Kein Decoder gesetzt"].append("decode() liefert Byte-Level-Rohtokens")
+
+    known = sorted((sp for sp, tid in ids.items() if tid is not None), key=len, reverse=True)
+    pattern = re.compile("|".join(map(re.escape, known)))
+    probes = [ctx.format(t=sp) for sp in known for ctx in PROBE_CONTEXTS] + examples
+    encodings = tok.encode_batch(probes, add_special_tokens=False)
+    decoded = tok.decode_batch([enc.ids for enc in encodings], skip_special_tokens=False)
+
+    for text, enc, dec in zip(probes, encodings, decoded):
+        if known:
+            found = Counter(ids[sp] for sp in pattern.findall(text))
+            got = Counter(tid for tid in enc.ids if tid in found)
+            if found != got:
+                problems["Nicht atomar im Kontext"].append(f"{text!r} → {enc.tokens}")
+        expected = expected_roundtrip(tok, text, pattern)
+        if dec != expected:
+            problems["Round-Trip weicht ab"].append(f"{expected!r} ≠ {dec!r}")
+
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{len(specials)} Spezial-Tokens, {len(probes)} Probesätze "
+          f"({len(examples)} aus TOKENS.md) in {elapsed:.0f} ms geprüft")
+    ok = True
+    for category, items in problems.items():
+        info = category.startswith("(Info)")
+        ok &= info
+        print(f"{'ℹ' if info else '✗'} {category}: {len(items)}")
+        for item in items[:10]:
+            print("   •", item)
+        if len(items) > 10:
+            print(f"   … {len(items) - 10} weitere")
+    if ok:
+        print("✓ special_token_verify – atomar im Kontext, Round-Trip ok")
+    return ok
+
+
 def corpus_stats(tok: Tokenizer, corpus_path: str,
-                 low_thr: float, high_thr: float) -> bool:
+                 low_thr: float, high_thr: float,
+                 sample: int = 0, seed: int = 0, batch_files: int = BATCH_FILES,
+                 report: "TokenReport | None" = None) -> bool:
     banner("CORPUS STATS")
     p = pathlib.Path(corpus_path)
-    paths = [p] if p.is_file() else list(p.rglob("*.txt"))[:1000]
-    if not paths:
+    if sample > 0:
+        paths, available = sample_files(iter_corpus_files(p), sample, seed)
+    else:
+        paths, available = iter_corpus_files(p), None
+
+    lookup, names = special_token_lookup(tok)
+    hits = np.zeros(len(names), dtype=np.int64)
+    total_files = total_chars = total_tokens = 0
+
+    for batch_paths, texts, encodings in iter_encoded(tok, paths, batch_files):
+        total_files += len(batch_paths)
+        total_chars += sum(map(len, texts))
+        id_lists = [enc.ids for enc in encodings]
+        lengths = np.fromiter(map(len, id_lists), dtype=np.int64, count=len(id_lists))
+        count = int(lengths.sum())
+        total_tokens += count
+        ids = np.fromiter(chain.from_iterable(id_lists), dtype=np.int64, count=count)
+        if count and names:
+            mapped = lookup[ids]
+            hits += np.bincount(mapped[mapped >= 0], minlength=len(names))
+        if report is not None:
+            report.add_batch(batch_paths, texts, lengths, ids)
+
+    if not total_files:
         print("Keine *.txt-Dateien in:", corpus_path)
+        if report is not None:
+            report.close()  # leerer Bericht statt halb geschriebener Dateien
         return True
 
-    total_chars = total_tokens = 0
-    special_hits: Counter[str] = Counter()
-
-    for fp in paths:
-        text = fp.read_text(encoding="utf-8", errors="ignore")
-        enc = tok.encode(text)
-        total_chars  += len(text)
-        total_tokens += len(enc.ids)
-        special_hits.update(tok.id_to_token(tid) for tid in enc.ids
-                            if tok.id_to_token(tid).startswith("<"))
-
-        clean = lambda s: s.lstrip("Ġ▁Ċ")  # Marker entfernen
-        special_hits.update(
-            clean(tok.id_to_token(tid))
-            for tid in enc.ids
-            if clean(tok.id_to_token(tid)).startswith("<")
-        )
-
     # Deutsches Tausender-Format (Punkt)
     fmt = lambda n: f"{n:,}".replace(",", ".")
 
-    ratio = total_tokens / total_chars
+    ratio = total_tokens / total_chars if total_chars else 0.0
 
-    print(f"Analysierte Dateien : {len(paths)}")
+    if available is not None:
+        print(f"Analysierte Dateien : {len(paths)} (Stichprobe von {fmt(available)}, Seed {seed})")
+    else:
+        print(f"Analysierte Dateien : {fmt(total_files)}")
     print(f"Zeichen insgesamt   : {fmt(total_chars)}")
     print(f"Tokens insgesamt    : {fmt(total_tokens)}")
     print(f"Tokens/Char-Ratio   : {ratio:.3f}  "
           f"(Schwellwert {low_thr:.2f}–{high_thr:.2f})\n")
 
+    special_hits = Counter({names[i]: int(hits[i]) for i in np.flatnonzero(hits)})
     print("Top-20 Spezial-Token-Hits:")
     if special_hits:
         for tok_str, cnt in special_hits.most_common(20):
@@ -112,6 +335,10 @@ def corpus_stats(tok: Tokenizer, corpus_path: str,
     else:
         print("  (keine Treffer im Korpus)")
 
+    if report is not None:
+        report.close()
+        report.print_summary(low_thr, high_thr)
+
     if not (low_thr <= ratio <= high_thr):
         print(f"\n✗  Ratio außerhalb des Zielbereichs!")
         return False
@@ -120,17 +347,213 @@ def corpus_stats(tok: Tokenizer, corpus_path: str,
     return True
 
 
+# ──────────────────────────── Bericht ─────────────────────────────
+def byte_level_alphabet() -> dict[str, int]:
+    """Zeichen → Byte der ByteLevel-Abbildung (GPT-2 bytes_to_unicode)."""
+    printable = list(range(ord("!"), ord("~") + 1)) + list(range(ord("¡"), ord("¬") + 1)) + \
+        list(range(ord("®"), ord("ÿ") + 1))
+    chars, n = {}, 0
+    for b in range(256):
+        if b in printable:
+            chars[chr(b)] = b
+        else:
+            chars[chr(256 + n)] = b
+            n += 1
+    return chars
+
+
+def uses_byte_level(tok: Tokenizer) -> bool:
+    """True, wenn Pre-Tokenizer oder Decoder (auch innerhalb einer Sequence) ByteLevel ist."""
+    def has_byte_level(node) -> bool:
+        if isinstance(node, dict):
+            return node.get("type") == "ByteLevel" or any(map(has_byte_level, node.values()))
+        if isinstance(node, list):
+            return any(map(has_byte_level, node))
+        return False
+
+    config = json.loads(tok.to_str())
+    return has_byte_level(config.get("pre_tokenizer")) or has_byte_level(config.get("decoder"))
+
+
+def byte_fallback_lookup(tok: Tokenizer) -> np.ndarray:
+    """
+    Bool-Array Token-ID → Byte-Fallback. Dazu zählen <0xNN>-Tokens und, nur bei ByteLevel-Tokenizern,
+    Tokens aus einem einzelnen Nicht-ASCII-Byte, also Teilstücke eines Zeichens, das nicht als Ganzes
+    im Vokabular ist. Bei anderen Tokenizern ist z.B. "ß" ein ganzes Zeichen.
+    """
+    vocab = tok.get_vocab(with_added_tokens=True)
+    alphabet = byte_level_alphabet() if uses_byte_level(tok) else {}
+    fallback = np.zeros(max(vocab.values(), default=-1) + 1, dtype=bool)
+    for token, tid in vocab.items():
+        if BYTE_TOKEN.fullmatch(token) or (len(token) == 1 and alphabet.get(token, 0) >= 0x80):
+            fallback[tid] = True
+    return fallback
+
+
+class TokenReport:
+    """
+    Token-Statistik pro Datei und pro Unterordner in einem Durchlauf mit konstantem Speicher:
+    Dateizeilen werden sofort nach <bericht>.files.jsonl (optional .files.parquet) geschrieben,
+    im Speicher bleiben nur Summen und Histogramme je Unterordner.
+    """
+
+    COUNTERS = ("files", "chars", "bytes", "words", "tokens", "unk", "byte_fallback")
+
+    def __init__(self, tok: Tokenizer, tokenizer_path: str, corpus_path: str, report_path: str,
+                 parquet: bool = False):
+        self.root = pathlib.Path(corpus_path)
+        if self.root.is_file():
+            self.root = self.root.parent
+        self.path = pathlib.Path(report_path)
+        self.meta = {"tokenizer": tokenizer_path, "corpus": corpus_path}
+        self.unk_id = tok.token_to_id("<unk>")
+        self.fallback = byte_fallback_lookup(tok)
+        self.dirs: dict[str, dict] = {}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.files_path = self.path.with_suffix(".files.jsonl")
+        self._rows = open(self.files_path, "w", encoding="utf-8")
+        self._parquet = None
+        self.parquet_path = None
+        if parquet:
+            if pq is None:
+                print("⚠️  pyarrow nicht installiert – keine Parquet-Ausgabe")
+            else:
+                self.parquet_path = self.path.with_suffix(".files.parquet")
+
+    def _dir_stats(self, key: str) -> dict:
+        stats = self.dirs.get(key)
+        if stats is None:
+            stats = self.dirs[key] = {name: 0 for name in self.COUNTERS}
+            stats["ratio_hist"] = np.zeros(len(RATIO_EDGES) - 1, dtype=np.int64)
+            stats["token_hist"] = np.zeros(len(TOKEN_EDGES) - 1, dtype=np.int64)
+        return stats
+
+    def add_batch(self, paths: list[pathlib.Path], texts: list[str], lengths: np.ndarray, ids: np.ndarray):
+        """Wertet einen kodierten Batch aus (ids = alle Token-IDs der Dateien hintereinander)."""
+        n = len(paths)
+        owner = np.repeat(np.arange(n), lengths)
+        unk = (np.bincount(owner[ids == self.unk_id], minlength=n) if self.unk_id is not None
+               else np.zeros(n, dtype=np.int64))
+        fallback = np.bincount(owner[self.fallback[ids]], minlength=n)
+        chars = np.fromiter(map(len, texts), dtype=np.int64, count=n)
+        nbytes = np.fromiter((len(t.encode("utf-8")) for t in texts), dtype=np.int64, count=n)
+        words = np.fromiter((len(t.split()) for t in texts), dtype=np.int64, count=n)
+        ratio = np.divide(lengths, chars, out=np.zeros(n), where=chars > 0)
+
+        names, dirs = [], []
+        for fp in paths:
+            try:
+                rel = fp.relative_to(self.root)
+            except ValueError:
+                rel = fp
+            names.append(rel.as_posix())
+            dirs.append(rel.parent.as_posix())
+
+        columns = {"chars": chars, "bytes": nbytes, "words": words, "tokens": lengths,
+                   "unk": unk, "byte_fallback": fallback}
+        for key in dict.fromkeys(dirs):
+            mask = np.fromiter((d == key for d in dirs), dtype=bool, count=n)
+            stats = self._dir_stats(key)
+            stats["files"] += int(mask.sum())
+            for name, values in columns.items():
+                stats[name] += int(values[mask].sum())
+            stats["ratio_hist"] += np.histogram(np.clip(ratio[mask], 0, RATIO_EDGES[-1]), RATIO_EDGES)[0]
+            stats["token_hist"] += np.histogram(np.clip(lengths[mask], 0, TOKEN_EDGES[-1]), TOKEN_EDGES)[0]
+
+        rows = [{"path": name, "dir": d, **{k: int(v[i]) for k, v in columns.items()},
+                 "tokens_per_char": round(float(ratio[i]), 4)}
+                for i, (name, d) in enumerate(zip(names, dirs))]
+        self._rows.write("".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows))
+        if self.parquet_path is not None:
+            table = pa.Table.from_pylist(rows)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.parquet_path, table.schema)
+            self._parquet.write_table(table)
+
+    @staticmethod
+    def metrics(stats: dict) -> dict:
+        def rate(a, b):
+            return round(stats[a] / stats[b], 6) if stats[b] else None
+        return {
+            **{name: stats[name] for name in TokenReport.COUNTERS},
+            "tokens_per_char": rate("tokens", "chars"),
+            "tokens_per_word": rate("tokens", "words"),
+            "unk_rate": rate("unk", "tokens"),
+            "byte_fallback_rate": rate("byte_fallback", "bytes"),
+        }
+
+    def totals(self) -> dict:
+        total = {name: sum(s[name] for s in self.dirs.values()) for name in self.COUNTERS}
+        return self.metrics(total)
+
+    def close(self):
+        """Schließt die Dateizeilen und schreibt die Zusammenfassung (JSON) atomar."""
+        self._rows.close()
+        if self._parquet is not None:
+            self._parquet.close()
+        summary = {
+            **self.meta,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "totals": self.totals(),
+            "histogram_edges": {"tokens_per_char": RATIO_EDGES.tolist(), "tokens": TOKEN_EDGES.tolist()},
+            "directories": {
+                key: {**self.metrics(stats),
+                      "hist_tokens_per_char": stats["ratio_hist"].tolist(),
+                      "hist_tokens": stats["token_hist"].tolist()}
+                for key, stats in sorted(self.dirs.items())
+            },
+            "files_jsonl": self.files_path.name,
+            "files_parquet": self.parquet_path.name if self._parquet is not None else None,
+        }
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False)
+        tmp_path.replace(self.path)
+
+    def print_summary(self, low_thr: float, high_thr: float) -> None:
+        banner("TOKEN-BERICHT pro Unterordner")
+        pct = lambda v: "–" if v is None else f"{v * 100:.3f}%"
+        num = lambda v: "–" if v is None else f"{v:.3f}"
+        print(f"  {'Ordner':30s} {'Dateien':>8} {'Tok/Char':>9} {'Tok/Wort':>9} {'<unk>':>9} {'Byte-FB':>9}")
+        for key, stats in sorted(self.dirs.items()):
+            m = self.metrics(stats)
+            flag = "" if m["tokens_per_char"] is None or low_thr <= m["tokens_per_char"] <= high_thr else "  ✗"
+            print(f"  {key:30s} {m['files']:>8} {num(m['tokens_per_char']):>9} {num(m['tokens_per_word']):>9} "
+                  f"{pct(m['unk_rate']):>9} {pct(m['byte_fallback_rate']):>9}{flag}")
+        print(f"\nBericht: {self.path} (Dateien: {self.files_path.name}"
+              + (f", {self.parquet_path.name}" if self._parquet is not None else "") + ")")
+
+
 # ───────────────────────────── CLI ────────────────────────────────
 def main() -> None:
     ap = argparse.ArgumentParser()
     ap.add_argument("--tokenizer", required=True)
     ap.add_argument("--specials",  required=True)
     ap.add_argument("--corpus")
+    ap.add_argument("--verify", action="store_true",
+                    help="Spezial-Tokens im Kontext, per Round-Trip und gegen den Normalizer prüfen")
+    ap.add_argument("--tokens-md", default=str(TOKENS_MD),
+                    help="TOKENS.md mit Beispielen für --verify (default docs/TOKENS.md)")
     ap.add_argument("--ratio-min", type=float, default=0.20,
                     help="untere Schranke für Tokens/Char (default 0.20)")
     ap.add_argument("--ratio-max", type=float, default=0.35,
                     help="obere Schranke für Tokens/Char (default 0.35)")
+    ap.add_argument("--sample", type=int, default=0,
+                    help="nur eine Zufallsstichprobe von N Dateien auswerten (default 0 = alle)")
+    ap.add_argument("--seed", type=int, default=0,
+                    help="Seed für --sample (gleicher Seed = gleiche Stichprobe)")
+    ap.add_argument("--batch-files", type=int, default=BATCH_FILES,
+                    help=f"Dateien pro encode_batch-Aufruf (default {BATCH_FILES})")
+    ap.add_argument("--report",
+                    help="Token-Bericht pro Datei/Unterordner als JSON schreiben (benötigt --corpus)")
+    ap.add_argument("--parquet", action="store_true",
+                    help="Dateizeilen des Berichts zusätzlich als Parquet schreiben (pyarrow)")
     args = ap.parse_args()
+    if args.report and not args.corpus:
+        ap.error("--report benötigt --corpus")
+    if args.parquet and not args.report:
+        ap.error("--parquet benötigt --report")
 
     banner("TOKENIZER STATIC CHECK – Parameter")
     for k, v in vars(args).items():
@@ -142,10 +565,15 @@ def main() -> None:
 
     ok = True
     ok &= vocab_integrity(tok)
-    ok &= special_token_atomic(tok, specials)
+    if args.verify:
+        ok &= verify_specials(tok, specials, load_examples(args.tokens_md))
+    else:
+        ok &= special_token_atomic(tok, specials)
 
     if args.corpus:
-        ok &= corpus_stats(tok, args.corpus, args.ratio_min, args.ratio_max)
+        report = TokenReport(tok, args.tokenizer, args.corpus, args.report, args.parquet) if args.report else None
+        ok &= corpus_stats(tok, args.corpus, args.ratio_min, args.ratio_max,
+                           args.sample, args.seed, args.batch_files, report)
 
     # Exit-Code-Konvention:
     # 0 = alles ok
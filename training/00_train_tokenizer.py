@@ -2,16 +2,61 @@
 """
 Baut einen BPE-Tokenizer.
 Läuft auf der CPU.
+
+Vor dem Training wird der Korpus in einem Prozess-Pool vorverarbeitet: die Ersetzungen aus
+docs/TOKENS.md (z.B. "§" → "<§>", "BGH" → "<BGH>") werden angewendet und die vielen kleinen
+*.txt-Dateien in wenige große Shards gepackt, sodass das Training nicht vom Öffnen von
+Millionen Dateien dominiert wird. Mit --raw werden die Dateien wie bisher unverändert übergeben.
+
+Mit --stream wird ohne Zwischendateien per train_from_iterator trainiert. Gelesen werden
+*.txt, *.md, *.jsonl (Felder per --jsonl-fields) sowie deren .gz-Varianten aus --corpus-dir und
+weiteren --source-Pfaden (z.B. data/markdown), optional nur eine Stichprobe (--sample-rate).
+Texte werden in Batches begrenzter Größe an den Trainer übergeben, der Speicherbedarf hängt
+daher nicht von der Korpusgröße ab.
 """
 from pathlib import Path
-from tokenizers import Tokenizer, models, normalizers, pre_tokenizers, trainers
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from typing import Iterable, Iterator
+from tokenizers import Tokenizer, decoders, models, normalizers, pre_tokenizers, trainers
 import argparse
+import gzip
+import json
+import os
+import random
 import sys
+import tempfile
+import time
+
+from special_tokens import SPECIAL_TOKENS, is_fence, substitute
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+DEFAULT_SHARD_MB = 256
+BATCH_FILES = 256  # Dateien pro Auftrag an einen Worker
+
+# Streaming-Modus
+STREAM_SUFFIXES = (".txt", ".md", ".jsonl", ".txt.gz", ".md.gz", ".jsonl.gz")
+DEFAULT_JSONL_FIELDS = "text,instruction,input,output"
+BLOCK_CHARS = 1_000_000  # Große Textdateien werden in Blöcken ab dieser Größe gelesen (und gesampelt)
+DEFAULT_BATCH_MB = 4  # Textmenge pro Batch an Worker und Trainer
 
 
 def validate_args(args):
     if args.vocab_size <= 0:
         raise ValueError("vocab-size must be positive")
+    if args.workers <= 0:
+        raise ValueError("workers must be positive")
+    if args.shard_mb <= 0:
+        raise ValueError("shard-mb must be positive")
+    if args.batch_mb <= 0:
+        raise ValueError("batch-mb must be positive")
+    if not 0 < args.sample_rate <= 1:
+        raise ValueError("sample-rate must be in (0, 1]")
+    for source in args.source:
+        if not Path(source).exists():
+            raise ValueError(f"Source not found: {source}")
 
     corpus_dir = Path(args.corpus_dir)
     if not corpus_dir.exists():
@@ -28,96 +73,354 @@ def get_text_files(directory):
         yield str(file_path)
 
 
+@contextmanager
+def stage(name: str, timings: dict):
+    """Misst die Wandzeit einer Verarbeitungsstufe."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - start
+        print(f"⏱️  {name}: {timings[name]:.1f} s")
+
+
+def bounded_map(pool: ProcessPoolExecutor, fn, batches: Iterable, window: int) -> Iterator:
+    """
+    Wie pool.map, aber es sind höchstens window Aufträge gleichzeitig unterwegs, und die Eingabe
+    wird erst bei Bedarf gelesen. Ergebnisse kommen in Eingabereihenfolge.
+    """
+    pending = deque()
+    for batch in batches:
+        pending.append(pool.submit(fn, batch))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def preprocess_batch(paths: list[str]) -> tuple[bytes, int, int]:
+    """
+    Liest eine Gruppe von Dateien, wendet die TOKENS.md-Ersetzungen an und fügt sie zusammen.
+    Läuft im Worker-Prozess; zurück kommt bereits UTF-8-kodierter Text.
+
+    :return: (Text, gelesene Dateien, fehlgeschlagene Dateien)
+    """
+    parts, failed = [], 0
+    for path in paths:
+        try:
+            text = Path(path).read_text(encoding="utf-8", errors="ignore")
+        except OSError:
+            failed += 1
+            continue
+        text = substitute(text)
+        parts.append(text if text.endswith("\n") else text + "\n")
+    return "".join(parts).encode("utf-8"), len(parts), failed
+
+
+class ShardWriter:
+    """Schreibt fortlaufend in shard-00000.txt, shard-00001.txt, … mit höchstens max_bytes je Shard."""
+
+    def __init__(self, shard_dir: Path, max_bytes: int):
+        self.shard_dir = shard_dir
+        self.max_bytes = max_bytes
+        self.paths: list[str] = []
+        self.bytes = 0
+        self._file = None
+        self._size = 0
+
+    def write(self, data: bytes):
+        if not data:
+            return
+        if self._file is None or self._size >= self.max_bytes:
+            self._open_next()
+        self._file.write(data)
+        self._size += len(data)
+        self.bytes += len(data)
+
+    def _open_next(self):
+        self.close()
+        path = self.shard_dir / f"shard-{len(self.paths):05d}.txt"
+        self._file = open(path, "wb")
+        self._size = 0
+        self.paths.append(str(path))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def build_shards(files, shard_dir: Path, workers: int, shard_bytes: int) -> tuple[list[str], dict]:
+    """
+    Verarbeitet die Dateien parallel in Gruppen zu BATCH_FILES und schreibt die Ergebnisse in
+    Reihenfolge in Shards. Es sind höchstens 2 × workers Gruppen gleichzeitig unterwegs, damit
+    der Speicherbedarf unabhängig von der Korpusgröße bleibt.
+
+    :return: (Shard-Pfade, Statistik)
+    """
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    writer = ShardWriter(shard_dir, shard_bytes)
+    stats = {"files": 0, "failed": 0}
+    files = iter(files)
+    batches = iter(lambda: list(islice(files, BATCH_FILES)), [])
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for data, done, failed in bounded_map(pool, preprocess_batch, batches, 2 * workers):
+                writer.write(data)
+                stats["files"] += done
+                stats["failed"] += failed
+    finally:
+        writer.close()
+    stats["bytes"] = writer.bytes
+    return writer.paths, stats
+
+
+def build_decoder() -> decoders.Decoder:
+    """
+    ByteLevel-Decoder. Er läuft auch über Spezial-Tokens, Nicht-ASCII-Zeichen darin würden als
+    einzelne Bytes gelesen ("<§>" → "<�>"); solche Tokens werden vorher in ihre Byte-Level-
+    Schreibweise übersetzt.
+    """
+    byte_level = pre_tokenizers.ByteLevel(add_prefix_space=False, use_regex=False)
+    replacements = [decoders.Replace(sp, "".join(piece for piece, _ in byte_level.pre_tokenize_str(sp)))
+                    for sp in SPECIAL_TOKENS if not sp.isascii()]
+    return decoders.Sequence([*replacements, decoders.ByteLevel()])
+
+
+def build_tokenizer() -> Tokenizer:
+    tok = Tokenizer(models.BPE(unk_token="<unk>"))
+    tok.normalizer = normalizers.Sequence([
+        normalizers.NFKC(),
+        normalizers.Lowercase()
+    ])
+    # Ohne Präfix-Leerzeichen: sonst würde nach jedem Spezial-Token ein Leerzeichen eingefügt
+    # ("<ECLI:>DE" → "<ECLI:> de" nach decode)
+    tok.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tok.decoder = build_decoder()
+    return tok
+
+
+def build_trainer(vocab_size: int) -> trainers.BpeTrainer:
+    return trainers.BpeTrainer(
+        vocab_size=vocab_size,
+        special_tokens=SPECIAL_TOKENS,
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet()  # alle 256 Bytes, sonst <unk> für seltene Zeichen
+    )
+
+
+def train_files(tok: Tokenizer, trainer: trainers.BpeTrainer, args, timings: dict):
+    """Training über Dateien: vorverarbeitete Shards oder (--raw) die *.txt-Dateien selbst."""
+    with tempfile.TemporaryDirectory(prefix="tokenizer-shards-", dir=Path(args.output).parent) as tmp:
+        if args.raw:
+            with stage("Dateisuche", timings):
+                files = list(get_text_files(args.corpus_dir))
+            if not files:
+                raise ValueError(f"No .txt files found in {args.corpus_dir}")
+            print(f"{len(files)} Textdateien gefunden ...")
+        else:
+            shard_dir = Path(args.shard_dir) if args.shard_dir else Path(tmp)
+            with stage("Vorverarbeitung", timings):
+                files, stats = build_shards(get_text_files(args.corpus_dir), shard_dir,
+                                            args.workers, args.shard_mb * 1_000_000)
+            if not stats["files"]:
+                raise ValueError(f"No .txt files found in {args.corpus_dir}")
+            print(f"{stats['files']} Textdateien → {len(files)} Shards "
+                  f"({stats['bytes'] / 1_000_000:.1f} MB) in {shard_dir}"
+                  + (f", {stats['failed']} nicht lesbar" if stats["failed"] else ""))
+
+        # Train tokenizer
+        with stage("Training", timings):
+            tok.train(files, trainer)
+
+
+# ───────────────────────────── Streaming ─────────────────────────────
+def stream_files(paths: Iterable[str]) -> Iterator[Path]:
+    """
+    Alle unterstützten Dateien der angegebenen Ordner/Dateien in fester Reihenfolge. Ordner werden
+    per os.walk durchlaufen, damit bei Millionen Dateien keine vollständige Pfadliste entsteht.
+    """
+    for source in paths:
+        source = Path(source)
+        if source.is_file():
+            yield source
+            continue
+        for root, dirs, names in os.walk(source):
+            dirs.sort()
+            for name in sorted(names):
+                if name.endswith(STREAM_SUFFIXES):
+                    yield Path(root) / name
+
+
+def _open_text(path: Path):
+    if path.name.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="ignore")
+    return open(path, "r", encoding="utf-8", errors="ignore")
+
+
+def iter_units(path: Path, jsonl_fields: list[str]) -> Iterator[str]:
+    """
+    Zerlegt eine Datei in Einheiten für Stichprobe und Batching: JSONL je Datensatz (die
+    angegebenen Textfelder, durch Zeilenumbruch verbunden), sonst Zeilenblöcke ab BLOCK_CHARS.
+
+    Blöcke werden nur außerhalb von Code-Fences und nicht innerhalb einer Markdown-Tabelle
+    geschnitten, damit substitute() auf jedem Block dasselbe ergibt wie auf der ganzen Datei.
+    """
+    with _open_text(path) as f:
+        if path.name.endswith((".jsonl", ".jsonl.gz")):
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if not isinstance(record, dict):
+                    continue
+                text = "\n".join(record[field] for field in jsonl_fields
+                                 if isinstance(record.get(field), str) and record[field])
+                if text:
+                    yield text
+            return
+
+        block, size, in_code = [], 0, False
+        for line in f:
+            block.append(line)
+            size += len(line)
+            if is_fence(line):
+                in_code = not in_code
+            if size >= BLOCK_CHARS and not in_code and not line.startswith("|"):
+                yield "".join(block)
+                block, size = [], 0
+        if block:
+            yield "".join(block)
+
+
+def read_units(paths: Iterable[Path], jsonl_fields: list[str], stats: dict) -> Iterator[str]:
+    for path in paths:
+        stats["files"] += 1
+        try:
+            for unit in iter_units(path, jsonl_fields):
+                stats["units"] += 1
+                yield unit
+        except (OSError, EOFError) as e:
+            stats["failed"] += 1
+            print(f"⚠️  {path}: {e}", file=sys.stderr)
+
+
+def sample_batches(batches: Iterable[list[str]], sample_rate: float, seed: int,
+                   stats: dict) -> Iterator[list[str]]:
+    """Zieht die Stichprobe aus den (bereits ersetzten) Einheiten; leere Batches entfallen."""
+    rnd = random.Random(seed)
+    for batch in batches:
+        if sample_rate < 1:
+            batch = [text for text in batch if rnd.random() < sample_rate]
+        stats["sampled"] += len(batch)
+        stats["chars"] += sum(map(len, batch))
+        if batch:
+            yield batch
+
+
+def batch_units(units: Iterable[str], batch_chars: int) -> Iterator[list[str]]:
+    """Fasst Einheiten zu Listen von höchstens batch_chars Zeichen zusammen (mindestens eine Einheit)."""
+    batch, size = [], 0
+    for unit in units:
+        if batch and size + len(unit) > batch_chars:
+            yield batch
+            batch, size = [], 0
+        batch.append(unit)
+        size += len(unit)
+    if batch:
+        yield batch
+
+
+def substitute_batch(texts: list[str]) -> list[str]:
+    return [substitute(text) for text in texts]
+
+
+def stream_batches(sources: list[str], jsonl_fields: list[str], sample_rate: float, seed: int,
+                   batch_chars: int, pool: ProcessPoolExecutor | None, workers: int,
+                   stats: dict) -> Iterator[list[str]]:
+    """
+    Liefert Text-Batches für train_from_iterator. Mit pool werden die TOKENS.md-Ersetzungen in
+    den Worker-Prozessen angewendet, höchstens 2 × workers Batches gleichzeitig; die Stichprobe
+    wird erst danach gezogen.
+    """
+    units = read_units(stream_files(sources), jsonl_fields, stats)
+    batches = batch_units(units, batch_chars)
+    if pool is not None:
+        batches = bounded_map(pool, substitute_batch, batches, 2 * workers)
+    yield from sample_batches(batches, sample_rate, seed, stats)
+
+
+def train_streaming(tok: Tokenizer, trainer: trainers.BpeTrainer, args, timings: dict):
+    sources = [args.corpus_dir, *args.source]
+    fields = [field.strip() for field in args.jsonl_fields.split(",") if field.strip()]
+    stats = {"files": 0, "units": 0, "sampled": 0, "chars": 0, "failed": 0}
+    print(f"Streaming aus: {', '.join(sources)} (Stichprobe {args.sample_rate:.0%})")
+
+    with stage("Training (Streaming)", timings):
+        if args.raw:
+            batches = stream_batches(sources, fields, args.sample_rate, args.seed,
+                                     args.batch_mb * 1_000_000, None, args.workers, stats)
+            tok.train_from_iterator(batches, trainer)
+        else:
+            with ProcessPoolExecutor(max_workers=args.workers) as pool:
+                batches = stream_batches(sources, fields, args.sample_rate, args.seed,
+                                         args.batch_mb * 1_000_000, pool, args.workers, stats)
+                tok.train_from_iterator(batches, trainer)
+
+    if not stats["sampled"]:
+        raise ValueError(f"No text found in {', '.join(sources)}")
+    print(f"{stats['files']} Dateien, {stats['sampled']} von {stats['units']} Einheiten "
+          f"({stats['chars'] / 1_000_000:.1f} Mio. Zeichen) trainiert"
+          + (f", {stats['failed']} nicht lesbar" if stats["failed"] else ""))
+
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--corpus-dir", required=True,
                     help="Ordner mit *.txt-Dateien")
     ap.add_argument("--vocab-size", type=int, default=50000)
     ap.add_argument("--output", default="tokenizer_de.json")
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                    help="Worker-Prozesse für die Vorverarbeitung")
+    ap.add_argument("--shard-mb", type=int, default=DEFAULT_SHARD_MB,
+                    help=f"Maximale Größe eines Shards in MB (default {DEFAULT_SHARD_MB})")
+    ap.add_argument("--shard-dir",
+                    help="Shards hier ablegen und behalten (Standard: temporär neben --output)")
+    ap.add_argument("--raw", action="store_true",
+                    help="Ohne TOKENS.md-Ersetzungen trainieren (ohne --stream: direkt auf den *.txt-Dateien)")
+    ap.add_argument("--stream", action="store_true",
+                    help="Ohne Shards per train_from_iterator aus txt/md/jsonl(.gz) streamen")
+    ap.add_argument("--source", action="append", default=[],
+                    help="Weitere Ordner/Dateien für --stream (mehrfach möglich, z.B. data/markdown)")
+    ap.add_argument("--jsonl-fields", default=DEFAULT_JSONL_FIELDS,
+                    help=f"Textfelder aus *.jsonl (default {DEFAULT_JSONL_FIELDS})")
+    ap.add_argument("--sample-rate", type=float, default=1.0,
+                    help="Anteil der Dateiblöcke/Datensätze, die ins Training eingehen (default 1.0)")
+    ap.add_argument("--seed", type=int, default=42, help="Seed für die Stichprobe")
+    ap.add_argument("--batch-mb", type=int, default=DEFAULT_BATCH_MB,
+                    help=f"Textmenge pro Batch im Streaming-Modus in MB (default {DEFAULT_BATCH_MB})")
     args = ap.parse_args()
 
+    timings = {}
     try:
         validate_args(args)
-
-        # Count files first
-        files = list(get_text_files(args.corpus_dir))
-        if not files:
-            raise ValueError(f"No .txt files found in {args.corpus_dir}")
-
-        print(f"{len(files)} Textdateien gefunden ...")
         print(f"Verarbeite Dateien aus: {args.corpus_dir}")
 
-        # Tokenizer setup
-        tok = Tokenizer(models.BPE(unk_token="<unk>"))
-        tok.normalizer = normalizers.Sequence([
-            normalizers.NFKC(),
-            normalizers.Lowercase()
-        ])
-        tok.pre_tokenizer = pre_tokenizers.ByteLevel()
-
-        special_tokens = [
-            # ─────────────────── Basis ───────────────────
-            "<s>", "</s>", "<unk>", "<pad>",
-
-            # ────────────── Juristische Strukturwörter ──────────────
-            "<§>", "<Art.>", "<Abs.>", "<Satz>", "<Nr.>", "<Rn.>", "<ECLI:>",
-
-            # ─────────────── Gerichte & Instanzen ───────────────
-            "<AG>",  # Amtsgericht
-            "<LG>",  # Landgericht
-            "<OLG>",  # Oberlandesgericht
-            "<BGH>",  # Bundesgerichtshof
-            "<BVerfG>",  # Bundesverfassungsgericht
-            "<BVerwG>",  # Bundesverwaltungsgericht
-            "<BSG>",  # Bundessozialgericht
-            "<BFH>",  # Bundesfinanzhof
-            "<BAG>",  # Bundesarbeitsgericht
-            "<FG>",  # Finanzgericht (allg.)
-            "<EuGH>",  # Gerichtshof der Europäischen Union
-            "<EuG>",  # Gericht der Europäischen Union
-
-            # ───────────────── Gesetze & Abkürzungen ─────────────────
-            "<GG>", "<BGB>", "<HGB>", "<StGB>", "<StPO>", "<ZPO>",
-            "<VwGO>", "<VwVfG>", "<AO>", "<SGB>", "<IfSG>",
-            "<UStG>", "<EStG>", "<GewO>", "<UrhG>", "<AktG>",
-            "<InsO>", "<GKG>", "<GWB>",
-
-            # Lateinische Rechtsbegriffe
-            "<lex>", "<ratio>", "<subs>", "<obiter>",
-
-            # ────────────── Programmier-Tokens (multi-lang) ──────────────
-            # Python
-            "<def>", "<class>", "<async>", "<await>", "<self>",
-            # C/C++
-            "<#include>", "<std::>", "<::>", "<->",
-            # Rust
-            "<fn>", "<mut>", "<println!>",
-            # Go
-            "<func>", "<package>", "<chan>", "<go>",
-            # Kommentare
-            "<//>", "<#>", "</*>", "<*/>",
-
-            # ─────────────── Markdown-Kontroll-Tokens ───────────────
-            "<MD_H1>", "<MD_H2>", "<MD_H3>", "<MD_H4>",
-            "<MD_UL>", "<MD_OL>",
-            "<MD_CB>",  # ``` ohne Sprachlabel
-            "<MD_CODE_LANG_py>", "<MD_CODE_LANG_cpp>",
-            "<MD_CODE_LANG_rs>", "<MD_CODE_LANG_go>",
-            "<MD_TABLE>",
-            "<MD_END>"
-        ]
-
-        trainer = trainers.BpeTrainer(
-            vocab_size=args.vocab_size,
-            special_tokens=special_tokens
-        )
+        tok = build_tokenizer()
+        trainer = build_trainer(args.vocab_size)
 
-        # Train tokenizer
-        tok.train(files, trainer)
+        if args.stream:
+            train_streaming(tok, trainer, args, timings)
+        else:
+            train_files(tok, trainer, args, timings)
 
         # Save result
-        tok.save(args.output)
+        with stage("Speichern", timings):
+            tok.save(args.output)
         print(f"Tokenizer gespeichert unter {args.output}")
+        print("⏱️  Gesamt: " + ", ".join(f"{name} {seconds:.1f} s" for name, seconds in timings.items())
+              + f" = {sum(timings.values()):.1f} s")
 
     except Exception as e:
         print(f"Error: {str(e)}", file=sys.stderr)
@@ -125,4 +428,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
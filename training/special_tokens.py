@@ -0,0 +1,177 @@
+"""
+Spezial-Tokens des Tokenizers und ihre Ersetzungsregeln laut docs/TOKENS.md.
+
+substitute() wandelt Rohtext in die Dataset-Schreibweise um, z.B.
+"§ 433 BGB" → "<§> 433 <BGB>" oder "```python" → "<MD_CODE_LANG_py>". Juristische Tokens und
+Markdown-Struktur werden im Fließtext ersetzt, Programmier-Tokens nur innerhalb von Code-Blöcken,
+damit z.B. "go" oder "self" in deutschem Text unverändert bleiben. "AG" wird nur vor einem
+großgeschriebenen Ortsnamen ersetzt ("AG München" → "<AG> München"), nicht als Rechtsform
+("Siemens AG"); die übrigen Gerichte und Gesetze werden als ganze Wörter ersetzt.
+
+In Code-Blöcken bleiben String-Literale unverändert, soweit sie auf einer Zeile beginnen und enden
+("…" und '…', in Rust wegen der Lifetimes ('a) nur "…"). Mehrzeilige Strings (Python-Docstrings,
+Raw-Strings) und der Text von Kommentaren werden nicht erkannt; Schlüsselwörter darin werden
+ebenfalls ersetzt.
+"""
+
+import re
+
+SPECIAL_TOKENS = [
+    # ─────────────────── Basis ───────────────────
+    "<s>", "</s>", "<unk>", "<pad>",
+
+    # ────────────── Juristische Strukturwörter ──────────────
+    "<§>", "<Art.>", "<Abs.>", "<Satz>", "<Nr.>", "<Rn.>", "<ECLI:>",
+
+    # ─────────────── Gerichte & Instanzen ───────────────
+    "<AG>",  # Amtsgericht
+    "<LG>",  # Landgericht
+    "<OLG>",  # Oberlandesgericht
+    "<BGH>",  # Bundesgerichtshof
+    "<BVerfG>",  # Bundesverfassungsgericht
+    "<BVerwG>",  # Bundesverwaltungsgericht
+    "<BSG>",  # Bundessozialgericht
+    "<BFH>",  # Bundesfinanzhof
+    "<BAG>",  # Bundesarbeitsgericht
+    "<FG>",  # Finanzgericht (allg.)
+    "<EuGH>",  # Gerichtshof der Europäischen Union
+    "<EuG>",  # Gericht der Europäischen Union
+
+    # ───────────────── Gesetze & Abkürzungen ─────────────────
+    "<GG>", "<BGB>", "<HGB>", "<StGB>", "<StPO>", "<ZPO>",
+    "<VwGO>", "<VwVfG>", "<AO>", "<SGB>", "<IfSG>",
+    "<UStG>", "<EStG>", "<GewO>", "<UrhG>", "<AktG>",
+    "<InsO>", "<GKG>", "<GWB>",
+
+    # Lateinische Rechtsbegriffe
+    "<lex>", "<ratio>", "<subs>", "<obiter>",
+
+    # ────────────── Programmier-Tokens (multi-lang) ──────────────
+    # Python
+    "<def>", "<class>", "<async>", "<await>", "<self>",
+    # C/C++
+    "<#include>", "<std::>", "<::>", "<->",
+    # Rust
+    "<fn>", "<mut>", "<println!>",
+    # Go
+    "<func>", "<package>", "<chan>", "<go>",
+    # Kommentare
+    "<//>", "<#>", "</*>", "<*/>",
+
+    # ─────────────── Markdown-Kontroll-Tokens ───────────────
+    "<MD_H1>", "<MD_H2>", "<MD_H3>", "<MD_H4>",
+    "<MD_UL>", "<MD_OL>",
+    "<MD_CB>",  # ``` ohne Sprachlabel
+    "<MD_CODE_LANG_py>", "<MD_CODE_LANG_cpp>",
+    "<MD_CODE_LANG_rs>", "<MD_CODE_LANG_go>",
+    "<MD_TABLE>",
+    "<MD_END>"
+]
+
+COURTS = ("AG", "LG", "OLG", "BGH", "BVerfG", "BVerwG", "BSG", "BFH", "BAG", "FG", "EuGH", "EuG")
+LAWS = ("GG", "BGB", "HGB", "StGB", "StPO", "ZPO", "VwGO", "VwVfG", "AO", "SGB", "IfSG",
+        "UStG", "EStG", "GewO", "UrhG", "AktG", "InsO", "GKG", "GWB")
+FENCE_LANGUAGES = {"python": "py", "py": "py", "cpp": "cpp", "c++": "cpp", "rust": "rs", "rs": "rs", "go": "go"}
+
+
+def _words(words) -> str:
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+
+# Fließtext: Zeilenanfänge (Markdown) und Wörter in je einem Durchlauf; § und ECLI: nur, wenn sie vorkommen.
+# Art./Abs./Satz/Nr./Rn. nur vor einer Zahl ("Satz 2", nicht "ein Satz"), Gerichte und Gesetze als ganze
+# Wörter, aber nicht innerhalb einer ECLI ("ECLI:DE:BGH:2025:…"). AG nur vor einem Ortsnamen, sonst ist
+# meist die Rechtsform gemeint.
+_BARE_WORDS = tuple(w for w in COURTS + LAWS if w != "AG")
+_LINE = re.compile(r"^[ \t]*(?:(?P<heading>#{1,4})|(?P<ul>[-*+])|(?P<ol>\d+\.))(?= )", re.MULTILINE)
+_WORD = re.compile(
+    r"(?<![\w<:])(?:"
+    r"(?P<unit>Art\.|Abs\.|Satz|Nr\.|Rn\.)(?=[ \t]*\d)"
+    rf"|(?P<abbr>{_words(_BARE_WORDS)}|lex|ratio|obiter)(?![\w>])"
+    r"|(?P<court>AG)(?=[ \t]+[A-ZÄÖÜ])"
+    r"|(?P<subs>[Ss]ubs)(?=um))"
+)
+_PARAGRAPH = re.compile(r"(?<!<)§(?!>)")
+_ECLI = re.compile(r"(?<![\w<])ECLI:")
+_TABLE = re.compile(r"^(?=\|)(?<!\|\n)(?<!\|\r\n)", re.MULTILINE)
+
+# Code-Blöcke: String-Literale einer Zeile werden übersprungen, sonst längere Formen zuerst
+# (std:: vor ::, #include vor #)
+_DOUBLE_QUOTED = r'"(?:\\.|[^"\\\n])*"'
+_SINGLE_QUOTED = r"'(?:\\.|[^'\\\n])*'"
+
+
+def _code_pattern(strings: str) -> re.Pattern:
+    return re.compile(
+        rf"(?P<string>{strings})"
+        r"|(?P<include>#include\b)"
+        r"|(?P<std>std::)|(?P<scope>::)|(?P<arrow>->)"
+        r"|(?P<println>\bprintln!)"
+        r"|(?<![\w.])(?P<keyword>def|class|async|await|fn|mut|func|package|chan|go)(?= )"
+        r"|(?<![\w.])(?P<self>self)\b"
+        r"|(?P<comment>//|/\*|\*/|#(?=\s))"
+    )
+
+
+_CODE = _code_pattern(f"{_DOUBLE_QUOTED}|{_SINGLE_QUOTED}")
+_CODE_RS = _code_pattern(_DOUBLE_QUOTED)  # ' leitet in Rust auch Lifetimes ein ('a)
+_FENCE = re.compile(r"^[ \t]*(```[^\n]*?)[ \t]*$", re.MULTILINE)
+
+
+def _line_token(m: re.Match) -> str:
+    if m.lastgroup == "heading":
+        return f"<MD_H{len(m.group('heading'))}>"
+    return "<MD_UL>" if m.lastgroup == "ul" else "<MD_OL>"
+
+
+def _word_token(m: re.Match) -> str:
+    return "<subs>" if m.lastgroup == "subs" else f"<{m.group()}>"
+
+
+def _code_token(m: re.Match) -> str:
+    if m.lastgroup == "string":
+        return m.group()
+    return "<->" if m.lastgroup == "arrow" else f"<{m.group()}>"
+
+
+def substitute_prose(text: str) -> str:
+    text = _LINE.sub(_line_token, text)
+    text = _WORD.sub(_word_token, text)
+    if "§" in text:
+        text = _PARAGRAPH.sub("<§>", text)
+    if "ECLI:" in text:
+        text = _ECLI.sub("<ECLI:>", text)
+    if "|" in text:
+        text = _TABLE.sub("<MD_TABLE>", text)
+    return text
+
+
+def substitute_code(text: str, language: str | None = None) -> str:
+    """:param language: Kürzel aus FENCE_LANGUAGES ("py", "cpp", "rs", "go") oder None"""
+    return (_CODE_RS if language == "rs" else _CODE).sub(_code_token, text)
+
+
+def is_fence(line: str) -> bool:
+    """True, wenn die Zeile eine Code-Fence ist, die substitute() als Öffnen/Schließen wertet."""
+    return _FENCE.match(line) is not None
+
+
+def substitute(text: str) -> str:
+    """
+    Wendet die Ersetzungen aus docs/TOKENS.md an. Code-Fences werden zu <MD_CB> bzw.
+    <MD_CODE_LANG_*> und die schließende Fence zu <MD_END>.
+    """
+    parts = _FENCE.split(text)
+    out = [substitute_prose(parts[0])]
+    in_code = False
+    for i in range(1, len(parts), 2):
+        fence, body = parts[i], parts[i + 1]
+        if in_code:
+            out.append("<MD_END>")
+            out.append(substitute_prose(body))
+        else:
+            language = FENCE_LANGUAGES.get(fence[3:].strip().lower())
+            out.append(f"<MD_CODE_LANG_{language}>" if language else "<MD_CB>")
+            out.append(substitute_code(body, language))
+        in_code = not in_code
+    return "".join(out)